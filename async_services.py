@@ -0,0 +1,128 @@
+"""
+Versiones asíncronas de los servicios
+
+mysql.connector es bloqueante: cada función de este módulo ejecuta su
+equivalente de services.py / auth.py en el pool de hilos OLTP (executors.py),
+de modo que los handlers `async def` pueden hacer `await` sin detener el event
+loop mientras esperan a la base de datos.
+"""
+from typing import Dict, Optional
+from fastapi import Request
+from executors import oltp_executor, report_executor, password_executor
+from config import PASSWORD_ROUNDS
+import functools
+import threading
+import auth
+import passwords
+import services
+
+async def run_db(func, *args, **kwargs):
+    """Ejecuta una función bloqueante de acceso a datos fuera del event loop"""
+    return await oltp_executor.run(func, *args, **kwargs)
+
+async def run_report(func, *args, **kwargs):
+    """Ejecuta consultas de reportes o la generación de PDFs en su propio pool"""
+    return await report_executor.run(func, *args, **kwargs)
+
+async def iterate_report(iterator, on_close=None):
+    """Recorre un iterador bloqueante (p. ej. un cursor por bloques) en el pool de reportes
+
+    Cada bloque se pide por separado, así que una exportación larga no retiene
+    un hilo entre bloques mientras el cliente descarga. Los bloques no se
+    rechazan por cola llena: la respuesta ya empezó. Si la descarga se corta,
+    el iterador se cierra también en el pool (cerrar un cursor puede bloquear y
+    un next() cancelado puede seguir ejecutándose en su hilo); después se llama
+    a `on_close`.
+    """
+    lock = threading.Lock()
+
+    def step():
+        with lock:
+            return next(iterator, None)
+
+    def close():
+        # El lock espera a que termine un next() en curso antes de cerrar
+        with lock:
+            try:
+                close_iterator = getattr(iterator, 'close', None)
+                if close_iterator is not None:
+                    close_iterator()
+            except Exception as e:
+                print(f"Error cerrando exportación: {e}")
+            finally:
+                if on_close is not None:
+                    on_close()
+
+    try:
+        while True:
+            chunk = await report_executor.run_admitted(step)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        report_executor.submit(close)
+
+def _async(func):
+    """Crea la versión awaitable de una función síncrona de servicios"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+# ========================================
+# AUTENTICACIÓN
+# ========================================
+
+async def get_current_user(request: Request) -> Optional[Dict]:
+    """Obtiene el usuario actual; solo sale del event loop si no está en caché"""
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return None
+
+    user = auth.get_cached_user(user_id)
+    if user is not None:
+        return user
+    return await run_db(auth.load_user, user_id)
+
+async def hash_password(password: str) -> str:
+    """Genera el hash de una contraseña en el pool de procesos"""
+    return await password_executor.run(passwords.hash_password, password, PASSWORD_ROUNDS)
+
+async def authenticate_user(username: str, password: str) -> Optional[Dict]:
+    """Autentica un usuario; la verificación corre en el pool de procesos
+
+    Lanza ExecutorBusy si hay demasiados logins esperando. Si el hash guardado
+    usa otro costo (PASSWORD_ROUNDS cambió) se reemplaza por uno nuevo.
+    """
+    user = await run_db(auth.get_login_user, username)
+    if not user:
+        return None
+    valid, new_hash = await password_executor.run(
+        passwords.verify_password, password, user['password'], PASSWORD_ROUNDS
+    )
+    if not valid:
+        return None
+    if new_hash:
+        await run_db(auth.update_password_hash, user['id'], new_hash)
+    return auth.session_user(user, username)
+
+# ========================================
+# SERVICIOS
+# ========================================
+
+get_products = _async(services.get_products)
+get_products_by_category = _async(services.get_products_by_category)
+get_product_by_id = _async(services.get_product_by_id)
+get_products_by_ids = _async(services.get_products_by_ids)
+price_cart = _async(services.price_cart)
+calculate_cart_total = _async(services.calculate_cart_total)
+apply_discount = _async(services.apply_discount)
+get_grouped_cart = _async(services.get_grouped_cart)
+create_order = _async(services.create_order)
+get_order_by_id = _async(services.get_order_by_id)
+get_order_items = _async(services.get_order_items)
+update_order_status = _async(services.update_order_status)
+get_active_orders = _async(services.get_active_orders)
+get_kitchen_board = _async(services.get_kitchen_board)
+get_admin_stats = _async(services.get_admin_stats)
+get_recent_orders = _async(services.get_recent_orders)
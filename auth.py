@@ -1,39 +1,30 @@
-from passlib.context import CryptContext
 from fastapi import Request
 from database import get_db_connection
-import warnings
-import os
+from cache import TTLCache
+from config import USER_CACHE_TTL, USER_CACHE_SIZE, PASSWORD_ROUNDS
+import passwords
 
-# Desactivar detección automática de bugs en bcrypt que causa problemas con versiones nuevas
-# Esta variable debe estar antes de importar passlib
-os.environ.setdefault('PASSLIB_DISABLE_WRAP_BUG_DETECTION', '1')
+# Usuarios activos por ID, para no consultar `usuarios` en cada request
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
-# Suprimir warnings de bcrypt durante la inicialización
-warnings.filterwarnings("ignore", category=UserWarning, module="passlib")
-
-# Inicializar contexto de contraseñas
-# Usar sha256_crypt como esquema principal ya que es el que funciona correctamente
-# y es compatible con los hashes existentes en la base de datos
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+def invalidate_user(user_id: int):
+    """Descarta el usuario de la caché tras editarlo, desactivarlo o reactivarlo"""
+    user_cache.invalidate(int(user_id))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica una contraseña"""
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        print(f"Error verificando contraseña: {e}")
-        return False
+    """Verifica una contraseña (bloquea el hilo; en handlers usar async_services)"""
+    return passwords.verify_password(plain_password, hashed_password, PASSWORD_ROUNDS)[0]
 
 def get_password_hash(password: str) -> str:
-    """Genera un hash de la contraseña usando sha256_crypt"""
+    """Genera un hash de la contraseña usando sha256_crypt con PASSWORD_ROUNDS"""
     try:
-        return pwd_context.hash(password)
+        return passwords.hash_password(password, PASSWORD_ROUNDS)
     except Exception as e:
         print(f"Error hasheando contraseña: {e}")
         raise
 
-def authenticate_user(username: str, password: str) -> dict:
-    """Autentica un usuario y retorna sus datos"""
+def get_login_user(username: str) -> dict:
+    """Lee el usuario activo con su hash para verificar el login"""
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
@@ -42,29 +33,50 @@ def authenticate_user(username: str, password: str) -> dict:
             "SELECT id, password, nombre, rol FROM usuarios WHERE username = %s AND activo = 1",
             (username,)
         )
-        user = cursor.fetchone()
-        
-        if user and verify_password(password, user['password']):
-            return {
-                'id': user['id'],
-                'username': username,
-                'nombre': user['nombre'],
-                'rol': user['rol']
-            }
-        return None
-    except Exception as e:
-        print(f"Error en autenticación: {e}")
-        return None
+        return cursor.fetchone()
     finally:
         cursor.close()
         conn.close()
 
-def get_current_user(request: Request) -> dict:
-    """Obtiene el usuario actual de la sesión"""
-    user_id = request.session.get('user_id')
-    if not user_id:
-        return None
+def update_password_hash(user_id: int, hashed_password: str):
+    """Reemplaza el hash guardado (p. ej. tras cambiar PASSWORD_ROUNDS)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
     
+    try:
+        cursor.execute("UPDATE usuarios SET password = %s WHERE id = %s", (hashed_password, user_id))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def session_user(user: dict, username: str) -> dict:
+    """Datos del usuario autenticado que se guardan en la sesión"""
+    return {
+        'id': user['id'],
+        'username': username,
+        'nombre': user['nombre'],
+        'rol': user['rol']
+    }
+
+def authenticate_user(username: str, password: str) -> dict:
+    """Autentica un usuario y retorna sus datos (versión bloqueante)"""
+    try:
+        user = get_login_user(username)
+        if not user:
+            return None
+        valid, new_hash = passwords.verify_password(password, user['password'], PASSWORD_ROUNDS)
+        if not valid:
+            return None
+        if new_hash:
+            update_password_hash(user['id'], new_hash)
+        return session_user(user, username)
+    except Exception as e:
+        print(f"Error en autenticación: {e}")
+        return None
+
+def load_user(user_id: int) -> dict:
+    """Lee un usuario activo de la base de datos y lo guarda en la caché"""
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
@@ -74,16 +86,32 @@ def get_current_user(request: Request) -> dict:
             (user_id,)
         )
         user = cursor.fetchone()
+        if user:
+            user_cache.set(user_id, dict(user))
         return user
     finally:
         cursor.close()
         conn.close()
 
+def get_cached_user(user_id: int) -> dict:
+    """Obtiene un usuario de la caché (None si no está o expiró)"""
+    user = user_cache.get(user_id)
+    return dict(user) if user is not None else None
+
+def get_current_user(request: Request) -> dict:
+    """Obtiene el usuario actual de la sesión"""
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return None
+    
+    return get_cached_user(user_id) or load_user(user_id)
+
 def require_role(required_role: str = None):
     """Decorador para requerir autenticación y rol específico"""
     def decorator(func):
         async def wrapper(request: Request, *args, **kwargs):
-            user = get_current_user(request)
+            from async_services import get_current_user as get_current_user_async
+            user = await get_current_user_async(request)
             if not user:
                 from fastapi.responses import RedirectResponse
                 return RedirectResponse(url="/login", status_code=302)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de rendimiento
+Sistema de Pedidos - Restaurante Sazón Mexicano
+
+Uso:
+    python benchmarks.py kitchen [--orders 1,10,20,40,80] [--repeat 20]
+    python benchmarks.py json [--rows 10000] [--repeat 20]
+    python benchmarks.py login [--logins 40] [--concurrency 8] [--rounds 535000]
+
+kitchen: compara la carga de la pantalla de cocina con una consulta por
+pedido (N+1) contra get_kitchen_board(). Inserta pedidos de prueba con
+prefijo BENCH- en la base de datos configurada y los elimina al terminar;
+no lo ejecutes contra la base de datos de producción.
+
+json: serializa un reporte sintético (pedidos con Decimal y datetime) con
+convert_decimals + JSONResponse contra FastJSONResponse. No usa la base de datos.
+
+login: verifica contraseñas con `concurrency` logins simultáneos dentro del
+event loop (como antes) contra el pool de procesos password_executor. Reporta
+logins por segundo y el retraso máximo del event loop. No usa la base de datos.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+BENCH_PREFIX = 'BENCH-'
+
+def _timeit(func, repeat: int) -> dict:
+    """Ejecuta `func` `repeat` veces y devuelve estadísticas en milisegundos"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'mean': statistics.mean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+# ========================================
+# COCINA
+# ========================================
+
+def _insert_bench_orders(count: int, start: int = 0, items_per_order: int = 3):
+    """Inserta `count` pedidos de prueba numerados desde `start` (numero_pedido es único)"""
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for n in range(start, start + count):
+            cursor.execute(
+                "INSERT INTO pedidos (numero_pedido, total, descuento, total_final) VALUES (%s, %s, %s, %s)",
+                (f"{BENCH_PREFIX}{n:05d}", 100, 0, 100)
+            )
+            pedido_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO pedido_items (pedido_id, producto_id, producto_nombre, precio, cantidad) VALUES (%s, %s, %s, %s, %s)",
+                [(pedido_id, 0, f"Producto {i}", 10, 1) for i in range(items_per_order)]
+            )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def _delete_bench_orders():
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM pedidos WHERE numero_pedido LIKE %s", (f"{BENCH_PREFIX}%",))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def bench_kitchen(order_counts: list, repeat: int):
+    """Latencia de la vista de cocina según el número de pedidos activos"""
+    from services import get_active_orders, get_order_items, get_kitchen_board
+
+    def legacy():
+        orders = get_active_orders()
+        for order in orders:
+            order['items'] = get_order_items(order['id'])
+        return orders
+
+    print(f"{'pedidos':>8} {'N+1 media':>11} {'N+1 p95':>9} {'board media':>12} {'board p95':>10} {'mejora':>7}")
+    inserted = 0
+    try:
+        for count in sorted(order_counts):
+            _insert_bench_orders(count - inserted, start=inserted)
+            inserted = count
+            active = len(get_kitchen_board())
+            old = _timeit(legacy, repeat)
+            new = _timeit(get_kitchen_board, repeat)
+            print(f"{active:>8} {old['mean']:>9.2f}ms {old['p95']:>7.2f}ms "
+                  f"{new['mean']:>10.2f}ms {new['p95']:>8.2f}ms {old['mean'] / new['mean']:>6.1f}x")
+    finally:
+        _delete_bench_orders()
+
+# ========================================
+# JSON
+# ========================================
+
+def _report_rows(count: int) -> list:
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+
+    start = datetime(2025, 1, 1, 8, 0, 0)
+    return [{
+        'id': n,
+        'numero_pedido': f"PED-{n:06d}",
+        'total': Decimal('125.50'),
+        'descuento': Decimal('12.55'),
+        'total_final': Decimal('112.95'),
+        'estado': 'delivered',
+        'fecha_hora': start + timedelta(minutes=n),
+        'tiempo_preparacion': 540,
+    } for n in range(count)]
+
+def bench_json(rows: int, repeat: int):
+    """Serialización de un reporte de `rows` pedidos"""
+    from decimal import Decimal
+    from fastapi.responses import JSONResponse
+    from responses import FastJSONResponse, orjson
+
+    def convert_decimals(obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        elif isinstance(obj, dict):
+            return {k: convert_decimals(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [convert_decimals(item) for item in obj]
+        return obj
+
+    def legacy():
+        orders = _report_rows(rows)
+        for order in orders:
+            order['fecha_hora'] = order['fecha_hora'].strftime('%Y-%m-%d %H:%M:%S')
+        return JSONResponse({"success": True, "orders": convert_decimals(orders)}).body
+
+    def fast():
+        return FastJSONResponse({"success": True, "orders": _report_rows(rows)}).body
+
+    # Ambas incluyen construir las filas, como ocurre al leer de la base de datos
+    build = _timeit(lambda: _report_rows(rows), repeat)
+    old = _timeit(legacy, repeat)
+    new = _timeit(fast, repeat)
+    print(f"filas: {rows}  codificador: {'orjson' if orjson else 'json'}")
+    print(f"{'':>22} {'media':>9} {'p95':>9}")
+    print(f"{'filas (base)':>22} {build['mean']:>7.2f}ms {build['p95']:>7.2f}ms")
+    print(f"{'convert_decimals':>22} {old['mean']:>7.2f}ms {old['p95']:>7.2f}ms")
+    print(f"{'FastJSONResponse':>22} {new['mean']:>7.2f}ms {new['p95']:>7.2f}ms")
+    print(f"mejora (sin construir filas): "
+          f"{(old['mean'] - build['mean']) / max(new['mean'] - build['mean'], 1e-9):.1f}x")
+
+# ========================================
+# LOGIN
+# ========================================
+
+def bench_login(logins: int, concurrency: int, rounds: int, workers: int):
+    """Verificación de `logins` contraseñas con `concurrency` peticiones simultáneas"""
+    import asyncio
+    from executors import ProcessBoundedExecutor
+    from passwords import hash_password, verify_password
+
+    hashed = hash_password('secreto123', rounds)
+    executor = ProcessBoundedExecutor('bench-passwords', workers)
+
+    async def inline_login():
+        return verify_password('secreto123', hashed, rounds)
+
+    async def pool_login():
+        return await executor.run(verify_password, 'secreto123', hashed, rounds)
+
+    async def measure(login) -> dict:
+        lag = {'max': 0.0}
+        done = asyncio.Event()
+
+        async def ticker():
+            # Un request trivial cada 10 ms: cuánto se retrasa mide el bloqueo del loop
+            while not done.is_set():
+                expected = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                lag['max'] = max(lag['max'], (time.perf_counter() - expected) * 1000)
+
+        async def worker(count: int):
+            for _ in range(count):
+                valid, _ = await login()
+                assert valid
+
+        ticker_task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        per_worker = [logins // concurrency + (1 if n < logins % concurrency else 0) for n in range(concurrency)]
+        await asyncio.gather(*(worker(count) for count in per_worker))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ticker_task
+        return {'rate': logins / elapsed, 'lag': lag['max']}
+
+    async def run():
+        # Arrancar los procesos antes de medir
+        await asyncio.gather(*(pool_login() for _ in range(workers)))
+        return await measure(inline_login), await measure(pool_login)
+
+    try:
+        inline, pool = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    print(f"logins: {logins}  concurrencia: {concurrency}  rounds: {rounds}  procesos: {workers}")
+    print(f"{'':>22} {'logins/s':>9} {'lag máx':>10}")
+    print(f"{'en el event loop':>22} {inline['rate']:>9.1f} {inline['lag']:>8.1f}ms")
+    print(f"{'password_executor':>22} {pool['rate']:>9.1f} {pool['lag']:>8.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de rendimiento")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    kitchen = subparsers.add_parser('kitchen', help="Pantalla de cocina: N+1 vs get_kitchen_board")
+    kitchen.add_argument('--orders', default='1,10,20,40,80',
+                         help="Cantidades de pedidos activos a medir, separadas por coma")
+    kitchen.add_argument('--repeat', type=int, default=20)
+
+    json_bench = subparsers.add_parser('json', help="Serialización JSON: convert_decimals vs FastJSONResponse")
+    json_bench.add_argument('--rows', type=int, default=10000)
+    json_bench.add_argument('--repeat', type=int, default=20)
+
+    login = subparsers.add_parser('login', help="Login: verificación en el event loop vs pool de procesos")
+    login.add_argument('--logins', type=int, default=40)
+    login.add_argument('--concurrency', type=int, default=8)
+    login.add_argument('--rounds', type=int, default=None, help="Por defecto PASSWORD_ROUNDS")
+    login.add_argument('--workers', type=int, default=None, help="Por defecto PASSWORD_WORKERS")
+
+    args = parser.parse_args()
+
+    if args.command == 'kitchen':
+        bench_kitchen([int(n) for n in args.orders.split(',')], args.repeat)
+    elif args.command == 'json':
+        bench_json(args.rows, args.repeat)
+    elif args.command == 'login':
+        from config import PASSWORD_ROUNDS, PASSWORD_WORKERS
+        bench_login(args.logins, args.concurrency, args.rounds or PASSWORD_ROUNDS,
+                    args.workers or PASSWORD_WORKERS)
+    return True
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
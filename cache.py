@@ -0,0 +1,62 @@
+"""Caché en memoria acotada (LRU) con expiración por tiempo"""
+from collections import OrderedDict
+import threading
+import time
+
+_MISSING = object()
+
+class TTLCache:
+    """Diccionario con tamaño máximo (descarta el menos usado) y TTL por entrada"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, default=None):
+        """Devuelve el valor vigente o `default` si no existe o expiró"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._data[key]
+            self._stats['misses'] += 1
+            return default
+
+    def set(self, key, value):
+        """Guarda un valor reiniciando su TTL"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key):
+        """Elimina una entrada si existe"""
+        with self._lock:
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        with self._lock:
+            self._stats['invalidations'] += len(self._data)
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            data = dict(self._stats)
+            data.update({'size': len(self._data), 'maxsize': self.maxsize, 'ttl': self.ttl})
+        return data
@@ -0,0 +1,211 @@
+"""Carritos del POS guardados en el servidor
+
+La cookie de sesión solo lleva un `cart_id`; el contenido (cantidades por
+producto y código de descuento) vive aquí. El backend en memoria sirve para un
+solo proceso; con varios workers en la misma máquina usa CART_BACKEND=sqlite
+para que todos vean el mismo carrito.
+"""
+from typing import Callable, Dict, Optional
+from config import CART_BACKEND, CART_SQLITE_PATH, CART_TTL
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+def new_cart_id() -> str:
+    """Identificador aleatorio para un carrito nuevo"""
+    return uuid.uuid4().hex
+
+def empty_cart() -> Dict:
+    """Carrito vacío: cantidades por ID de producto, código de descuento y token
+
+    El token identifica esta "generación" del carrito: cambia cada vez que el
+    carrito se vacía (p. ej. al confirmar), aunque el `cart_id` de la cookie sea
+    el mismo. Es la llave de idempotencia del pedido.
+    """
+    return {'items': {}, 'discount_code': None, 'token': uuid.uuid4().hex}
+
+def _normalize(cart: Dict) -> Dict:
+    # JSON convierte las llaves a texto; los IDs de producto se manejan como int
+    return {
+        'items': {int(product_id): int(qty) for product_id, qty in cart.get('items', {}).items() if int(qty) > 0},
+        'discount_code': cart.get('discount_code'),
+        # Los carritos guardados antes de existir el token reciben uno al escribirse
+        'token': cart.get('token'),
+    }
+
+def _with_token(cart: Dict) -> Dict:
+    if not cart['token']:
+        cart['token'] = uuid.uuid4().hex
+    return cart
+
+class MemoryCartBackend:
+    """Carritos en un dict del proceso con expiración por inactividad"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._carts = {}  # cart_id -> (cart, expira_en)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _purge(self, now: float):
+        expired = [cart_id for cart_id, (_, expires_at) in self._carts.items() if expires_at <= now]
+        for cart_id in expired:
+            del self._carts[cart_id]
+
+    def load(self, cart_id: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._carts.get(cart_id)
+            if item is None or item[1] <= now:
+                return None
+            return _normalize(item[0])
+
+    def update(self, cart_id: str, mutate: Callable[[Dict], None]) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            item = self._carts.get(cart_id)
+            cart = _with_token(_normalize(item[0])) if item and item[1] > now else empty_cart()
+            mutate(cart)
+            self._carts[cart_id] = (cart, now + self.ttl)
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._purge(now)
+            return _normalize(cart)
+
+    def delete(self, cart_id: str):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'backend': 'memory', 'carts': len(self._carts), 'ttl': self.ttl}
+
+class SQLiteCartBackend:
+    """Carritos en un archivo SQLite local, compartido entre workers de la misma máquina"""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS carts (
+                cart_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_carts_updated ON carts (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo; isolation_level=None para controlar las transacciones
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, cart_id: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT data FROM carts WHERE cart_id = ? AND updated_at > ?",
+            (cart_id, time.time() - self.ttl)
+        ).fetchone()
+        return _normalize(json.loads(row[0])) if row else None
+
+    def update(self, cart_id: str, mutate: Callable[[Dict], None]) -> Dict:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM carts WHERE cart_id = ? AND updated_at > ?",
+                (cart_id, now - self.ttl)
+            ).fetchone()
+            cart = _with_token(_normalize(json.loads(row[0]))) if row else empty_cart()
+            mutate(cart)
+            conn.execute(
+                "INSERT OR REPLACE INTO carts (cart_id, data, updated_at) VALUES (?, ?, ?)",
+                (cart_id, json.dumps(cart), now)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute("DELETE FROM carts WHERE updated_at <= ?", (now - self.ttl,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return _normalize(cart)
+
+    def delete(self, cart_id: str):
+        self._conn().execute("DELETE FROM carts WHERE cart_id = ?", (cart_id,))
+
+    def stats(self) -> Dict:
+        count = self._conn().execute(
+            "SELECT COUNT(*) FROM carts WHERE updated_at > ?", (time.time() - self.ttl,)
+        ).fetchone()[0]
+        return {'backend': 'sqlite', 'path': self.path, 'carts': count, 'ttl': self.ttl}
+
+class CartStore:
+    """Operaciones del carrito sobre un backend (memoria o SQLite)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, cart_id: str) -> Dict:
+        """Contenido del carrito (vacío si no existe o expiró)"""
+        cart = self.backend.load(cart_id)
+        if cart is None:
+            return empty_cart()
+        if not cart['token']:
+            # Carrito anterior al token: se le asigna uno de forma atómica
+            cart = self.backend.update(cart_id, lambda cart: None)
+        return cart
+
+    def update(self, cart_id: str, mutate: Callable[[Dict], None]) -> Dict:
+        """Aplica `mutate(cart)` de forma atómica y retorna el carrito resultante"""
+        return self.backend.update(cart_id, mutate)
+
+    def add(self, cart_id: str, product_id: int, qty: int = 1) -> Dict:
+        """Suma `qty` unidades de un producto"""
+        def mutate(cart):
+            cart['items'][product_id] = cart['items'].get(product_id, 0) + qty
+        return self.backend.update(cart_id, mutate)
+
+    def remove(self, cart_id: str, product_id: int, qty: int = 1) -> Dict:
+        """Quita `qty` unidades de un producto (la línea desaparece al llegar a 0)"""
+        def mutate(cart):
+            remaining = cart['items'].get(product_id, 0) - qty
+            if remaining > 0:
+                cart['items'][product_id] = remaining
+            else:
+                cart['items'].pop(product_id, None)
+        return self.backend.update(cart_id, mutate)
+
+    def set_discount(self, cart_id: str, discount_code: Optional[str]) -> Dict:
+        """Guarda (o quita, con None) el código de descuento"""
+        def mutate(cart):
+            cart['discount_code'] = discount_code
+        return self.backend.update(cart_id, mutate)
+
+    def clear(self, cart_id: str):
+        """Vacía el carrito; el siguiente uso del mismo cart_id empieza con otro token"""
+        self.backend.delete(cart_id)
+
+    def stats(self) -> Dict:
+        """Cantidad de carritos vigentes y configuración"""
+        return self.backend.stats()
+
+def _create_store() -> CartStore:
+    if CART_BACKEND == 'sqlite':
+        return CartStore(SQLiteCartBackend(CART_SQLITE_PATH, CART_TTL))
+    return CartStore(MemoryCartBackend(CART_TTL))
+
+cart_store = _create_store()
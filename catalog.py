@@ -0,0 +1,120 @@
+"""Catálogo de productos en memoria
+
+Mantiene una copia de la tabla `productos` indexada por ID y agrupada por
+categoría para que el POS no consulte MySQL en cada render. Toda escritura
+sobre productos debe llamar a `product_catalog.invalidate()`; el TTL cubre
+los cambios hechos por otros procesos.
+"""
+from typing import Dict, List, Optional
+from database import get_db_connection
+from config import CATALOG_CACHE_TTL
+import threading
+import time
+
+def _load_products() -> List[Dict]:
+    """Lee todos los productos en el orden que usa el POS"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute("SELECT * FROM productos ORDER BY categoria, nombre")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+class _Snapshot:
+    """Vista inmutable del catálogo en un momento dado"""
+    __slots__ = ('generation', 'loaded_at', 'version', 'all', 'active', 'by_id', 'by_category')
+
+    def __init__(self, generation: int, version: int, products: List[Dict]):
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self.version = version
+        self.all = products
+        self.active = [p for p in products if p['activo']]
+        self.by_id = {p['id']: p for p in products}
+        self.by_category = {}
+        for product in self.active:
+            self.by_category.setdefault(product['categoria'], []).append(product)
+
+class ProductCatalog:
+    """Caché versionada del catálogo de productos con TTL e invalidación explícita"""
+
+    def __init__(self, loader=_load_products, ttl: float = CATALOG_CACHE_TTL):
+        self._loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._generation = 0
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'invalidations': 0}
+
+    def _is_fresh(self, snapshot) -> bool:
+        return (snapshot is not None
+                and snapshot.generation == self._generation
+                and (self.ttl <= 0 or time.monotonic() - snapshot.loaded_at < self.ttl))
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self._stats['hits'] += 1
+            return snapshot
+        
+        with self._lock:
+            # Otro hilo pudo haber recargado mientras esperábamos
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self._stats['hits'] += 1
+                return snapshot
+            self._stats['misses'] += 1
+            generation = self._generation
+            products = self._loader()
+            self._version += 1
+            snapshot = _Snapshot(generation, self._version, products)
+            self._snapshot = snapshot
+            self._stats['reloads'] += 1
+            return snapshot
+
+    def invalidate(self):
+        """Marca el catálogo como obsoleto; la siguiente lectura lo recarga"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def get_products(self, active_only: bool = True) -> List[Dict]:
+        """Productos ordenados por categoría y nombre"""
+        snapshot = self._current()
+        return list(snapshot.active if active_only else snapshot.all)
+
+    def get_by_category(self) -> Dict[str, List[Dict]]:
+        """Productos activos agrupados por categoría (en orden de categoría)"""
+        snapshot = self._current()
+        return {categoria: list(products) for categoria, products in snapshot.by_category.items()}
+
+    def get(self, product_id: int) -> Optional[Dict]:
+        """Producto por ID (incluye inactivos)"""
+        return self._current().by_id.get(product_id)
+
+    def get_many(self, product_ids: List[int]) -> Dict[int, Dict]:
+        """Productos por ID; los IDs inexistentes se omiten"""
+        by_id = self._current().by_id
+        return {pid: by_id[pid] for pid in product_ids if pid in by_id}
+
+    @property
+    def version(self) -> int:
+        return self._current().version
+
+    def stats(self) -> Dict:
+        """Contadores de uso de la caché"""
+        snapshot = self._snapshot
+        data = dict(self._stats)
+        data.update({
+            'version': snapshot.version if snapshot else 0,
+            'products': len(snapshot.all) if snapshot else 0,
+            'fresh': self._is_fresh(snapshot),
+            'ttl': self.ttl,
+        })
+        return data
+
+product_catalog = ProductCatalog()
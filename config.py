@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde .env
@@ -33,6 +34,75 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+# Configuración del pool de conexiones
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '12'))
+# Segundos que se espera por una conexión libre cuando el pool está lleno
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Segundos de vida máxima de una conexión antes de reciclarla
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+# Segundos de inactividad tras los cuales se verifica la conexión (ping) al entregarla
+DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', '30'))
+
+# Segundos que el catálogo de productos en memoria se considera vigente
+CATALOG_CACHE_TTL = float(os.getenv('CATALOG_CACHE_TTL', '300'))
+
+# Caché de usuarios autenticados: una desactivación tarda a lo sumo USER_CACHE_TTL segundos
+# en surtir efecto en otros procesos (en este proceso se invalida al instante)
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '256'))
+
+# Hilos para el trabajo bloqueante de los handlers: OLTP (POS, cocina, CRUD) y
+# reportes/PDFs van en pools separados para que un reporte no acapare los hilos del POS.
+# Mantén OLTP_WORKERS + REPORT_WORKERS + EXPORT_MAX_CONCURRENT <= DB_POOL_MAX_SIZE.
+OLTP_WORKERS = int(os.getenv('OLTP_WORKERS', '8'))
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+# Reportes que pueden esperar un hilo libre antes de responder 503
+REPORT_QUEUE_SIZE = int(os.getenv('REPORT_QUEUE_SIZE', '20'))
+
+# Filas por bloque al exportar pedidos (PDF por bloques, CSV/NDJSON)
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '500'))
+# Exportaciones CSV/NDJSON simultáneas: cada una retiene una conexión durante toda la
+# descarga; las demás reciben 503 antes de empezar
+EXPORT_MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', '2'))
+# Bytes de un PDF por bloques que se mantienen en memoria antes de pasar a un archivo temporal
+PDF_SPOOL_MAX_MEMORY = int(os.getenv('PDF_SPOOL_MAX_MEMORY', str(5 * 1024 * 1024)))
+
+# Caché en disco de PDFs de reportes de periodos cerrados
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'restaurante_reportes')
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+# Carritos del POS en el servidor: 'memory' (un proceso) o 'sqlite' (varios workers en la misma máquina)
+CART_BACKEND = os.getenv('CART_BACKEND', 'memory').lower()
+CART_SQLITE_PATH = os.getenv('CART_SQLITE_PATH') or os.path.join(tempfile.gettempdir(), 'restaurante_carritos.sqlite3')
+# Segundos de inactividad tras los cuales se descarta un carrito
+CART_TTL = float(os.getenv('CART_TTL', str(12 * 60 * 60)))
+
+# Costo (rounds) de sha256_crypt para contraseñas nuevas; los hashes con otro costo
+# se regeneran al iniciar sesión. 535000 es el valor con el que se crearon los existentes.
+PASSWORD_ROUNDS = int(os.getenv('PASSWORD_ROUNDS', '535000'))
+# Procesos que calculan hashes de contraseñas y logins que pueden esperar uno libre
+PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', '2'))
+PASSWORD_QUEUE_SIZE = int(os.getenv('PASSWORD_QUEUE_SIZE', '16'))
+
+# Límite de intentos de login (token buckets): ráfaga permitida y recarga por minuto,
+# por IP y por nombre de usuario
+LOGIN_RATE_IP_BURST = int(os.getenv('LOGIN_RATE_IP_BURST', '20'))
+LOGIN_RATE_IP_PER_MINUTE = float(os.getenv('LOGIN_RATE_IP_PER_MINUTE', '10'))
+LOGIN_RATE_USER_BURST = int(os.getenv('LOGIN_RATE_USER_BURST', '5'))
+LOGIN_RATE_USER_PER_MINUTE = float(os.getenv('LOGIN_RATE_USER_PER_MINUTE', '2'))
+# Máximo de IPs/usuarios vigilados en memoria
+LOGIN_RATE_MAX_KEYS = int(os.getenv('LOGIN_RATE_MAX_KEYS', '10000'))
+# Detrás de un proxy (Railway) la IP real viene en X-Forwarded-For; sin esto todos los
+# clientes comparten la IP del proxy. Por defecto se activa si corre en Railway.
+LOGIN_RATE_TRUST_FORWARDED = os.getenv(
+    'LOGIN_RATE_TRUST_FORWARDED', 'true' if os.getenv('RAILWAY_ENVIRONMENT') else 'false'
+).lower() in ('1', 'true', 'yes')
+
+# Cada cuántos segundos se recalculan desde MySQL las estadísticas del panel
+# (entre recálculos se actualizan en memoria con cada pedido)
+LIVE_STATS_RECONCILE_SECONDS = float(os.getenv('LIVE_STATS_RECONCILE_SECONDS', '300'))
+
 # Configuración de Seguridad
 SECRET_KEY = os.getenv('SECRET_KEY') or os.getenv('SESSION_SECRET') 
 ALGORITHM = os.getenv('ALGORITHM', 'HS256')
@@ -1,16 +1,461 @@
 import mysql.connector
 from mysql.connector import Error
-from config import DB_CONFIG
+from mysql.connector.errors import PoolError
+from collections import deque
+from config import (
+    DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_MAX_LIFETIME, DB_POOL_PING_INTERVAL, PASSWORD_ROUNDS
+)
+import threading
+import time
+
+class _PoolEntry:
+    """Conexión física administrada por el pool"""
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class PooledConnection:
+    """Conexión prestada por el pool; close() la devuelve en lugar de cerrarla"""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        if self._entry is None:
+            raise PoolError("La conexión ya fue devuelta al pool")
+        return getattr(self._entry.raw, name)
+
+    def close(self):
+        """Devuelve la conexión al pool (llamadas repetidas no tienen efecto)"""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+    def discard(self):
+        """Cierra la conexión física en lugar de devolverla (p. ej. con un resultado sin leer)"""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._discard(entry)
+
+    def __del__(self):
+        # Una conexión olvidada sin close() regresa al pool al ser recolectada
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class ConnectionPool:
+    """Pool de conexiones MySQL con tamaño mínimo/máximo, verificación al
+    entregar, vida máxima por conexión y espera acotada cuando está lleno"""
+
+    def __init__(self, config: dict, min_size: int = DB_POOL_MIN_SIZE,
+                 max_size: int = DB_POOL_MAX_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 max_lifetime: float = DB_POOL_MAX_LIFETIME,
+                 ping_interval: float = DB_POOL_PING_INTERVAL):
+        self.config = dict(config)
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._size = 0  # conexiones abiertas (libres + prestadas)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'failed_checks': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_ms': 0.0,
+        }
+
+    def _connect(self) -> _PoolEntry:
+        entry = _PoolEntry(mysql.connector.connect(**self.config))
+        with self._cond:
+            self._stats['created'] += 1
+        return entry
+
+    def _expired(self, entry: _PoolEntry, now: float) -> bool:
+        return self.max_lifetime > 0 and now - entry.created_at >= self.max_lifetime
+
+    def _healthy(self, entry: _PoolEntry, now: float) -> bool:
+        if now - entry.last_used < self.ping_interval:
+            return True
+        try:
+            entry.raw.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _close_raw(self, entry: _PoolEntry):
+        try:
+            entry.raw.close()
+        except Error:
+            pass
+
+    def _discard(self, entry: _PoolEntry):
+        """Cierra una conexión y libera su lugar en el pool"""
+        self._close_raw(entry)
+        with self._cond:
+            self._size -= 1
+            self._stats['recycled'] += 1
+            self._cond.notify()
+
+    def warm_up(self):
+        """Abre conexiones hasta alcanzar el tamaño mínimo"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._connect()
+            except Error:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self._release(entry)
+
+    def get_connection(self) -> PooledConnection:
+        """Presta una conexión, esperando hasta `timeout` segundos si el pool está lleno"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        entry = None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("El pool de conexiones está cerrado")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolError(
+                        f"No hay conexiones disponibles (máximo {self.max_size}) "
+                        f"tras esperar {self.timeout}s"
+                    )
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                self._cond.wait(remaining)
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['wait_time_ms'] += (time.monotonic() - started) * 1000
+
+        if entry is not None:
+            now = time.monotonic()
+            if not self._expired(entry, now) and self._healthy(entry, now):
+                return PooledConnection(self, entry)
+            if not self._expired(entry, now):
+                with self._cond:
+                    self._stats['failed_checks'] += 1
+            # Reemplazar la conexión vencida o caída conservando su lugar
+            self._close_raw(entry)
+            with self._cond:
+                self._stats['recycled'] += 1
+
+        try:
+            return PooledConnection(self, self._connect())
+        except Error:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, entry: _PoolEntry):
+        """Recibe una conexión devuelta y la deja lista para el siguiente uso"""
+        now = time.monotonic()
+        if self._closed or self._expired(entry, now):
+            self._discard(entry)
+            return
+        try:
+            if entry.raw.unread_result:
+                entry.raw.consume_results()
+            if entry.raw.in_transaction:
+                entry.raw.rollback()
+        except Error:
+            self._discard(entry)
+            return
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def close(self):
+        """Cierra todas las conexiones libres y rechaza nuevos préstamos"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_raw(entry)
+
+    def stats(self) -> dict:
+        """Estadísticas actuales del pool"""
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        data['wait_time_ms'] = round(data['wait_time_ms'], 2)
+        return data
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Obtiene (y crea la primera vez) el pool de conexiones de la aplicación"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG)
+    return _pool
+
+def close_pool():
+    """Cierra el pool de conexiones (al apagar la aplicación)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def get_pool_stats() -> dict:
+    """Estadísticas del pool de conexiones"""
+    return get_pool().stats()
 
 def get_db_connection():
-    """Obtiene una conexión a la base de datos"""
+    """Obtiene una conexión del pool; al cerrarla se devuelve al pool"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        return get_pool().get_connection()
     except Error as e:
         print(f"Error conectando a MySQL: {e}")
         raise
 
+# Índices requeridos por reportes y pantallas; migrate_schema() agrega los que falten
+SCHEMA_INDEXES = [
+    # Cubre los filtros por rango de fecha y los agregados de reportes y estadísticas
+    ('pedidos', 'idx_pedidos_fecha', '(fecha_hora, estado, total, descuento, total_final, tiempo_preparacion)'),
+    # Pedidos activos de la cocina
+    ('pedidos', 'idx_pedidos_estado', '(estado, fecha_hora)'),
+    # Cubre los joins de reportes por producto desde pedidos
+    ('pedido_items', 'idx_items_pedido_producto', '(pedido_id, producto_id, producto_nombre, precio, cantidad)'),
+    ('pedido_items', 'idx_items_producto', '(producto_id)'),
+]
+
+# Columnas agregadas después de la versión inicial: (tabla, columna, definición)
+SCHEMA_COLUMNS = [
+    # Llave de idempotencia de create_order (evita pedidos duplicados por doble toque)
+    ('pedidos', 'idempotency_key', 'VARCHAR(64) NULL DEFAULT NULL'),
+]
+
+# Índices únicos; se omiten (con aviso) si los datos existentes tienen duplicados
+SCHEMA_UNIQUE_INDEXES = [
+    ('pedidos', 'uq_pedidos_numero', 'numero_pedido'),
+    ('pedidos', 'uq_pedidos_idempotency', 'idempotency_key'),
+]
+
+# Tablas del sistema; init_database() y upgrade_schema() las crean si no existen
+SCHEMA_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        nombre VARCHAR(100) NOT NULL,
+        rol ENUM('admin', 'mesero') NOT NULL,
+        activo TINYINT(1) DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pedidos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        numero_pedido VARCHAR(20) NOT NULL,
+        total DECIMAL(10,2) NOT NULL,
+        descuento DECIMAL(10,2) DEFAULT 0,
+        total_final DECIMAL(10,2) NOT NULL,
+        estado ENUM('pending', 'preparing', 'ready', 'delivered') DEFAULT 'pending',
+        fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        tiempo_preparacion INT DEFAULT NULL,
+        idempotency_key VARCHAR(64) NULL DEFAULT NULL,
+        UNIQUE INDEX uq_pedidos_numero (numero_pedido),
+        UNIQUE INDEX uq_pedidos_idempotency (idempotency_key)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Último número de pedido emitido por día (ver services.next_order_number)
+    """
+    CREATE TABLE IF NOT EXISTS pedido_secuencias (
+        fecha DATE PRIMARY KEY,
+        ultimo INT NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS productos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nombre VARCHAR(100) NOT NULL,
+        precio DECIMAL(10,2) NOT NULL,
+        categoria VARCHAR(50) NOT NULL,
+        activo TINYINT(1) DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pedido_items (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        pedido_id INT NOT NULL,
+        producto_id INT NOT NULL,
+        producto_nombre VARCHAR(100) NOT NULL,
+        precio DECIMAL(10,2) NOT NULL,
+        cantidad INT NOT NULL,
+        FOREIGN KEY (pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS descuentos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        codigo VARCHAR(20) UNIQUE NOT NULL,
+        tipo ENUM('porcentaje', 'fijo') NOT NULL,
+        valor DECIMAL(10,2) NOT NULL,
+        activo TINYINT(1) DEFAULT 1
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Tablas diarias pre-agregadas para reportes (ver rollups.py)
+    """
+    CREATE TABLE IF NOT EXISTS ventas_diarias (
+        fecha DATE PRIMARY KEY,
+        pedidos INT NOT NULL DEFAULT 0,
+        subtotal DECIMAL(12,2) NOT NULL DEFAULT 0,
+        descuentos DECIMAL(12,2) NOT NULL DEFAULT 0,
+        ventas DECIMAL(12,2) NOT NULL DEFAULT 0,
+        version INT NOT NULL DEFAULT 0,
+        actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ventas_diarias_producto (
+        fecha DATE NOT NULL,
+        producto_id INT NOT NULL,
+        producto_nombre VARCHAR(100) NOT NULL,
+        unidades INT NOT NULL DEFAULT 0,
+        ingresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+        pedidos INT NOT NULL DEFAULT 0,
+        lineas INT NOT NULL DEFAULT 0,
+        suma_precio DECIMAL(12,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, producto_id, producto_nombre)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ventas_diarias_categoria (
+        fecha DATE NOT NULL,
+        categoria VARCHAR(50) NOT NULL,
+        unidades INT NOT NULL DEFAULT 0,
+        ingresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+        pedidos INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, categoria)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """
+]
+
+def migrate_schema(cursor):
+    """Aplica cambios de esquema idempotentes sobre una base de datos existente"""
+    cursor.execute("""
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+    """)
+    existing_columns = {(table.lower(), column.lower()) for table, column in cursor.fetchall()}
+    
+    for table, column, definition in SCHEMA_COLUMNS:
+        if (table, column) not in existing_columns:
+            print(f"   ➕ Agregando columna {column} en {table}")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    
+    cursor.execute("""
+        SELECT table_name, index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE()
+    """)
+    existing = {(table.lower(), index.lower()) for table, index in cursor.fetchall()}
+    
+    for table, index_name, columns in SCHEMA_INDEXES:
+        if (table, index_name) not in existing:
+            print(f"   ➕ Creando índice {index_name} en {table}")
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} {columns}")
+    
+    for table, index_name, column in SCHEMA_UNIQUE_INDEXES:
+        if (table, index_name) in existing:
+            continue
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT {column} FROM {table} WHERE {column} IS NOT NULL "
+            f"GROUP BY {column} HAVING COUNT(*) > 1) AS duplicados"
+        )
+        if cursor.fetchone()[0]:
+            print(f"   ⚠️  No se creó {index_name}: hay valores repetidos de {column} en {table}")
+            continue
+        print(f"   ➕ Creando índice único {index_name} en {table}")
+        cursor.execute(f"ALTER TABLE {table} ADD UNIQUE INDEX {index_name} ({column})")
+    
+    # Continuar la secuencia diaria de números de pedido desde los ya emitidos
+    cursor.execute("SELECT COUNT(*) FROM pedido_secuencias")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("""
+            INSERT INTO pedido_secuencias (fecha, ultimo)
+            SELECT STR_TO_DATE(SUBSTRING(numero_pedido, 2, 8), '%Y%m%d'),
+                   MAX(CAST(SUBSTRING_INDEX(numero_pedido, '-', -1) AS UNSIGNED))
+            FROM pedidos
+            WHERE numero_pedido LIKE 'P________-%'
+            GROUP BY STR_TO_DATE(SUBSTRING(numero_pedido, 2, 8), '%Y%m%d')
+        """)
+
+def upgrade_schema():
+    """Crea las tablas que falten y aplica migrate_schema() (idempotente)
+
+    Se ejecuta al iniciar la aplicación para que un despliegue sobre una base de
+    datos existente tenga las tablas, columnas e índices que usa el código (y las
+    tablas diarias llenas con el historial).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for table in SCHEMA_TABLES:
+            cursor.execute(table)
+        migrate_schema(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    
+    # Llenar las tablas diarias la primera vez que existen junto a pedidos previos
+    from rollups import rollups_empty, backfill
+    if rollups_empty():
+        print("   📊 Generando tablas de ventas diarias a partir del historial...")
+        backfill()
+
 def init_database():
     """Inicializa la base de datos y crea las tablas si no existen"""
     try:
@@ -30,81 +475,17 @@ def init_database():
         cursor = conn.cursor()
         
         # Crear tablas
-        tables = [
-            """
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                nombre VARCHAR(100) NOT NULL,
-                rol ENUM('admin', 'mesero') NOT NULL,
-                activo TINYINT(1) DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS pedidos (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                numero_pedido VARCHAR(20) NOT NULL,
-                total DECIMAL(10,2) NOT NULL,
-                descuento DECIMAL(10,2) DEFAULT 0,
-                total_final DECIMAL(10,2) NOT NULL,
-                estado ENUM('pending', 'preparing', 'ready', 'delivered') DEFAULT 'pending',
-                fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                tiempo_preparacion INT DEFAULT NULL
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS productos (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                nombre VARCHAR(100) NOT NULL,
-                precio DECIMAL(10,2) NOT NULL,
-                categoria VARCHAR(50) NOT NULL,
-                activo TINYINT(1) DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS pedido_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                pedido_id INT NOT NULL,
-                producto_id INT NOT NULL,
-                producto_nombre VARCHAR(100) NOT NULL,
-                precio DECIMAL(10,2) NOT NULL,
-                cantidad INT NOT NULL,
-                FOREIGN KEY (pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS descuentos (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                codigo VARCHAR(20) UNIQUE NOT NULL,
-                tipo ENUM('porcentaje', 'fijo') NOT NULL,
-                valor DECIMAL(10,2) NOT NULL,
-                activo TINYINT(1) DEFAULT 1
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """
-        ]
-        
-        for table in tables:
+        for table in SCHEMA_TABLES:
             cursor.execute(table)
         
+        migrate_schema(cursor)
+        
         # Insertar usuarios de ejemplo si no existen
         cursor.execute("SELECT COUNT(*) as count FROM usuarios")
         user_count = cursor.fetchone()[0]
         
         if user_count == 0:
-            from passlib.context import CryptContext
-            import os
-            import warnings
-            
-            # Desactivar detección automática de bugs en bcrypt
-            os.environ.setdefault('PASSLIB_DISABLE_WRAP_BUG_DETECTION', '1')
-            warnings.filterwarnings("ignore", category=UserWarning, module="passlib")
-            
-            # Crear contexto de contraseñas igual que en auth.py
-            # Usar sha256_crypt como esquema principal
-            pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+            from passwords import hash_password
             
             usuarios_iniciales = [
                 ('admin', 'admin123', 'Administrador', 'admin'),
@@ -112,7 +493,7 @@ def init_database():
             ]
             
             for username, password, nombre, rol in usuarios_iniciales:
-                hashed_password = pwd_context.hash(password)
+                hashed_password = hash_password(password, PASSWORD_ROUNDS)
                 cursor.execute(
                     "INSERT INTO usuarios (username, password, nombre, rol) VALUES (%s, %s, %s, %s)",
                     (username, hashed_password, nombre, rol)
@@ -175,6 +556,12 @@ def init_database():
         cursor.close()
         conn.close()
         
+        # Llenar las tablas diarias la primera vez que existen junto a pedidos previos
+        from rollups import rollups_empty, backfill
+        if rollups_empty():
+            print("   📊 Generando tablas de ventas diarias a partir del historial...")
+            backfill()
+        
     except Error as e:
         print(f"Error inicializando base de datos: {e}")
         raise
@@ -0,0 +1,123 @@
+"""Reglas de descuento en memoria
+
+Copia de la tabla `descuentos` indexada por código para que aplicar un
+descuento en el POS no consulte MySQL. Se carga al iniciar la aplicación y
+toda escritura sobre descuentos debe llamar a `discount_rules.invalidate()`;
+el TTL (el mismo del catálogo) cubre los cambios hechos por otros procesos.
+"""
+from typing import Dict, List, Optional
+from database import get_db_connection
+from config import CATALOG_CACHE_TTL
+import threading
+import time
+
+def _load_discounts() -> List[Dict]:
+    """Lee todos los descuentos (activos e inactivos)"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        cursor.execute("SELECT * FROM descuentos")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+class DiscountRule:
+    """Descuento precompilado: tipo y valor ya convertidos a float"""
+    __slots__ = ('row', 'percentage', 'value')
+
+    def __init__(self, row: Dict):
+        self.row = row
+        self.percentage = row['tipo'] == 'porcentaje'
+        self.value = float(row['valor'])
+
+    def amount(self, total: float) -> float:
+        """Monto a descontar sobre `total` (nunca mayor que el total)"""
+        discount_amount = total * (self.value / 100) if self.percentage else self.value
+        return min(discount_amount, total)
+
+def price_discount(total: float, rule: Optional[DiscountRule]) -> Dict:
+    """Aplica una regla al total; mismo formato que services.apply_discount"""
+    if rule is None:
+        return {'total': total, 'discount': 0, 'discount_info': None}
+    discount_amount = rule.amount(total)
+    return {
+        'total': total - discount_amount,
+        'discount': discount_amount,
+        'discount_info': rule.row
+    }
+
+class _Snapshot:
+    """Reglas activas por código en un momento dado"""
+    __slots__ = ('generation', 'loaded_at', 'by_code', 'total')
+
+    def __init__(self, generation: int, rows: List[Dict]):
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self.total = len(rows)
+        self.by_code = {row['codigo'].upper(): DiscountRule(row) for row in rows if row['activo']}
+
+class DiscountRules:
+    """Tabla de reglas de descuento con TTL e invalidación explícita"""
+
+    def __init__(self, loader=_load_discounts, ttl: float = CATALOG_CACHE_TTL):
+        self._loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'invalidations': 0}
+
+    def _is_fresh(self, snapshot) -> bool:
+        return (snapshot is not None
+                and snapshot.generation == self._generation
+                and (self.ttl <= 0 or time.monotonic() - snapshot.loaded_at < self.ttl))
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self._stats['hits'] += 1
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self._stats['hits'] += 1
+                return snapshot
+            self._stats['misses'] += 1
+            snapshot = _Snapshot(self._generation, self._loader())
+            self._snapshot = snapshot
+            self._stats['reloads'] += 1
+            return snapshot
+
+    def refresh(self):
+        """Recarga las reglas de inmediato (al iniciar la aplicación)"""
+        self.invalidate()
+        self._current()
+
+    def invalidate(self):
+        """Marca las reglas como obsoletas; la siguiente lectura las recarga"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def get(self, code: Optional[str]) -> Optional[DiscountRule]:
+        """Regla activa para un código (sin distinguir mayúsculas)"""
+        if not code:
+            return None
+        return self._current().by_code.get(code.strip().upper())
+
+    def stats(self) -> Dict:
+        """Contadores de uso de la caché"""
+        snapshot = self._snapshot
+        data = dict(self._stats)
+        data.update({
+            'active': len(snapshot.by_code) if snapshot else 0,
+            'discounts': snapshot.total if snapshot else 0,
+            'fresh': self._is_fresh(snapshot),
+            'ttl': self.ttl,
+        })
+        return data
+
+discount_rules = DiscountRules()
@@ -0,0 +1,70 @@
+"""Pub/sub en proceso para notificar cambios de pedidos a las pantallas conectadas"""
+from typing import Dict, Optional
+import asyncio
+import threading
+import uuid
+
+class EventHub:
+    """Distribuye eventos a suscriptores asyncio; publish() es seguro desde cualquier hilo"""
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers = {}  # asyncio.Queue -> loop del suscriptor
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'dropped': 0}
+        # Identifica este proceso: las versiones de otro hub no son comparables
+        self.instance = uuid.uuid4().hex[:8]
+
+    def version(self) -> str:
+        """Versión actual del hub ("instancia:eventos publicados")
+
+        Una página que guarda la versión antes de leer sus datos y la compara al
+        suscribirse sabe si se publicaron eventos que no llegó a recibir.
+        """
+        with self._lock:
+            return f"{self.instance}:{self._stats['published']}"
+
+    def subscribe(self) -> asyncio.Queue:
+        """Registra un suscriptor (debe llamarse dentro del event loop)"""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Elimina un suscriptor"""
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def _deliver(self, queue: asyncio.Queue, event: Dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # El cliente no alcanza a consumir: vaciar y pedirle que recargue todo
+            self._stats['dropped'] += 1
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({'type': 'resync', 'data': {}})
+
+    def publish(self, event_type: str, data: Optional[Dict] = None):
+        """Envía un evento a todos los suscriptores"""
+        event = {'type': event_type, 'data': data or {}}
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+            self._stats['published'] += 1
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró
+                self.unsubscribe(queue)
+
+    def stats(self) -> Dict:
+        """Contadores del hub"""
+        with self._lock:
+            data = dict(self._stats)
+            data['subscribers'] = len(self._subscribers)
+        return data
+
+# Eventos de pedidos para las pantallas de cocina
+kitchen_hub = EventHub()
@@ -0,0 +1,187 @@
+"""Pools acotados para el trabajo bloqueante (BD, generación de PDFs y hash de contraseñas)"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from config import OLTP_WORKERS, REPORT_WORKERS, REPORT_QUEUE_SIZE, PASSWORD_WORKERS, PASSWORD_QUEUE_SIZE
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+
+class ExecutorBusy(RuntimeError):
+    """La cola del executor está llena"""
+
+class BoundedExecutor:
+    """ThreadPoolExecutor con cola acotada y métricas de espera/ejecución
+
+    max_queue es el número de tareas que pueden esperar un hilo libre además de
+    las que se ejecutan; 0 significa sin límite.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = 0):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = self._create_executor()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+            'max_queue_depth': 0, 'wait_time_ms': 0.0, 'max_wait_ms': 0.0, 'run_time_ms': 0.0,
+        }
+
+    def _create_executor(self):
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+    def _admit(self, bounded: bool = True):
+        """Reserva un lugar en el pool o lanza ExecutorBusy si la cola está llena
+
+        Con bounded=False nunca se rechaza (trabajo que no puede quedarse sin hacer).
+        """
+        with self._lock:
+            if bounded and self.max_queue and self._pending >= self.max_workers + self.max_queue:
+                self._stats['rejected'] += 1
+                raise ExecutorBusy(f"El pool '{self.name}' está saturado, intenta de nuevo en unos segundos")
+            self._pending += 1
+            self._stats['submitted'] += 1
+            queue_depth = max(0, self._pending - self.max_workers)
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], queue_depth)
+
+    def _call(self, enqueued_at: float, func):
+        started = time.perf_counter()
+        waited = (started - enqueued_at) * 1000
+        with self._lock:
+            self._running += 1
+            self._stats['wait_time_ms'] += waited
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], waited)
+        ok = False
+        try:
+            result = func()
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._stats['completed' if ok else 'failed'] += 1
+                self._stats['run_time_ms'] += (time.perf_counter() - started) * 1000
+
+    def _submit(self, func, args, kwargs):
+        # Conservar contextvars como lo hace run_in_threadpool
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        try:
+            future = self._executor.submit(self._call, time.perf_counter(), call)
+        except RuntimeError:
+            # El executor ya no acepta tareas (apagado)
+            self._done(None)
+            raise
+        # También se descuenta si la tarea se cancela antes de empezar
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, func, *args, **kwargs):
+        """Ejecuta func(*args, **kwargs) en el pool y espera el resultado sin bloquear el event loop"""
+        self._admit()
+        return await asyncio.wrap_future(self._submit(func, args, kwargs))
+
+    async def run_admitted(self, func, *args, **kwargs):
+        """Como run(), pero sin rechazar por cola llena
+
+        Para continuar un trabajo que ya fue admitido (los bloques de una
+        exportación en curso): fallar a mitad cortaría una respuesta ya iniciada.
+        """
+        self._admit(bounded=False)
+        return await asyncio.wrap_future(self._submit(func, args, kwargs))
+
+    def submit(self, func, *args, **kwargs):
+        """Encola func(*args, **kwargs) sin esperar el resultado y sin límite de cola
+
+        Para limpiezas que deben ocurrir aunque el pool esté saturado (p. ej.
+        cerrar el cursor de una descarga cancelada).
+        """
+        self._admit(bounded=False)
+        return self._submit(func, args, kwargs)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool"""
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        """Métricas del pool"""
+        with self._lock:
+            data = dict(self._stats)
+            data.update({
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queue_depth': max(0, self._pending - self._running),
+            })
+        started = data['completed'] + data['failed']
+        data['avg_wait_ms'] = round(data['wait_time_ms'] / started, 2) if started else 0.0
+        data['avg_run_ms'] = round(data['run_time_ms'] / started, 2) if started else 0.0
+        for key in ('wait_time_ms', 'max_wait_ms', 'run_time_ms'):
+            data[key] = round(data[key], 2)
+        return data
+
+class ProcessBoundedExecutor(BoundedExecutor):
+    """BoundedExecutor sobre procesos, para trabajo de CPU que retiene el GIL
+
+    La función y sus argumentos deben poder serializarse con pickle. Como la
+    tarea corre en otro proceso, el tiempo de ejecución medido incluye la espera
+    en la cola del pool.
+    """
+
+    def _create_executor(self):
+        # spawn: los hijos no heredan hilos ni conexiones abiertas del proceso principal
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    async def run(self, func, *args, **kwargs):
+        """Ejecuta func(*args, **kwargs) en un proceso del pool"""
+        self._admit()
+        started = time.perf_counter()
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except RuntimeError:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        ok = False
+        try:
+            result = await asyncio.wrap_future(future)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._stats['completed' if ok else 'failed'] += 1
+                self._stats['run_time_ms'] += (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        """Métricas del pool (las tareas en curso se estiman con las pendientes)"""
+        with self._lock:
+            self._running = min(self._pending, self.max_workers)
+        return super().stats()
+
+# Consultas cortas del POS, cocina y CRUD del panel
+oltp_executor = BoundedExecutor('oltp', OLTP_WORKERS)
+# Reportes y PDFs: pocos hilos para que nunca ocupen los del POS
+report_executor = BoundedExecutor('reports', REPORT_WORKERS, REPORT_QUEUE_SIZE)
+# Hash y verificación de contraseñas: procesos aparte para no detener el event loop
+password_executor = ProcessBoundedExecutor('passwords', PASSWORD_WORKERS, PASSWORD_QUEUE_SIZE)
+
+def shutdown_executors():
+    """Detiene los pools al apagar la aplicación"""
+    oltp_executor.shutdown(wait=False)
+    report_executor.shutdown(wait=False)
+    password_executor.shutdown(wait=False)
+
+def executor_stats() -> dict:
+    """Métricas de todos los pools"""
+    return {
+        'oltp': oltp_executor.stats(),
+        'reports': report_executor.stats(),
+        'passwords': password_executor.stats(),
+    }
@@ -25,6 +25,8 @@ USE restaurante_db;
 -- ====================================================================
 -- CREAR TABLAS
 -- ====================================================================
+-- NOTA: Si las tablas ya existían, los índices nuevos no se crean aquí;
+-- ejecuta `python init_db.py` para aplicar las migraciones pendientes.
 
 -- Tabla de usuarios
 CREATE TABLE IF NOT EXISTS usuarios (
@@ -56,7 +58,18 @@ CREATE TABLE IF NOT EXISTS pedidos (
     total_final DECIMAL(10,2) NOT NULL,
     estado ENUM('pending', 'preparing', 'ready', 'delivered') DEFAULT 'pending',
     fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    tiempo_preparacion INT DEFAULT NULL
+    tiempo_preparacion INT DEFAULT NULL,
+    idempotency_key VARCHAR(64) NULL DEFAULT NULL,
+    UNIQUE INDEX uq_pedidos_numero (numero_pedido),
+    UNIQUE INDEX uq_pedidos_idempotency (idempotency_key),
+    INDEX idx_pedidos_fecha (fecha_hora, estado, total, descuento, total_final, tiempo_preparacion),
+    INDEX idx_pedidos_estado (estado, fecha_hora)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Último número de pedido emitido por día (secuencia sin colisiones)
+CREATE TABLE IF NOT EXISTS pedido_secuencias (
+    fecha DATE PRIMARY KEY,
+    ultimo INT NOT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Tabla de items de pedidos
@@ -67,6 +80,8 @@ CREATE TABLE IF NOT EXISTS pedido_items (
     producto_nombre VARCHAR(100) NOT NULL,
     precio DECIMAL(10,2) NOT NULL,
     cantidad INT NOT NULL,
+    INDEX idx_items_pedido_producto (pedido_id, producto_id, producto_nombre, precio, cantidad),
+    INDEX idx_items_producto (producto_id),
     FOREIGN KEY (pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -79,6 +94,39 @@ CREATE TABLE IF NOT EXISTS descuentos (
     activo TINYINT(1) DEFAULT 1
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Tablas diarias pre-agregadas para reportes (ver rollups.py)
+-- Para llenarlas con pedidos existentes: python init_db.py --backfill-rollups
+CREATE TABLE IF NOT EXISTS ventas_diarias (
+    fecha DATE PRIMARY KEY,
+    pedidos INT NOT NULL DEFAULT 0,
+    subtotal DECIMAL(12,2) NOT NULL DEFAULT 0,
+    descuentos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    ventas DECIMAL(12,2) NOT NULL DEFAULT 0,
+    version INT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS ventas_diarias_producto (
+    fecha DATE NOT NULL,
+    producto_id INT NOT NULL,
+    producto_nombre VARCHAR(100) NOT NULL,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    pedidos INT NOT NULL DEFAULT 0,
+    lineas INT NOT NULL DEFAULT 0,
+    suma_precio DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, producto_id, producto_nombre)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS ventas_diarias_categoria (
+    fecha DATE NOT NULL,
+    categoria VARCHAR(50) NOT NULL,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    pedidos INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, categoria)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- ====================================================================
 -- INSERTAR USUARIOS
 -- ====================================================================
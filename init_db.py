@@ -5,12 +5,24 @@ Sistema de Pedidos - Restaurante Sazón Mexicano
 
 Uso:
     python init_db.py
+    python init_db.py --check-plans [--date YYYY-MM-DD]
+    python init_db.py --backfill-rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
 
 Este script debe ejecutarse una vez antes de iniciar la aplicación,
 especialmente cuando se despliega en Railway u otros servicios en la nube.
+Volver a ejecutarlo aplica las migraciones pendientes (por ejemplo, índices).
+
+--check-plans ejecuta EXPLAIN sobre las consultas de reportes y falla si
+alguna recorre una tabla completa (ejecutar con datos realistas: con tablas
+casi vacías MySQL puede preferir un escaneo completo).
+
+--backfill-rollups reconstruye las tablas de ventas diarias (todo el
+historial o el rango indicado) a partir de pedidos y pedido_items.
 """
 
+import argparse
 import sys
+from datetime import datetime
 from database import init_database
 
 def main():
@@ -49,7 +61,48 @@ def main():
         traceback.print_exc()
         return False
 
+def check_query_plans(sample_date=None):
+    """Verifica con EXPLAIN que las consultas de reportes usen índices"""
+    from routers.reports import explain_report_queries
+    
+    print("🔍 Verificando planes de ejecución de reportes...")
+    full_scans = explain_report_queries(sample_date)
+    if not full_scans:
+        print("✅ Ninguna consulta de reportes recorre tablas completas")
+        return True
+    
+    print("❌ Consultas con escaneo completo de tabla:")
+    for scan in full_scans:
+        print(f"   - {scan['query']}: tabla {scan['table']} (~{scan['rows']} filas)")
+    print("   Ejecuta `python init_db.py` para crear los índices faltantes")
+    return False
+
+def backfill_rollups(start_date=None, end_date=None):
+    """Reconstruye las tablas de ventas diarias"""
+    from rollups import backfill
+    
+    print("📊 Reconstruyendo tablas de ventas diarias...")
+    days = backfill(start_date, end_date)
+    print(f"✅ {days} días con ventas reconstruidos")
+    return True
+
 if __name__ == '__main__':
-    success = main()
+    parser = argparse.ArgumentParser(description="Inicializa la base de datos")
+    parser.add_argument('--check-plans', action='store_true',
+                        help="Verifica con EXPLAIN que los reportes no escaneen tablas completas")
+    parser.add_argument('--date', help="Día de ejemplo para --check-plans (YYYY-MM-DD)")
+    parser.add_argument('--backfill-rollups', action='store_true',
+                        help="Reconstruye las tablas de ventas diarias")
+    parser.add_argument('--start', help="Primer día para --backfill-rollups (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Último día para --backfill-rollups (YYYY-MM-DD)")
+    args = parser.parse_args()
+    
+    parse_date = lambda value: datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    if args.check_plans:
+        success = check_query_plans(parse_date(args.date))
+    elif args.backfill_rollups:
+        success = backfill_rollups(parse_date(args.start), parse_date(args.end))
+    else:
+        success = main()
     sys.exit(0 if success else 1)
 
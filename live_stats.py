@@ -0,0 +1,170 @@
+"""Estadísticas del día para el panel de administración, en memoria
+
+Contadores del día en curso (pedidos, ventas, tiempo de preparación y pedidos
+en preparación) que `create_order` y `update_order_status` actualizan al
+confirmar cada cambio, así leerlos no consulta MySQL. A la medianoche de
+Guatemala se reinician, y cada LIVE_STATS_RECONCILE_SECONDS se recalculan desde
+la base de datos para corregir lo que hayan escrito otros procesos.
+"""
+from typing import Dict, Optional
+from datetime import date, datetime
+from decimal import Decimal
+from database import get_db_connection
+from config import LIVE_STATS_RECONCILE_SECONDS
+from utils import get_guatemala_time, day_bounds
+import threading
+import time
+
+# Rango semiabierto sobre fecha_hora para aprovechar idx_pedidos_fecha
+ADMIN_STATS_SQL = """
+    SELECT
+        COUNT(*) as total_pedidos,
+        COALESCE(SUM(total_final), 0) as ventas_totales,
+        COALESCE(SUM(tiempo_preparacion), 0) as tiempo_total,
+        COUNT(tiempo_preparacion) as pedidos_con_tiempo,
+        COALESCE(SUM(CASE WHEN estado = 'preparing' THEN 1 ELSE 0 END), 0) as en_preparacion
+    FROM pedidos
+    WHERE fecha_hora >= %s AND fecha_hora < %s
+"""
+
+def _load_day(day: date) -> Dict:
+    """Agregados de los pedidos de `day` calculados por MySQL"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        cursor.execute(ADMIN_STATS_SQL, day_bounds(day))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+class LiveAdminStats:
+    """Contadores del día con reinicio a medianoche y reconciliación periódica"""
+
+    def __init__(self, loader=_load_day, reconcile_every: float = LIVE_STATS_RECONCILE_SECONDS):
+        self._loader = loader
+        self.reconcile_every = reconcile_every
+        self._lock = threading.Lock()
+        self._day = None
+        self._loaded = False
+        self._reconciled_at = 0.0
+        self._changes = 0
+        self._reset()
+        self._stats = {'reads': 0, 'reconciles': 0, 'skipped_reconciles': 0, 'drift': 0, 'day_resets': 0}
+
+    def _reset(self):
+        self._orders = 0
+        self._sales = Decimal('0')
+        self._prep_total = 0
+        self._prep_orders = 0
+        self._preparing = 0
+
+    def _roll(self, today: date):
+        """Reinicia los contadores si cambió el día (llamar con el lock tomado)"""
+        if self._day != today:
+            if self._day is not None:
+                self._stats['day_resets'] += 1
+            self._day = today
+            self._reset()
+
+    def _is_today(self, fecha_hora) -> bool:
+        """Roll al día actual y verifica que el pedido pertenezca a él (con el lock tomado)"""
+        self._roll(get_guatemala_time().date())
+        return self._loaded and _as_date(fecha_hora) == self._day
+
+    def order_created(self, order: Dict):
+        """Suma un pedido recién confirmado"""
+        with self._lock:
+            self._changes += 1
+            if not self._is_today(order.get('fecha_hora')):
+                return
+            self._orders += 1
+            self._sales += Decimal(str(order.get('total_final') or 0))
+            if order.get('tiempo_preparacion') is not None:
+                self._prep_total += order['tiempo_preparacion']
+                self._prep_orders += 1
+            if order.get('estado') == 'preparing':
+                self._preparing += 1
+
+    def order_status_changed(self, fecha_hora, old_status: Optional[str], new_status: str,
+                             old_time: Optional[int] = None, new_time: Optional[int] = None):
+        """Aplica un cambio de estado (y de tiempo de preparación) ya confirmado"""
+        with self._lock:
+            self._changes += 1
+            if not self._is_today(fecha_hora):
+                return
+            if old_status == 'preparing':
+                self._preparing -= 1
+            if new_status == 'preparing':
+                self._preparing += 1
+            if new_time is not None:
+                if old_time is not None:
+                    self._prep_total -= old_time
+                    self._prep_orders -= 1
+                self._prep_total += new_time
+                self._prep_orders += 1
+
+    def reconcile(self):
+        """Recalcula los contadores del día desde MySQL"""
+        with self._lock:
+            today = get_guatemala_time().date()
+            self._roll(today)
+            changes = self._changes
+        row = self._loader(today)
+        with self._lock:
+            self._reconciled_at = time.monotonic()
+            if self._day != today or (self._loaded and self._changes != changes):
+                # Un pedido cambió mientras se consultaba: la lectura puede no incluirlo;
+                # se conservan los contadores y se reintenta en el siguiente periodo
+                self._stats['skipped_reconciles'] += 1
+                return
+            orders = int(row['total_pedidos'] or 0)
+            if self._loaded and orders != self._orders:
+                self._stats['drift'] += 1
+            self._orders = orders
+            self._sales = Decimal(str(row['ventas_totales'] or 0))
+            self._prep_total = int(row['tiempo_total'] or 0)
+            self._prep_orders = int(row['pedidos_con_tiempo'] or 0)
+            self._preparing = int(row['en_preparacion'] or 0)
+            self._loaded = True
+            self._stats['reconciles'] += 1
+
+    def _needs_reconcile(self) -> bool:
+        return (not self._loaded
+                or (self.reconcile_every > 0 and time.monotonic() - self._reconciled_at >= self.reconcile_every))
+
+    def get(self) -> Dict:
+        """Estadísticas del día con las mismas llaves que la consulta original del panel"""
+        if self._needs_reconcile():
+            self.reconcile()
+        with self._lock:
+            self._roll(get_guatemala_time().date())
+            self._stats['reads'] += 1
+            return {
+                'total_pedidos': self._orders,
+                'ventas_totales': self._sales,
+                'tiempo_promedio': self._prep_total / self._prep_orders if self._prep_orders else 0,
+                'en_preparacion': self._preparing,
+            }
+
+    def stats(self) -> Dict:
+        """Contadores de uso y estado de la reconciliación"""
+        with self._lock:
+            data = dict(self._stats)
+            data.update({
+                'day': self._day.isoformat() if self._day else None,
+                'loaded': self._loaded,
+                'seconds_since_reconcile': round(time.monotonic() - self._reconciled_at, 1) if self._loaded else None,
+                'reconcile_every': self.reconcile_every,
+            })
+        return data
+
+live_admin_stats = LiveAdminStats()
@@ -5,27 +5,51 @@ from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
 from config import SECRET_KEY
+from database import get_pool, close_pool, upgrade_schema
+from executors import shutdown_executors
+from discount_rules import discount_rules
+from responses import FastJSONResponse
+from mysql.connector import Error
 import os
 
 # Importar routers
-from routers import auth, pos, kitchen, admin, ticket, users, reports, products, discounts
+from routers import auth, pos, kitchen, admin, ticket, users, reports, products, discounts, system
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestiona el ciclo de vida de la aplicación"""
     # Startup
     print("🚀 Aplicación iniciada")
-    print("📝 NOTA: La base de datos debe inicializarse manualmente usando: python init_db.py")
+    print("📝 NOTA: Una base de datos nueva debe inicializarse manualmente usando: python init_db.py")
+    try:
+        get_pool().warm_up()
+    except Error as e:
+        print(f"⚠️  No se pudo precalentar el pool de conexiones: {e}")
+    try:
+        # Tablas, columnas e índices agregados después de init_db.py (idempotente)
+        upgrade_schema()
+    except Error as e:
+        print(f"⚠️  No se pudo actualizar el esquema de la base de datos: {e}")
+    try:
+        discount_rules.refresh()
+    except Error as e:
+        print(f"⚠️  No se pudieron cargar los descuentos: {e}")
     yield
-    # Shutdown (si es necesario)
+    # Shutdown
+    shutdown_executors()
+    close_pool()
     print("🛑 Aplicación cerrada")
 
 # Crear aplicación con lifespan
-app = FastAPI(title="Sistema de Pedidos - Restaurante Sazón Mexicano", lifespan=lifespan)
+app = FastAPI(title="Sistema de Pedidos - Restaurante Sazón Mexicano", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
 
 # Configurar sesiones
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
+# Archivos estáticos (JS del panel de administración)
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
 # Configurar templates
 templates = Jinja2Templates(directory="templates")
 
@@ -39,6 +63,7 @@ app.include_router(users.router)
 app.include_router(reports.router)
 app.include_router(products.router)
 app.include_router(discounts.router)
+app.include_router(system.router)
 
 @app.get("/")
 async def root(request: Request):
@@ -0,0 +1,148 @@
+"""Paginación por llave (keyset) para los listados de la API
+
+En lugar de OFFSET, cada página continúa después de la última fila de la
+anterior: `after` es un cursor opaco con los valores de las columnas de orden
+de esa fila. El costo de una página no crece con el número de página y el
+orden es estable porque las columnas de orden terminan siempre en `id`.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+def encode_cursor(values: Sequence) -> str:
+    """Cursor opaco (base64 URL) con los valores de orden de una fila"""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token: Optional[str], size: int) -> Optional[List]:
+    """Valores de un cursor; ValueError si no es válido para `size` columnas"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = [_decode_value(value) for value in json.loads(raw)]
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginación inválido") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Cursor de paginación inválido")
+    return values
+
+def row_key(row: Dict, order: Sequence[Tuple[str, bool]]) -> List:
+    """Valores de las columnas de orden de una fila"""
+    return [row[column] for column, _ in order]
+
+def keyset_condition(order: Sequence[Tuple[str, bool]], values: Sequence) -> Tuple[str, List]:
+    """Condición SQL "fila después de `values`" para un orden [(columna, descendente), ...]
+
+    Se expande como a > x OR (a = x AND (b > y OR ...)) para que MySQL pueda
+    usar el índice de la primera columna.
+    """
+    (column, descending), *rest = order
+    operator = '<' if descending else '>'
+    if not rest:
+        return f"{column} {operator} %s", [values[0]]
+    inner, inner_params = keyset_condition(rest, values[1:])
+    return (f"({column} {operator} %s OR ({column} = %s AND {inner}))",
+            [values[0], values[0]] + inner_params)
+
+def order_by(order: Sequence[Tuple[str, bool]]) -> str:
+    return ", ".join(f"{column} DESC" if descending else column for column, descending in order)
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Tamaño de página entre 1 y MAX_PAGE_SIZE"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def fetch_page(cursor, select_sql: str, where: List[str], params: List,
+               order: Sequence[Tuple[str, bool]], limit: Optional[int] = None,
+               after: Optional[str] = None, with_total: bool = False) -> Tuple[List[Dict], Dict]:
+    """Ejecuta una consulta paginada sobre un cursor con dictionary=True
+
+    `select_sql` es "SELECT ... FROM tabla" sin WHERE ni ORDER BY; `where` son
+    las condiciones de los filtros. Retorna (filas, paginación); el total solo
+    se cuenta si `with_total` (es otra consulta sobre todos los registros).
+    """
+    limit = clamp_limit(limit)
+    conditions = list(where)
+    query_params = list(params)
+
+    values = decode_cursor(after, len(order))
+    if values is not None:
+        condition, condition_params = keyset_condition(order, values)
+        conditions.append(condition)
+        query_params.extend(condition_params)
+
+    where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Una fila de más indica si hay otra página
+    cursor.execute(f"{select_sql}{where_sql} ORDER BY {order_by(order)} LIMIT %s", query_params + [limit + 1])
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    pagination = {
+        'limit': limit,
+        'has_more': has_more,
+        'next': encode_cursor(row_key(rows[-1], order)) if has_more else None,
+    }
+    if with_total:
+        filter_sql = f" WHERE {' AND '.join(where)}" if where else ""
+        table_sql = select_sql[select_sql.upper().index(' FROM '):]
+        cursor.execute(f"SELECT COUNT(*) AS total{table_sql}{filter_sql}", list(params))
+        pagination['total'] = cursor.fetchone()['total']
+    return rows, pagination
+
+def page_list(items: List[Dict], limit: Optional[int] = None, after: Optional[str] = None,
+              with_total: bool = False) -> Tuple[List[Dict], Dict]:
+    """Pagina una lista ya ordenada en memoria (p. ej. resultados de búsqueda por relevancia)
+
+    El cursor guarda la posición y el id de la última fila; si la lista cambió,
+    se continúa después de ese id donde quiera que haya quedado.
+    """
+    limit = clamp_limit(limit)
+    start = 0
+    values = decode_cursor(after, 2)
+    if values is not None:
+        position, last_id = values
+        if not isinstance(position, int) or position < 0:
+            raise ValueError("Cursor de paginación inválido")
+        if 0 < position <= len(items) and items[position - 1]['id'] == last_id:
+            start = position
+        else:
+            ids = [item['id'] for item in items]
+            start = ids.index(last_id) + 1 if last_id in ids else min(position, len(items))
+
+    rows = items[start:start + limit]
+    has_more = start + limit < len(items)
+    pagination = {
+        'limit': limit,
+        'has_more': has_more,
+        'next': encode_cursor([start + len(rows), rows[-1]['id']]) if has_more else None,
+    }
+    if with_total:
+        pagination['total'] = len(items)
+    return rows, pagination
@@ -0,0 +1,43 @@
+"""Hash y verificación de contraseñas (sha256_crypt)
+
+Estas funciones consumen CPU durante cientos de milisegundos y retienen el GIL,
+por eso la aplicación las ejecuta en el pool de procesos `password_executor`
+(executors.py). Este módulo no importa nada de la aplicación para que los
+procesos hijos arranquen rápido; el costo (rounds) se recibe como argumento.
+"""
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+import functools
+import os
+import warnings
+
+# Igual que en auth.py: evitar la detección de bugs de bcrypt al importar passlib
+os.environ.setdefault('PASSLIB_DISABLE_WRAP_BUG_DETECTION', '1')
+warnings.filterwarnings("ignore", category=UserWarning, module="passlib")
+
+@functools.lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    # min/max iguales al costo configurado: cualquier hash con otro costo se marca
+    # como desactualizado y se vuelve a generar al iniciar sesión
+    return CryptContext(
+        schemes=["sha256_crypt"], deprecated="auto",
+        sha256_crypt__default_rounds=rounds,
+        sha256_crypt__min_rounds=rounds,
+        sha256_crypt__max_rounds=rounds,
+    )
+
+def hash_password(password: str, rounds: int) -> str:
+    """Genera un hash sha256_crypt con el costo indicado"""
+    return _context(rounds).hash(password)
+
+def verify_password(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """Verifica una contraseña
+
+    Retorna (válida, nuevo_hash); nuevo_hash no es None cuando la contraseña es
+    correcta pero el hash guardado usa otro costo y conviene reemplazarlo.
+    """
+    try:
+        return _context(rounds).verify_and_update(password, hashed_password)
+    except Exception as e:
+        print(f"Error verificando contraseña: {e}")
+        return False, None
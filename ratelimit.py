@@ -0,0 +1,110 @@
+"""Límite de intentos de login con token buckets en memoria
+
+Cada intento consume un token del bucket de la IP y otro del bucket del
+usuario; los buckets se rellenan a ritmo constante. Si alguno está vacío el
+intento se rechaza antes de consultar la base de datos o verificar la
+contraseña. El backend en memoria vale para un proceso; otro backend (p. ej.
+compartido entre workers) solo necesita implementar `take`, `reset` y `stats`.
+"""
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from fastapi import Request
+from config import (
+    LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE, LOGIN_RATE_USER_BURST,
+    LOGIN_RATE_USER_PER_MINUTE, LOGIN_RATE_MAX_KEYS, LOGIN_RATE_TRUST_FORWARDED
+)
+import threading
+import time
+
+class MemoryBucketBackend:
+    """Buckets en un dict del proceso; descarta los menos usados al pasar de max_keys"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max(1, max_keys)
+        self._buckets = OrderedDict()  # llave -> (tokens, actualizado_en)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        """Consume un token; retorna (permitido, segundos hasta el siguiente token)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1 - tokens) / refill_per_second if refill_per_second > 0 else float('inf')
+        return allowed, retry_after
+
+    def reset(self, key: str):
+        """Devuelve el bucket a su capacidad completa"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'backend': 'memory', 'keys': len(self._buckets), 'max_keys': self.max_keys}
+
+class LoginRateLimiter:
+    """Limita los intentos de login por IP y por nombre de usuario"""
+
+    def __init__(self, backend, ip_burst: int, ip_per_minute: float, user_burst: int, user_per_minute: float):
+        self.backend = backend
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60
+        self.user_burst = user_burst
+        self.user_rate = user_per_minute / 60
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'rejected_ip': 0, 'rejected_user': 0, 'resets': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def check(self, ip: str, username: str) -> Optional[float]:
+        """Registra un intento; retorna None si se permite o los segundos a esperar si no"""
+        allowed, retry_after = self.backend.take(f"ip:{ip}", self.ip_burst, self.ip_rate)
+        if not allowed:
+            self._count('rejected_ip')
+            return retry_after
+        allowed, retry_after = self.backend.take(f"user:{username.strip().lower()}", self.user_burst, self.user_rate)
+        if not allowed:
+            self._count('rejected_user')
+            return retry_after
+        self._count('allowed')
+        return None
+
+    def reset_user(self, username: str):
+        """Olvida los intentos fallidos de un usuario tras un login correcto"""
+        self.backend.reset(f"user:{username.strip().lower()}")
+        self._count('resets')
+
+    def stats(self) -> Dict:
+        """Intentos permitidos y rechazados, y estado del backend"""
+        with self._lock:
+            data = dict(self._stats)
+        data.update(self.backend.stats())
+        data.update({
+            'ip_burst': self.ip_burst, 'ip_per_minute': self.ip_rate * 60,
+            'user_burst': self.user_burst, 'user_per_minute': self.user_rate * 60,
+        })
+        return data
+
+def client_ip(request: Request) -> str:
+    """IP del cliente; con LOGIN_RATE_TRUST_FORWARDED usa la que agregó el proxy a X-Forwarded-For"""
+    if LOGIN_RATE_TRUST_FORWARDED:
+        forwarded = request.headers.get('x-forwarded-for')
+        if forwarded:
+            # La última dirección la agrega nuestro proxy; las anteriores las controla el cliente
+            return forwarded.split(',')[-1].strip()
+    return request.client.host if request.client else 'desconocida'
+
+login_limiter = LoginRateLimiter(
+    MemoryBucketBackend(LOGIN_RATE_MAX_KEYS),
+    LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE,
+    LOGIN_RATE_USER_BURST, LOGIN_RATE_USER_PER_MINUTE,
+)
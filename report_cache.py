@@ -0,0 +1,139 @@
+"""Caché en disco de PDFs de reportes para periodos cerrados
+
+Cada archivo se nombra con el sha256 de (reporte, parámetros, versión de los
+datos). La versión sale de las tablas diarias (rollups.data_version), así que
+un pedido creado o modificado en el periodo produce otra clave y el archivo
+anterior simplemente deja de usarse hasta que la expulsión LRU lo borra.
+"""
+from typing import Optional, Dict
+from config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# Cambiar al modificar el diseño de los PDFs para no servir versiones viejas
+REPORT_FORMAT_VERSION = 1
+
+class ReportArtifactCache:
+    """Archivos direccionados por contenido con límite de tamaño total (LRU por mtime)"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'skipped': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(report: str, params: Dict, data_version: str) -> str:
+        """Clave estable para un reporte, sus parámetros y la versión de sus datos"""
+        material = json.dumps({
+            'report': report,
+            'params': params,
+            'data': data_version,
+            'format': REPORT_FORMAT_VERSION,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def open(self, key: str):
+        """Archivo en caché abierto para lectura (None si no existe); lo marca como usado
+
+        Se abre de inmediato: si la expulsión LRU lo borra mientras se envía, el
+        descriptor abierto sigue siendo legible.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)
+            fileobj = open(path, 'rb')
+        except OSError:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        with self._lock:
+            self._stats['hits'] += 1
+        return fileobj
+
+    def put(self, key: str, fileobj) -> Optional[str]:
+        """Copia el contenido de fileobj (desde el inicio) a la caché y retorna su ruta
+
+        Retorna None sin guardar nada si el archivo solo no cabe en max_bytes.
+        """
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(0)
+        if size > self.max_bytes:
+            with self._lock:
+                self._stats['skipped'] += 1
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                fileobj.seek(0)
+                shutil.copyfileobj(fileobj, tmp)
+            # Renombrar es atómico: otro proceso nunca lee un PDF a medias
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            fileobj.seek(0)
+        with self._lock:
+            self._stats['stores'] += 1
+        self._evict(keep=path)
+        return path
+
+    def _entries(self) -> list:
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.pdf'):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self, keep: str):
+        """Borra los archivos menos usados hasta quedar bajo max_bytes, nunca `keep`"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats['evictions'] += 1
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict:
+        """Contadores y uso de disco"""
+        entries = self._entries()
+        with self._lock:
+            data = dict(self._stats)
+        data.update({
+            'files': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        })
+        return data
+
+report_cache = ReportArtifactCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
@@ -0,0 +1,82 @@
+"""Respuestas JSON serializadas en una sola pasada
+
+Los resultados de mysql.connector traen Decimal, datetime y date; en lugar de
+recorrer y copiar cada dict antes de responder, el codificador los convierte
+al vuelo. Usa orjson si está instalado y json de la biblioteca estándar si no.
+"""
+from typing import Any
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from utils import format_datetime_to_string
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+def json_default(value: Any):
+    """Convierte los tipos que devuelve la base de datos a tipos JSON"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return format_datetime_to_string(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+if orjson is not None:
+    # datetime pasa por json_default para conservar el formato con zona de Guatemala
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        """Serializa a JSON (bytes UTF-8)"""
+        return orjson.dumps(content, default=json_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Serializa a JSON (bytes UTF-8)"""
+        return json.dumps(content, default=json_default, ensure_ascii=False,
+                          allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que acepta Decimal, datetime y date directamente"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True si If-None-Match incluye `etag` (comparación débil, como indica RFC 9110)
+
+    El encabezado es una lista de entity-tags separadas por comas o "*"; se quita
+    el prefijo W/ y cada etiqueta se compara completa.
+    """
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def cached_json_response(request: Request, content: Any) -> Response:
+    """Respuesta JSON con ETag para que el navegador revalide con If-None-Match
+
+    El ETag es un hash del cuerpo: si los datos no cambiaron se responde 304 sin
+    volver a enviarlos (p. ej. al reabrir una sección del panel de administración).
+    """
+    body = dumps(content)
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
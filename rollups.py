@@ -0,0 +1,321 @@
+"""Tablas de ventas diarias pre-agregadas para reportes
+
+Los días cerrados (anteriores a hoy en Guatemala) se leen de `ventas_diarias`,
+`ventas_diarias_producto` y `ventas_diarias_categoria`; el día en curso se
+agrega desde `pedidos`/`pedido_items` con las mismas consultas. Las tablas se
+actualizan en cada pedido (record_order) y se reconstruyen con backfill().
+"""
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+from decimal import Decimal
+from database import get_db_connection
+from utils import get_guatemala_time, day_bounds
+
+# Agregados por día, producto y categoría. `{where}` filtra pedidos (alias pd)
+DAILY_SELECT = """
+    SELECT
+        DATE(pd.fecha_hora) as fecha,
+        COUNT(*) as pedidos,
+        COALESCE(SUM(pd.total), 0) as subtotal,
+        COALESCE(SUM(pd.descuento), 0) as descuentos,
+        COALESCE(SUM(pd.total_final), 0) as ventas
+    FROM pedidos pd
+    WHERE {where}
+    GROUP BY DATE(pd.fecha_hora)
+"""
+
+PRODUCT_SELECT = """
+    SELECT
+        DATE(pd.fecha_hora) as fecha,
+        pi.producto_id,
+        pi.producto_nombre,
+        SUM(pi.cantidad) as unidades,
+        SUM(pi.precio * pi.cantidad) as ingresos,
+        COUNT(DISTINCT pi.pedido_id) as pedidos,
+        COUNT(*) as lineas,
+        SUM(pi.precio) as suma_precio
+    FROM pedido_items pi
+    JOIN pedidos pd ON pi.pedido_id = pd.id
+    WHERE {where}
+    GROUP BY DATE(pd.fecha_hora), pi.producto_id, pi.producto_nombre
+"""
+
+CATEGORY_SELECT = """
+    SELECT
+        DATE(pd.fecha_hora) as fecha,
+        p.categoria,
+        SUM(pi.cantidad) as unidades,
+        SUM(pi.precio * pi.cantidad) as ingresos,
+        COUNT(DISTINCT pi.pedido_id) as pedidos
+    FROM pedido_items pi
+    JOIN pedidos pd ON pi.pedido_id = pd.id
+    JOIN productos p ON pi.producto_id = p.id
+    WHERE {where}
+    GROUP BY DATE(pd.fecha_hora), p.categoria
+"""
+
+DAILY_UPSERT = """
+    INSERT INTO ventas_diarias (fecha, pedidos, subtotal, descuentos, ventas)
+    {select}
+    ON DUPLICATE KEY UPDATE
+        pedidos = pedidos + VALUES(pedidos),
+        subtotal = subtotal + VALUES(subtotal),
+        descuentos = descuentos + VALUES(descuentos),
+        ventas = ventas + VALUES(ventas),
+        version = version + 1
+"""
+
+PRODUCT_UPSERT = """
+    INSERT INTO ventas_diarias_producto
+        (fecha, producto_id, producto_nombre, unidades, ingresos, pedidos, lineas, suma_precio)
+    {select}
+    ON DUPLICATE KEY UPDATE
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos),
+        pedidos = pedidos + VALUES(pedidos),
+        lineas = lineas + VALUES(lineas),
+        suma_precio = suma_precio + VALUES(suma_precio)
+"""
+
+CATEGORY_UPSERT = """
+    INSERT INTO ventas_diarias_categoria (fecha, categoria, unidades, ingresos, pedidos)
+    {select}
+    ON DUPLICATE KEY UPDATE
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos),
+        pedidos = pedidos + VALUES(pedidos)
+"""
+
+ROLLUP_TABLES = ('ventas_diarias', 'ventas_diarias_producto', 'ventas_diarias_categoria')
+
+def _upserts(where: str) -> List[str]:
+    return [
+        DAILY_UPSERT.format(select=DAILY_SELECT.format(where=where)),
+        PRODUCT_UPSERT.format(select=PRODUCT_SELECT.format(where=where)),
+        CATEGORY_UPSERT.format(select=CATEGORY_SELECT.format(where=where)),
+    ]
+
+def record_order(cursor, order_id: int):
+    """Suma un pedido recién creado a las tablas diarias (usar en la misma transacción)"""
+    for statement in _upserts("pd.id = %s"):
+        cursor.execute(statement, (order_id,))
+
+def touch_order_day(cursor, order_id: int):
+    """Marca como modificado el día de un pedido (cambia la versión de sus datos)"""
+    cursor.execute("""
+        UPDATE ventas_diarias SET version = version + 1
+        WHERE fecha = (SELECT DATE(fecha_hora) FROM pedidos WHERE id = %s)
+    """, (order_id,))
+
+def backfill(start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """Reconstruye las tablas diarias para el rango dado (por defecto todo el historial)
+
+    Devuelve la cantidad de días con ventas reconstruidos.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if start_date is None or end_date is None:
+            cursor.execute("SELECT DATE(MIN(fecha_hora)), DATE(MAX(fecha_hora)) FROM pedidos")
+            first, last = cursor.fetchone()
+            if first is None:
+                return 0
+            start_date = start_date or first
+            end_date = end_date or last
+
+        days = 0
+        day = start_date
+        # Un día por transacción para no bloquear pedidos durante mucho tiempo
+        while day <= end_date:
+            start, end = day_bounds(day)
+            conn.start_transaction()
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE fecha = %s", (day,))
+            for statement in _upserts("pd.fecha_hora >= %s AND pd.fecha_hora < %s"):
+                cursor.execute(statement, (start, end))
+            conn.commit()
+            cursor.execute("SELECT COUNT(*) FROM ventas_diarias WHERE fecha = %s", (day,))
+            days += cursor.fetchone()[0]
+            day += timedelta(days=1)
+        return days
+    finally:
+        cursor.close()
+        conn.close()
+
+def rollups_empty() -> bool:
+    """Indica si hay pedidos pero las tablas diarias aún no se han llenado"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM ventas_diarias), EXISTS(SELECT 1 FROM pedidos)")
+        has_rollups, has_orders = cursor.fetchone()
+        return bool(has_orders) and not has_rollups
+    finally:
+        cursor.close()
+        conn.close()
+
+def data_version(start_date: Optional[date], end_date: Optional[date]) -> Optional[str]:
+    """Versión de los datos de un periodo cerrado (None si incluye el día en curso)
+
+    Cambia cuando se crea o modifica un pedido del periodo (version y
+    actualizado_en de ventas_diarias) o cuando se reconstruye con backfill().
+    """
+    if end_date is None or end_date >= get_guatemala_time().date():
+        return None
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        where, params = _closed_where((start_date, end_date))
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(version), 0), MAX(actualizado_en)
+            FROM ventas_diarias
+            WHERE {where}
+        """, tuple(params))
+        days, versions, updated_at = cursor.fetchone()
+        return f"{days}:{versions}:{updated_at}"
+    finally:
+        cursor.close()
+        conn.close()
+
+# ========================================
+# LECTURA PARA REPORTES
+# ========================================
+
+def _split_range(start_date: Optional[date], end_date: Optional[date]):
+    """Divide el rango en días cerrados (tablas diarias) y días abiertos (pedidos)"""
+    today = get_guatemala_time().date()
+    closed = None
+    if start_date is None or start_date < today:
+        closed_end = today - timedelta(days=1)
+        if end_date is not None:
+            closed_end = min(closed_end, end_date)
+        if start_date is None or start_date <= closed_end:
+            closed = (start_date, closed_end)
+
+    live = None
+    if end_date is None or end_date >= today:
+        live_start = today if start_date is None else max(start_date, today)
+        live = (day_bounds(live_start)[0], day_bounds(end_date)[1] if end_date else None)
+    return closed, live
+
+def _closed_where(closed) -> tuple:
+    conditions = ["fecha <= %s"]
+    params = [closed[1]]
+    if closed[0] is not None:
+        conditions.insert(0, "fecha >= %s")
+        params.insert(0, closed[0])
+    return " AND ".join(conditions), params
+
+def _live_where(live) -> tuple:
+    if live[1] is None:
+        return "pd.fecha_hora >= %s", [live[0]]
+    return "pd.fecha_hora >= %s AND pd.fecha_hora < %s", list(live)
+
+def rollup_queries(start_date: Optional[date], end_date: Optional[date]) -> List[tuple]:
+    """Consultas (nombre, sql, parámetros) que leen un rango; usadas también por EXPLAIN"""
+    closed, live = _split_range(start_date, end_date)
+    queries = []
+    if closed:
+        where, params = _closed_where(closed)
+        queries += [
+            ('daily', f"SELECT fecha, pedidos, subtotal, descuentos, ventas FROM ventas_diarias WHERE {where}", params),
+            ('product', f"""
+                SELECT producto_id, producto_nombre, SUM(unidades) as unidades, SUM(ingresos) as ingresos,
+                       SUM(pedidos) as pedidos, SUM(lineas) as lineas, SUM(suma_precio) as suma_precio
+                FROM ventas_diarias_producto WHERE {where}
+                GROUP BY producto_id, producto_nombre
+            """, params),
+            ('category', f"""
+                SELECT categoria, SUM(unidades) as unidades, SUM(ingresos) as ingresos, SUM(pedidos) as pedidos
+                FROM ventas_diarias_categoria WHERE {where}
+                GROUP BY categoria
+            """, params),
+        ]
+    if live:
+        where, params = _live_where(live)
+        queries += [
+            ('daily', DAILY_SELECT.format(where=where), params),
+            ('product', PRODUCT_SELECT.format(where=where), params),
+            ('category', CATEGORY_SELECT.format(where=where), params),
+        ]
+    return queries
+
+def _fetch(kind: str, start_date: Optional[date], end_date: Optional[date]) -> List[Dict]:
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        rows = []
+        for name, query, params in rollup_queries(start_date, end_date):
+            if name == kind:
+                cursor.execute(query, params)
+                rows.extend(cursor.fetchall())
+        return rows
+    finally:
+        cursor.close()
+        conn.close()
+
+def _merge(rows: List[Dict], key_fields: tuple, sum_fields: tuple) -> List[Dict]:
+    merged = {}
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        if key not in merged:
+            merged[key] = {field: row[field] for field in key_fields}
+            merged[key].update({field: Decimal(0) for field in sum_fields})
+        for field in sum_fields:
+            merged[key][field] += Decimal(row[field] or 0)
+    return list(merged.values())
+
+def get_daily_sales(start_date: date, end_date: date) -> List[Dict]:
+    """Ventas por día del rango (solo días con pedidos), en orden ascendente"""
+    rows = _merge(_fetch('daily', start_date, end_date), ('fecha',),
+                  ('pedidos', 'subtotal', 'descuentos', 'ventas'))
+    rows = [row for row in rows if row['pedidos'] > 0]
+    rows.sort(key=lambda row: row['fecha'])
+    for row in rows:
+        row['pedidos'] = int(row['pedidos'])
+    return rows
+
+def summarize_daily_sales(daily: List[Dict]) -> Dict:
+    """Resumen del rango con las mismas claves que el reporte de ventas"""
+    total_pedidos = sum(row['pedidos'] for row in daily)
+    ventas = sum((row['ventas'] for row in daily), Decimal(0))
+    return {
+        'total_pedidos': total_pedidos,
+        'ventas_totales': ventas,
+        'total_descuentos': sum((row['descuentos'] for row in daily), Decimal(0)),
+        'subtotal': sum((row['subtotal'] for row in daily), Decimal(0)),
+        'ticket_promedio': ventas / total_pedidos if total_pedidos else Decimal(0),
+    }
+
+def get_top_products(start_date: Optional[date], end_date: Optional[date], limit: int = 10) -> List[Dict]:
+    """Productos más vendidos del rango"""
+    rows = _merge(_fetch('product', start_date, end_date), ('producto_id', 'producto_nombre'),
+                  ('unidades', 'ingresos', 'pedidos', 'lineas', 'suma_precio'))
+    products = [{
+        'producto_nombre': row['producto_nombre'],
+        'producto_id': row['producto_id'],
+        'total_vendido': row['unidades'],
+        'ingresos_totales': row['ingresos'],
+        'veces_pedido': int(row['pedidos']),
+        'precio_promedio': row['suma_precio'] / row['lineas'] if row['lineas'] else Decimal(0),
+    } for row in rows]
+    products.sort(key=lambda product: product['total_vendido'], reverse=True)
+    return products[:limit]
+
+def get_categories(start_date: Optional[date], end_date: Optional[date]) -> List[Dict]:
+    """Ventas por categoría del rango"""
+    rows = _merge(_fetch('category', start_date, end_date), ('categoria',),
+                  ('unidades', 'ingresos', 'pedidos'))
+    categories = [{
+        'categoria': row['categoria'],
+        'veces_pedida': int(row['pedidos']),
+        'unidades_vendidas': row['unidades'],
+        'ingresos_totales': row['ingresos'],
+    } for row in rows]
+    categories.sort(key=lambda category: category['ingresos_totales'], reverse=True)
+    return categories
@@ -5,7 +5,10 @@ import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from auth import authenticate_user
+from async_services import authenticate_user
+from executors import ExecutorBusy
+from ratelimit import login_limiter, client_ip
+import math
 from database import init_database
 
 router = APIRouter()
@@ -27,9 +30,28 @@ async def login_page(request: Request):
 @router.post("/login")
 async def login(request: Request, username: str = Form(...), password: str = Form(...)):
     """Procesa el login"""
-    user = authenticate_user(username, password)
+    # Rechazar ráfagas antes de tocar la base de datos o verificar la contraseña
+    retry_after = login_limiter.check(client_ip(request), username)
+    if retry_after is not None:
+        wait = max(1, math.ceil(retry_after))
+        response = templates.TemplateResponse("login.html", {
+            "request": request,
+            "error": f"Demasiados intentos de inicio de sesión, espera {wait} segundos"
+        }, status_code=429)
+        response.headers['Retry-After'] = str(wait)
+        return response
+    
+    try:
+        user = await authenticate_user(username, password)
+    except ExecutorBusy:
+        request.session['login_error'] = 'Hay muchos inicios de sesión en curso, intenta de nuevo en unos segundos'
+        return RedirectResponse(url="/login", status_code=302)
+    except Exception as e:
+        print(f"Error en autenticación: {e}")
+        user = None
     
     if user:
+        login_limiter.reset_user(username)
         request.session['user_id'] = user['id']
         request.session['user_name'] = user['nombre']
         request.session['user_role'] = user['rol']
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Request, Form, Query, HTTPException
-from fastapi.responses import JSONResponse
-from auth import get_current_user
+from responses import FastJSONResponse, cached_json_response
+from async_services import get_current_user, run_db
 from database import get_db_connection
-from decimal import Decimal
+from discount_rules import discount_rules
+from pagination import fetch_page, page_list, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from search_index import discount_search
 import sys
 import os
 
@@ -10,50 +12,48 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 router = APIRouter()
 
-def convert_decimals(obj):
-    """Convierte objetos Decimal a float para JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(item) for item in obj]
-    return obj
-
-def require_admin_api(request: Request):
+async def require_admin_api(request: Request):
     """Verifica que el usuario sea admin"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user or user['rol'] != 'admin':
         raise HTTPException(status_code=403, detail="No autorizado")
     return user
 
-def get_all_discounts(search: str = None, active: str = None):
-    """Obtiene todos los descuentos con filtros opcionales"""
+DISCOUNTS_ORDER = [('codigo', False), ('id', False)]
+
+def get_all_discounts(search: str = None, active: str = None, limit: int = None,
+                      after: str = None, with_total: bool = False):
+    """Obtiene una página de descuentos con filtros opcionales
+
+    Con `search` los resultados salen del índice en memoria, ordenados por relevancia.
+    """
+    if search:
+        def matches(discount):
+            if active == 'true':
+                return bool(discount['activo'])
+            if active == 'false':
+                return not discount['activo']
+            return True
+        return page_list(discount_search.search(search, matches), limit, after, with_total)
+    
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
-    query = "SELECT * FROM descuentos WHERE 1=1"
+    where = []
     params = []
     
-    if search:
-        query += " AND codigo LIKE %s"
-        params.append(f"%{search}%")
-    
     if active is not None:
         if active == 'true':
-            query += " AND activo = 1"
+            where.append("activo = 1")
         elif active == 'false':
-            query += " AND activo = 0"
-    
-    query += " ORDER BY codigo"
-    
-    cursor.execute(query, params)
-    discounts = cursor.fetchall()
-    cursor.close()
-    conn.close()
+            where.append("activo = 0")
     
-    discounts = convert_decimals(discounts)
-    return discounts
+    try:
+        return fetch_page(cursor, "SELECT * FROM descuentos", where, params, DISCOUNTS_ORDER,
+                          limit, after, with_total)
+    finally:
+        cursor.close()
+        conn.close()
 
 def get_discount_by_id(discount_id: int):
     """Obtiene un descuento por ID"""
@@ -63,9 +63,6 @@ def get_discount_by_id(discount_id: int):
     discount = cursor.fetchone()
     cursor.close()
     conn.close()
-    
-    if discount:
-        discount = convert_decimals(discount)
     return discount
 
 def codigo_exists(codigo: str, exclude_id: int = None):
@@ -84,145 +81,169 @@ def codigo_exists(codigo: str, exclude_id: int = None):
     
     return count > 0
 
-@router.get("/api/discounts", response_class=JSONResponse)
-async def get_discounts_api(request: Request, search: str = None, active: str = None):
-    """API para obtener todos los descuentos"""
-    require_admin_api(request)
-    discounts = get_all_discounts(search, active)
-    return {"success": True, "discounts": discounts}
+def insert_discount(codigo: str, tipo: str, valor: float) -> int:
+    """Inserta un descuento activo y retorna su ID"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO descuentos (codigo, tipo, valor, activo) VALUES (%s, %s, %s, 1)",
+            (codigo.upper().strip(), tipo, valor)
+        )
+        conn.commit()
+        discount_rules.invalidate()
+        discount_search.invalidate()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+        conn.close()
+
+def update_discount(discount_id: int, codigo: str, tipo: str, valor: float):
+    """Actualiza un descuento"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE descuentos SET codigo = %s, tipo = %s, valor = %s WHERE id = %s",
+            (codigo.upper().strip(), tipo, valor, discount_id)
+        )
+        conn.commit()
+        discount_rules.invalidate()
+        discount_search.invalidate()
+    finally:
+        cursor.close()
+        conn.close()
+
+def set_discount_active(discount_id: int, active: bool):
+    """Activa o desactiva un descuento"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE descuentos SET activo = %s WHERE id = %s", (1 if active else 0, discount_id))
+        conn.commit()
+        discount_rules.invalidate()
+        discount_search.invalidate()
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.get("/api/discounts", response_class=FastJSONResponse)
+async def get_discounts_api(request: Request, search: str = None, active: str = None,
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                            after: str = Query(None), total: bool = Query(False)):
+    """API para obtener descuentos (paginada: `after` es el cursor `next` de la página anterior)"""
+    await require_admin_api(request)
+    try:
+        discounts, pagination = await run_db(get_all_discounts, search, active, limit, after, total)
+    except ValueError as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=400)
+    return cached_json_response(request, {"success": True, "discounts": discounts, "pagination": pagination})
 
-@router.get("/api/discounts/{discount_id}", response_class=JSONResponse)
+@router.get("/api/discounts/{discount_id}", response_class=FastJSONResponse)
 async def get_discount_api(request: Request, discount_id: int):
     """API para obtener un descuento específico"""
-    require_admin_api(request)
-    discount = get_discount_by_id(discount_id)
+    await require_admin_api(request)
+    discount = await run_db(get_discount_by_id, discount_id)
     if not discount:
         raise HTTPException(status_code=404, detail="Descuento no encontrado")
-    return {"success": True, "discount": discount}
+    return FastJSONResponse({"success": True, "discount": discount})
 
-@router.post("/api/discounts", response_class=JSONResponse)
+@router.post("/api/discounts", response_class=FastJSONResponse)
 async def add_discount_api(request: Request, codigo: str = Form(...), tipo: str = Form(...),
                            valor: float = Form(...)):
     """API para crear un nuevo descuento"""
-    require_admin_api(request)
+    await require_admin_api(request)
     
     # Validaciones
-    if codigo_exists(codigo):
-        return JSONResponse({"success": False, "error": "El código de descuento ya existe"}, status_code=400)
+    if await run_db(codigo_exists, codigo):
+        return FastJSONResponse({"success": False, "error": "El código de descuento ya existe"}, status_code=400)
     
     if tipo not in ['porcentaje', 'fijo']:
-        return JSONResponse({"success": False, "error": "El tipo debe ser 'porcentaje' o 'fijo'"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "El tipo debe ser 'porcentaje' o 'fijo'"}, status_code=400)
     
     if valor <= 0:
-        return JSONResponse({"success": False, "error": "El valor debe ser mayor a 0"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "El valor debe ser mayor a 0"}, status_code=400)
     
     if tipo == 'porcentaje' and valor > 100:
-        return JSONResponse({"success": False, "error": "El porcentaje no puede ser mayor a 100"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "El porcentaje no puede ser mayor a 100"}, status_code=400)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO descuentos (codigo, tipo, valor, activo) VALUES (%s, %s, %s, 1)",
-            (codigo.upper().strip(), tipo, valor)
-        )
-        conn.commit()
-        discount_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
+        discount_id = await run_db(insert_discount, codigo, tipo, valor)
         
         # Obtener el descuento creado
-        new_discount = get_discount_by_id(discount_id)
+        new_discount = await run_db(get_discount_by_id, discount_id)
         
-        return JSONResponse({"success": True, "message": "Descuento creado exitosamente", "discount": new_discount})
+        return FastJSONResponse({"success": True, "message": "Descuento creado exitosamente", "discount": new_discount})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al crear descuento: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al crear descuento: {str(e)}"}, status_code=500)
 
-@router.put("/api/discounts/{discount_id}", response_class=JSONResponse)
+@router.put("/api/discounts/{discount_id}", response_class=FastJSONResponse)
 async def edit_discount_api(request: Request, discount_id: int, codigo: str = Form(...),
                             tipo: str = Form(...), valor: float = Form(...)):
     """API para actualizar un descuento"""
-    require_admin_api(request)
+    await require_admin_api(request)
     
     # Verificar que existe
-    discount = get_discount_by_id(discount_id)
+    discount = await run_db(get_discount_by_id, discount_id)
     if not discount:
         raise HTTPException(status_code=404, detail="Descuento no encontrado")
     
     # Validaciones
-    if codigo_exists(codigo, discount_id):
-        return JSONResponse({"success": False, "error": "El código de descuento ya existe"}, status_code=400)
+    if await run_db(codigo_exists, codigo, discount_id):
+        return FastJSONResponse({"success": False, "error": "El código de descuento ya existe"}, status_code=400)
     
     if tipo not in ['porcentaje', 'fijo']:
-        return JSONResponse({"success": False, "error": "El tipo debe ser 'porcentaje' o 'fijo'"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "El tipo debe ser 'porcentaje' o 'fijo'"}, status_code=400)
     
     if valor <= 0:
-        return JSONResponse({"success": False, "error": "El valor debe ser mayor a 0"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "El valor debe ser mayor a 0"}, status_code=400)
     
     if tipo == 'porcentaje' and valor > 100:
-        return JSONResponse({"success": False, "error": "El porcentaje no puede ser mayor a 100"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "El porcentaje no puede ser mayor a 100"}, status_code=400)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE descuentos SET codigo = %s, tipo = %s, valor = %s WHERE id = %s",
-            (codigo.upper().strip(), tipo, valor, discount_id)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await run_db(update_discount, discount_id, codigo, tipo, valor)
         
         # Obtener el descuento actualizado
-        updated_discount = get_discount_by_id(discount_id)
+        updated_discount = await run_db(get_discount_by_id, discount_id)
         
-        return JSONResponse({"success": True, "message": "Descuento actualizado exitosamente", "discount": updated_discount})
+        return FastJSONResponse({"success": True, "message": "Descuento actualizado exitosamente", "discount": updated_discount})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al actualizar descuento: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al actualizar descuento: {str(e)}"}, status_code=500)
 
-@router.delete("/api/discounts/{discount_id}", response_class=JSONResponse)
+@router.delete("/api/discounts/{discount_id}", response_class=FastJSONResponse)
 async def delete_discount_api(request: Request, discount_id: int):
     """API para desactivar un descuento"""
-    require_admin_api(request)
+    await require_admin_api(request)
     
     # Verificar que existe
-    discount = get_discount_by_id(discount_id)
+    discount = await run_db(get_discount_by_id, discount_id)
     if not discount:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Descuento no encontrado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE descuentos SET activo = 0 WHERE id = %s", (discount_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await run_db(set_discount_active, discount_id, False)
         
-        return JSONResponse({"success": True, "message": "Descuento desactivado correctamente"})
+        return FastJSONResponse({"success": True, "message": "Descuento desactivado correctamente"})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al desactivar descuento: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al desactivar descuento: {str(e)}"}, status_code=500)
 
-@router.post("/api/discounts/{discount_id}/activate", response_class=JSONResponse)
+@router.post("/api/discounts/{discount_id}/activate", response_class=FastJSONResponse)
 async def activate_discount_api(request: Request, discount_id: int):
     """API para activar un descuento"""
-    require_admin_api(request)
+    await require_admin_api(request)
     
     # Verificar que existe
-    discount = get_discount_by_id(discount_id)
+    discount = await run_db(get_discount_by_id, discount_id)
     if not discount:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Descuento no encontrado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE descuentos SET activo = 1 WHERE id = %s", (discount_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await run_db(set_discount_active, discount_id, True)
         
-        return JSONResponse({"success": True, "message": "Descuento activado correctamente"})
+        return FastJSONResponse({"success": True, "message": "Descuento activado correctamente"})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al activar descuento: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al activar descuento: {str(e)}"}, status_code=500)
 
@@ -1,42 +1,77 @@
 from fastapi import APIRouter, Request, Query
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from auth import get_current_user
+from events import kitchen_hub
+import asyncio
+import json
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from services import get_active_orders, get_order_items, update_order_status
+from services import kitchen_order_payload
+from async_services import get_current_user, get_kitchen_board, update_order_status
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
+# Segundos entre comentarios keep-alive del stream de eventos
+EVENTS_KEEPALIVE = 15
+
 @router.get("/kitchen", response_class=HTMLResponse)
 async def kitchen_view(request: Request):
     """Vista de cocina"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    orders = get_active_orders()
-    
-    # Agregar items a cada pedido
-    for order in orders:
-        order['items'] = get_order_items(order['id'])
+    # La versión se toma antes de leer el tablero: si al conectarse al stream ya
+    # cambió, la página recarga para no perder los eventos de ese intervalo
+    events_version = kitchen_hub.version()
+    orders = await get_kitchen_board()
     
     return templates.TemplateResponse("kitchen.html", {
         "request": request,
         "user": user,
-        "orders": orders
+        "orders": orders,
+        "events_version": events_version,
+        "orders_payload": [kitchen_order_payload(order, order['items']) for order in orders]
+    })
+
+@router.get("/kitchen/events")
+async def kitchen_events(request: Request):
+    """Stream (Server-Sent Events) de pedidos creados y cambios de estado"""
+    user = await get_current_user(request)
+    if not user:
+        return Response(content="No autorizado", status_code=401)
+    
+    queue = kitchen_hub.subscribe()
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            # Versión al momento de suscribirse, para que la página detecte eventos perdidos
+            yield f"event: hello\ndata: {json.dumps({'version': kitchen_hub.version()})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            kitchen_hub.unsubscribe(queue)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @router.get("/kitchen/status")
 async def change_status(request: Request, order_id: int = Query(...), new_status: str = Query(...)):
     """Cambia el estado de un pedido"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    update_order_status(order_id, new_status)
+    await update_order_status(order_id, new_status)
     return RedirectResponse(url="/kitchen", status_code=302)
-
@@ -1,49 +1,58 @@
 from fastapi import APIRouter, Request, Form, Query
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
-from auth import get_current_user
+from responses import FastJSONResponse
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from services import (
-    get_products, get_product_by_id, calculate_cart_total,
-    apply_discount, get_grouped_cart, create_order
+from async_services import (
+    get_current_user, get_products_by_category, get_product_by_id, price_cart, create_order, run_db
 )
+from cart_store import cart_store, new_cart_id, empty_cart
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-def get_cart(request: Request) -> list:
-    """Obtiene el carrito de la sesión"""
-    if 'cart' not in request.session:
-        request.session['cart'] = []
-    return request.session['cart']
+def get_cart_id(request: Request) -> str:
+    """Obtiene (o asigna) el ID del carrito de la sesión; el contenido vive en cart_store"""
+    cart_id = request.session.get('cart_id')
+    if not cart_id:
+        cart_id = new_cart_id()
+        request.session['cart_id'] = cart_id
+    return cart_id
+
+async def get_cart(request: Request) -> dict:
+    """Obtiene el carrito del servidor ({'items': {producto_id: cantidad}, 'discount_code': ...})"""
+    cart_id = get_cart_id(request)
+    # Carritos guardados en la cookie por versiones anteriores
+    legacy_items = request.session.pop('cart', None)
+    legacy_discount = request.session.pop('discount_code', None)
+    if legacy_items or legacy_discount:
+        def migrate(cart):
+            for product_id in legacy_items or []:
+                cart['items'][int(product_id)] = cart['items'].get(int(product_id), 0) + 1
+            cart['discount_code'] = cart['discount_code'] or legacy_discount
+        return await run_db(cart_store.update, cart_id, migrate)
+    return await run_db(cart_store.get, cart_id)
 
 @router.get("/pos", response_class=HTMLResponse)
 async def pos_view(request: Request):
     """Vista del sistema POS"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    cart = get_cart(request)
-    products = get_products()
-    subtotal = calculate_cart_total(cart)
-    discount_code = request.session.get('discount_code')
-    discount_info = apply_discount(subtotal, discount_code)
+    cart = await get_cart(request)
+    categories = await get_products_by_category()
+    discount_code = cart['discount_code']
+    pricing = await price_cart(cart['items'], discount_code)
+    subtotal = pricing['subtotal']
+    discount_info = pricing['discount_info']
     show_success = 'success' in request.query_params
     
-    # Agrupar productos por categoría
-    categories = {}
-    for product in products:
-        cat = product['categoria']
-        if cat not in categories:
-            categories[cat] = []
-        categories[cat].append(product)
-    
     # Obtener items agrupados del carrito
-    grouped_cart = get_grouped_cart(cart)
+    grouped_cart = pricing['grouped']
     cart_items_list = []
     for name, data in grouped_cart.items():
         cart_items_list.append({
@@ -56,7 +65,7 @@ async def pos_view(request: Request):
         "request": request,
         "user": user,
         "categories": categories,
-        "cart": cart,
+        "cart": cart['items'],
         "grouped_cart": grouped_cart,
         "cart_items_list": cart_items_list,
         "subtotal": subtotal,
@@ -69,84 +78,181 @@ async def pos_view(request: Request):
 @router.get("/pos/add")
 async def add_to_cart(request: Request, id: int = Query(...)):
     """Agrega un producto al carrito"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    cart = get_cart(request)
-    product = get_product_by_id(id)
+    product = await get_product_by_id(id)
     
     if product:
-        cart.append(id)
-        request.session['cart'] = cart
+        await run_db(cart_store.add, get_cart_id(request), id, 1)
     
     return RedirectResponse(url="/pos", status_code=302)
 
 @router.get("/pos/remove")
-async def remove_from_cart(request: Request, index: int = Query(...)):
-    """Elimina un item del carrito"""
-    user = get_current_user(request)
+async def remove_from_cart(request: Request, id: int = Query(...), qty: int = Query(1)):
+    """Quita unidades de un producto del carrito"""
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    cart = get_cart(request)
-    if 0 <= index < len(cart):
-        cart.pop(index)
-        request.session['cart'] = cart
+    if qty > 0:
+        await run_db(cart_store.remove, get_cart_id(request), id, qty)
     
     return RedirectResponse(url="/pos", status_code=302)
 
 @router.get("/pos/clear")
 async def clear_cart(request: Request):
     """Limpia el carrito"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    request.session['cart'] = []
-    request.session['discount_code'] = None
+    await run_db(cart_store.clear, get_cart_id(request))
     return RedirectResponse(url="/pos", status_code=302)
 
 @router.post("/pos/apply_discount")
 async def apply_discount_action(request: Request, discount_code: str = Form(...)):
     """Aplica un código de descuento"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    request.session['discount_code'] = discount_code.upper().strip()
+    await run_db(cart_store.set_discount, get_cart_id(request), discount_code.upper().strip())
     return RedirectResponse(url="/pos", status_code=302)
 
 @router.get("/pos/remove_discount")
 async def remove_discount(request: Request):
     """Quita el descuento aplicado"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    request.session['discount_code'] = None
+    await run_db(cart_store.set_discount, get_cart_id(request), None)
     return RedirectResponse(url="/pos", status_code=302)
 
 @router.get("/pos/confirm")
 async def confirm_order(request: Request):
     """Confirma el pedido"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    cart = get_cart(request)
-    if not cart:
+    cart = await get_cart(request)
+    if not cart['items']:
         return RedirectResponse(url="/pos", status_code=302)
     
-    subtotal = calculate_cart_total(cart)
-    discount_code = request.session.get('discount_code')
+    discount_code = cart['discount_code']
+    pricing = await price_cart(cart['items'], discount_code)
     
-    order_id = create_order(cart, subtotal, discount_code)
+    # El token de la generación del carrito sirve de llave de idempotencia: un doble
+    # toque en "Confirmar" retorna el mismo pedido en vez de crear otro. No se usa el
+    # cart_id porque la cookie puede volver con el ID anterior tras vaciar el carrito,
+    # y el siguiente pedido de ese carrito se confundiría con el ya confirmado.
+    cart_id = get_cart_id(request)
+    order_id = await create_order(cart['items'], pricing['subtotal'], discount_code, pricing=pricing,
+                                  idempotency_key=f"cart:{cart['token']}")
     
-    # Limpiar carrito
-    request.session['cart'] = []
-    request.session['discount_code'] = None
+    # Limpiar carrito y empezar uno nuevo con otro ID
+    await run_db(cart_store.clear, cart_id)
+    request.session['cart_id'] = new_cart_id()
     request.session['last_order_id'] = order_id
     
     return RedirectResponse(url="/pos?success=1", status_code=302)
 
+# --- API JSON del carrito: cada toque devuelve solo las líneas y totales ---
+
+def cart_payload(cart: dict, pricing: dict) -> dict:
+    """Líneas y totales del carrito para el POS"""
+    lines = []
+    for name, data in pricing['grouped'].items():
+        product = data['product']
+        lines.append({
+            'id': product['id'],
+            'nombre': name,
+            'precio': product['precio'],
+            'cantidad': data['quantity'],
+            'importe': float(product['precio']) * data['quantity']
+        })
+    discount_info = pricing['discount_info']
+    return {
+        'lines': lines,
+        'count': sum(line['cantidad'] for line in lines),
+        'subtotal': pricing['subtotal'],
+        'discount': discount_info['discount'],
+        'total': discount_info['total'],
+        'discount_code': cart['discount_code'],
+        'discount_valid': discount_info['discount_info'] is not None
+    }
+
+async def cart_response(cart: dict) -> FastJSONResponse:
+    """Respuesta JSON con el carrito ya calculado"""
+    pricing = await price_cart(cart['items'], cart['discount_code'])
+    return FastJSONResponse({"success": True, "cart": cart_payload(cart, pricing)})
+
+def unauthorized() -> FastJSONResponse:
+    return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=401)
+
+@router.get("/pos/api/cart")
+async def get_cart_api(request: Request):
+    """API para obtener el carrito actual"""
+    if not await get_current_user(request):
+        return unauthorized()
+    return await cart_response(await get_cart(request))
+
+@router.post("/pos/api/cart/add")
+async def add_to_cart_api(request: Request, id: int = Form(...), qty: int = Form(1)):
+    """API para sumar unidades de un producto"""
+    if not await get_current_user(request):
+        return unauthorized()
+    if qty <= 0:
+        return FastJSONResponse({"success": False, "error": "La cantidad debe ser mayor a 0"}, status_code=400)
+    if not await get_product_by_id(id):
+        return FastJSONResponse({"success": False, "error": "Producto no encontrado"}, status_code=404)
+    
+    await get_cart(request)  # migra un carrito antiguo de la cookie si lo hay
+    cart = await run_db(cart_store.add, get_cart_id(request), id, qty)
+    return await cart_response(cart)
+
+@router.post("/pos/api/cart/remove")
+async def remove_from_cart_api(request: Request, id: int = Form(...), qty: int = Form(1)):
+    """API para quitar unidades de un producto"""
+    if not await get_current_user(request):
+        return unauthorized()
+    if qty <= 0:
+        return FastJSONResponse({"success": False, "error": "La cantidad debe ser mayor a 0"}, status_code=400)
+    
+    await get_cart(request)
+    cart = await run_db(cart_store.remove, get_cart_id(request), id, qty)
+    return await cart_response(cart)
+
+@router.post("/pos/api/cart/discount")
+async def apply_discount_api(request: Request, discount_code: str = Form(...)):
+    """API para aplicar un código de descuento"""
+    if not await get_current_user(request):
+        return unauthorized()
+    
+    await get_cart(request)
+    cart = await run_db(cart_store.set_discount, get_cart_id(request), discount_code.upper().strip() or None)
+    return await cart_response(cart)
+
+@router.delete("/pos/api/cart/discount")
+async def remove_discount_api(request: Request):
+    """API para quitar el descuento aplicado"""
+    if not await get_current_user(request):
+        return unauthorized()
+    
+    await get_cart(request)
+    cart = await run_db(cart_store.set_discount, get_cart_id(request), None)
+    return await cart_response(cart)
+
+@router.delete("/pos/api/cart")
+async def clear_cart_api(request: Request):
+    """API para vaciar el carrito"""
+    if not await get_current_user(request):
+        return unauthorized()
+    
+    request.session.pop('cart', None)
+    request.session.pop('discount_code', None)
+    await run_db(cart_store.clear, get_cart_id(request))
+    return await cart_response(empty_cart())
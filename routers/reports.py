@@ -1,12 +1,27 @@
 from fastapi import APIRouter, Request, Query
-from fastapi.responses import JSONResponse, HTMLResponse, Response
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from responses import FastJSONResponse, etag_matches
 from fastapi.templating import Jinja2Templates
-from auth import get_current_user
+from async_services import get_current_user, run_report, iterate_report
+from executors import ExecutorBusy
 from database import get_db_connection
+from typing import Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
-from utils import get_guatemala_time
+from utils import get_guatemala_time, day_bounds, date_range_bounds
+from rollups import (
+    get_daily_sales, summarize_daily_sales, get_top_products, get_categories, rollup_queries,
+    data_version
+)
+from report_cache import report_cache
+from pagination import fetch_page, order_by, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from contextlib import closing
+from config import PDF_SPOOL_MAX_MEMORY
+from streaming import (
+    iter_query_chunks, iter_file, LazyStory, encode_csv, encode_ndjson, gzip_stream, export_limiter
+)
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
@@ -21,92 +36,198 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-def convert_decimals(obj):
-    """Convierte objetos Decimal a float para JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(item) for item in obj]
-    return obj
-
-def require_admin(request: Request):
+async def require_admin(request: Request):
     """Verifica que el usuario sea admin"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user or user['rol'] != 'admin':
         return None
     return user
 
+# ========================================
+# CONSULTAS DE REPORTES
+# ========================================
+# Todas filtran fecha_hora con rangos semiabiertos [inicio, fin) para que MySQL
+# use idx_pedidos_fecha en lugar de evaluar DATE(fecha_hora) fila por fila.
+
+# Página de pedidos del día: fetch_page agrega el rango, el cursor y el LIMIT
+SALES_DAY_ROWS_SELECT = """
+    SELECT id, numero_pedido, total, descuento, total_final, estado, fecha_hora, tiempo_preparacion
+    FROM pedidos
+"""
+SALES_DAY_WHERE = ["fecha_hora >= %s", "fecha_hora < %s"]
+
+# Agregados del día por estado; idx_pedidos_fecha cubre todas las columnas
+SALES_DAY_STATS_SQL = """
+    SELECT
+        estado,
+        COUNT(*) as cantidad,
+        COALESCE(SUM(total_final), 0) as ventas,
+        COALESCE(SUM(descuento), 0) as descuentos,
+        COALESCE(SUM(total), 0) as subtotal,
+        COALESCE(SUM(tiempo_preparacion), 0) as tiempo_total,
+        COUNT(tiempo_preparacion) as pedidos_con_tiempo
+    FROM pedidos
+    WHERE fecha_hora >= %s AND fecha_hora < %s
+    GROUP BY estado
+"""
+
+# Columnas mínimas para listar pedidos en los PDFs por bloques
+ORDERS_EXPORT_SQL = """
+    SELECT numero_pedido, fecha_hora, total_final, estado
+    FROM pedidos
+    WHERE fecha_hora >= %s AND fecha_hora < %s
+    ORDER BY fecha_hora
+"""
+
+def parse_report_date(value: str):
+    """Convierte un parámetro YYYY-MM-DD en date"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _optional_date(value: str):
+    return parse_report_date(value) if value else None
+
+# Orden de los pedidos del día (más recientes primero)
+SALES_DAY_ORDER = [('fecha_hora', True), ('id', True)]
+
+def _sales_day_stats(cursor, bounds):
+    """Estadísticas y desglose por estado del día con una sola consulta agregada"""
+    cursor.execute(SALES_DAY_STATS_SQL, bounds)
+    rows = cursor.fetchall()
+    total_pedidos = sum(row['cantidad'] for row in rows)
+    ventas_totales = sum((row['ventas'] for row in rows), Decimal(0))
+    tiempo_total = sum((row['tiempo_total'] for row in rows), Decimal(0))
+    tiempo_pedidos = sum(row['pedidos_con_tiempo'] for row in rows)
+    stats = {
+        'total_pedidos': total_pedidos,
+        'ventas_totales': ventas_totales,
+        'total_descuentos': sum((row['descuentos'] for row in rows), Decimal(0)),
+        'subtotal': sum((row['subtotal'] for row in rows), Decimal(0)),
+        'ticket_promedio': ventas_totales / total_pedidos if total_pedidos else Decimal(0),
+        'tiempo_promedio': Decimal(tiempo_total) / tiempo_pedidos if tiempo_pedidos else Decimal(0),
+    }
+    status_breakdown = [{'estado': row['estado'], 'cantidad': row['cantidad']} for row in rows]
+    return stats, status_breakdown
+
+def fetch_sales_day(query_date, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    """Estadísticas, desglose por estado y una página de pedidos de un día
+
+    La página se lee con el cursor en SQL (ORDER BY fecha_hora DESC, id DESC
+    LIMIT limit + 1), así que cada página cuesta lo mismo. Las estadísticas y el
+    desglose solo se calculan en la primera página (`after` vacío); en las
+    siguientes son None. limit=0 no lee pedidos. `after` es el cursor `next` de
+    la página anterior. Retorna (stats, status_breakdown, orders, pagination).
+    """
+    bounds = day_bounds(query_date)
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        stats = status_breakdown = None
+        if not after:
+            stats, status_breakdown = _sales_day_stats(cursor, bounds)
+        
+        if limit == 0:
+            orders, pagination = [], {'limit': 0, 'has_more': False, 'next': None}
+        else:
+            orders, pagination = fetch_page(cursor, SALES_DAY_ROWS_SELECT, SALES_DAY_WHERE, list(bounds),
+                                            SALES_DAY_ORDER, limit, after)
+        if stats is not None:
+            pagination['total'] = stats['total_pedidos']
+    finally:
+        cursor.close()
+        conn.close()
+    
+    for order in orders:
+        if hasattr(order['fecha_hora'], 'strftime'):
+            order['fecha_hora'] = order['fecha_hora'].strftime('%Y-%m-%d %H:%M:%S')
+    return stats, status_breakdown, orders, pagination
+
+def fetch_sales_range(start, end):
+    """Resumen y ventas por día del rango (días cerrados desde las tablas diarias)"""
+    daily = get_daily_sales(start, end)
+    summary = summarize_daily_sales(daily)
+    daily_sales = [
+        {'fecha': day['fecha'].strftime('%Y-%m-%d'), 'pedidos': day['pedidos'], 'ventas': day['ventas']}
+        for day in daily
+    ]
+    return summary, daily_sales
+
+def fetch_top_products(start_date: str = None, end_date: str = None, limit: int = 10):
+    """Productos más vendidos para fechas opcionales en formato YYYY-MM-DD"""
+    return get_top_products(_optional_date(start_date), _optional_date(end_date), limit)
+
+def fetch_categories(start_date: str = None, end_date: str = None):
+    """Ventas por categoría para fechas opcionales en formato YYYY-MM-DD"""
+    return get_categories(_optional_date(start_date), _optional_date(end_date))
+
+def report_queries(sample_date=None) -> list:
+    """Lista (nombre, consulta, parámetros) de las consultas de reportes para un día de ejemplo"""
+    from live_stats import ADMIN_STATS_SQL
+    
+    day = sample_date or get_guatemala_time().date()
+    day_range = day_bounds(day)
+    queries = [
+        ('sales-day page', f"{SALES_DAY_ROWS_SELECT} WHERE {' AND '.join(SALES_DAY_WHERE)}"
+                           f" ORDER BY {order_by(SALES_DAY_ORDER)} LIMIT %s", (*day_range, DEFAULT_PAGE_SIZE + 1)),
+        ('sales-day stats', SALES_DAY_STATS_SQL, day_range),
+        ('admin stats', ADMIN_STATS_SQL, day_range),
+    ]
+    # Rango de 30 días hasta hoy: incluye lecturas de tablas diarias y del día en curso
+    start = day - timedelta(days=30)
+    for name, query, params in rollup_queries(start, max(day, get_guatemala_time().date())):
+        queries.append((f"range {name}", query, params))
+    return queries
+
+def explain_report_queries(sample_date=None) -> list:
+    """Ejecuta EXPLAIN sobre las consultas de reportes y devuelve los escaneos completos de tabla"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        full_scans = []
+        for name, query, params in report_queries(sample_date):
+            cursor.execute("EXPLAIN " + query, tuple(params))
+            for row in cursor.fetchall():
+                if row.get('type') == 'ALL':
+                    full_scans.append({'query': name, 'table': row.get('table'), 'rows': row.get('rows')})
+        return full_scans
+    finally:
+        cursor.close()
+        conn.close()
+
 @router.get("/api/reports/sales-day")
-async def sales_day_report(request: Request, date: str = Query(None)):
-    """Reporte de ventas del día"""
-    user = require_admin(request)
+async def sales_day_report(request: Request, date: str = Query(None),
+                           limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), after: str = Query(None)):
+    """Reporte de ventas del día (los pedidos se devuelven paginados)
+    
+    stats y status_breakdown solo vienen en la primera página (sin `after`).
+    """
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         if date:
             query_date = datetime.strptime(date, '%Y-%m-%d').date()
         else:
             query_date = get_guatemala_time().date()
         
-        # Ventas del día
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_pedidos,
-                COALESCE(SUM(total_final), 0) as ventas_totales,
-                COALESCE(SUM(descuento), 0) as total_descuentos,
-                COALESCE(SUM(total), 0) as subtotal,
-                COALESCE(AVG(total_final), 0) as ticket_promedio,
-                COALESCE(AVG(tiempo_preparacion), 0) as tiempo_promedio
-            FROM pedidos
-            WHERE DATE(fecha_hora) = %s
-        """, (query_date,))
-        stats = cursor.fetchone()
-        
-        # Pedidos del día por estado
-        cursor.execute("""
-            SELECT estado, COUNT(*) as cantidad
-            FROM pedidos
-            WHERE DATE(fecha_hora) = %s
-            GROUP BY estado
-        """, (query_date,))
-        status_breakdown = cursor.fetchall()
+        stats, status_breakdown, orders, pagination = await run_report(fetch_sales_day, query_date, limit, after)
         
-        # Pedidos detallados del día
-        cursor.execute("""
-            SELECT * FROM pedidos
-            WHERE DATE(fecha_hora) = %s
-            ORDER BY fecha_hora DESC
-        """, (query_date,))
-        orders = cursor.fetchall()
-        
-        # Convertir datetime a string
-        for order in orders:
-            if order.get('fecha_hora'):
-                order['fecha_hora'] = order['fecha_hora'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(order['fecha_hora'], 'strftime') else str(order['fecha_hora'])
-        
-        cursor.close()
-        conn.close()
-        
-        # Convertir Decimal a float
-        stats = convert_decimals(stats)
-        status_breakdown = convert_decimals(status_breakdown)
-        orders = convert_decimals(orders)
-        
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "date": str(query_date),
             "stats": stats,
             "status_breakdown": status_breakdown,
-            "orders": orders
+            "orders": orders,
+            "pagination": pagination
         })
+    except ValueError as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=400)
+    except ExecutorBusy as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=503)
     except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 @router.get("/api/reports/top-products")
 async def top_products_report(request: Request, 
@@ -114,164 +235,61 @@ async def top_products_report(request: Request,
                               end_date: str = Query(None),
                               limit: int = Query(10)):
     """Reporte de productos más vendidos"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                pi.producto_nombre,
-                pi.producto_id,
-                SUM(pi.cantidad) as total_vendido,
-                SUM(pi.precio * pi.cantidad) as ingresos_totales,
-                COUNT(DISTINCT pi.pedido_id) as veces_pedido,
-                AVG(pi.precio) as precio_promedio
-            FROM pedido_items pi
-            JOIN pedidos p ON pi.pedido_id = p.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if start_date:
-            query += " AND DATE(p.fecha_hora) >= %s"
-            params.append(datetime.strptime(start_date, '%Y-%m-%d').date())
-        
-        if end_date:
-            query += " AND DATE(p.fecha_hora) <= %s"
-            params.append(datetime.strptime(end_date, '%Y-%m-%d').date())
-        
-        query += """
-            GROUP BY pi.producto_id, pi.producto_nombre
-            ORDER BY total_vendido DESC
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        products = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        products = convert_decimals(products)
-        return JSONResponse({"success": True, "products": products})
+        products = await run_report(fetch_top_products, start_date, end_date, limit)
+        return FastJSONResponse({"success": True, "products": products})
+    except ExecutorBusy as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=503)
     except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 @router.get("/api/reports/sales-range")
 async def sales_range_report(request: Request,
                              start_date: str = Query(...),
                              end_date: str = Query(...)):
     """Reporte de ventas en un rango de fechas"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         start = datetime.strptime(start_date, '%Y-%m-%d').date()
         end = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        # Resumen general
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_pedidos,
-                COALESCE(SUM(total_final), 0) as ventas_totales,
-                COALESCE(SUM(descuento), 0) as total_descuentos,
-                COALESCE(SUM(total), 0) as subtotal,
-                COALESCE(AVG(total_final), 0) as ticket_promedio
-            FROM pedidos
-            WHERE DATE(fecha_hora) BETWEEN %s AND %s
-        """, (start, end))
-        summary = cursor.fetchone()
-        
-        # Ventas por día
-        cursor.execute("""
-            SELECT 
-                DATE(fecha_hora) as fecha,
-                COUNT(*) as pedidos,
-                COALESCE(SUM(total_final), 0) as ventas
-            FROM pedidos
-            WHERE DATE(fecha_hora) BETWEEN %s AND %s
-            GROUP BY DATE(fecha_hora)
-            ORDER BY fecha ASC
-        """, (start, end))
-        daily_sales = cursor.fetchall()
+        summary, daily_sales = await run_report(fetch_sales_range, start, end)
         
-        # Convertir fechas
-        for day in daily_sales:
-            if day.get('fecha'):
-                day['fecha'] = day['fecha'].strftime('%Y-%m-%d') if hasattr(day['fecha'], 'strftime') else str(day['fecha'])
-        
-        cursor.close()
-        conn.close()
-        
-        # Convertir Decimal a float
-        summary = convert_decimals(summary)
-        daily_sales = convert_decimals(daily_sales)
-        
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "start_date": str(start),
             "end_date": str(end),
             "summary": summary,
             "daily_sales": daily_sales
         })
+    except ExecutorBusy as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=503)
     except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 @router.get("/api/reports/categories")
 async def categories_report(request: Request,
                            start_date: str = Query(None),
                            end_date: str = Query(None)):
     """Reporte por categorías"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                p.categoria,
-                COUNT(DISTINCT pi.pedido_id) as veces_pedida,
-                SUM(pi.cantidad) as unidades_vendidas,
-                SUM(pi.precio * pi.cantidad) as ingresos_totales
-            FROM pedido_items pi
-            JOIN pedidos pd ON pi.pedido_id = pd.id
-            JOIN productos p ON pi.producto_id = p.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if start_date:
-            query += " AND DATE(pd.fecha_hora) >= %s"
-            params.append(datetime.strptime(start_date, '%Y-%m-%d').date())
-        
-        if end_date:
-            query += " AND DATE(pd.fecha_hora) <= %s"
-            params.append(datetime.strptime(end_date, '%Y-%m-%d').date())
-        
-        query += " GROUP BY p.categoria ORDER BY ingresos_totales DESC"
-        
-        cursor.execute(query, params)
-        categories = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        categories = convert_decimals(categories)
-        return JSONResponse({"success": True, "categories": categories})
+        categories = await run_report(fetch_categories, start_date, end_date)
+        return FastJSONResponse({"success": True, "categories": categories})
+    except ExecutorBusy as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=503)
     except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 # ========================================
 # FUNCIONES PARA GENERAR PDFs
@@ -543,14 +561,184 @@ def generate_pdf_categories(categories: list, start_date: str = None, end_date:
     buffer.seek(0)
     return buffer
 
+# ========================================
+# PDFs POR BLOQUES (modo stream)
+# ========================================
+# Para rangos grandes: los pedidos se leen por bloques con un cursor sin buffer,
+# cada bloque se dibuja como una tabla independiente (con encabezado repetido
+# en cada página) y el PDF se escribe en un archivo temporal que solo pasa a
+# disco al superar PDF_SPOOL_MAX_MEMORY bytes.
+
+ORDER_TABLE_HEADER = ['Nº Pedido', 'Fecha/Hora', 'Total', 'Estado']
+
+def _order_table(rows: list):
+    """Tabla de pedidos con el estilo de los reportes; rows incluye el encabezado"""
+    order_table = Table(rows, colWidths=[1.5*inch, 2*inch, 1.5*inch, 1*inch], repeatRows=1)
+    order_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#047857')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ]))
+    return order_table
+
+def _order_row(order: dict) -> list:
+    fecha_hora = order.get('fecha_hora')
+    if hasattr(fecha_hora, 'strftime'):
+        fecha = fecha_hora.strftime('%Y-%m-%d %H:%M')
+    else:
+        fecha = str(fecha_hora or '')[:16]
+    return [
+        order.get('numero_pedido', ''),
+        fecha,
+        f"Q {float(order.get('total_final') or 0):.2f}",
+        order.get('estado', '')
+    ]
+
+def _summary_flowables(title: str, period: str, summary: dict) -> list:
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        textColor=colors.HexColor('#047857'),
+        spaceAfter=30,
+        alignment=1
+    )
+    summary_table = Table([
+        ['Total Pedidos', f"{summary.get('total_pedidos', 0)}"],
+        ['Ventas Totales', f"Q {float(summary.get('ventas_totales', 0)):.2f}"],
+        ['Ticket Promedio', f"Q {float(summary.get('ticket_promedio', 0)):.2f}"],
+        ['Total Descuentos', f"Q {float(summary.get('total_descuentos', 0)):.2f}"],
+    ], colWidths=[4*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ]))
+    return [
+        Paragraph("🌮 SAZÓN MEXICANO", title_style),
+        Paragraph(title, styles['Heading2']),
+        Paragraph(period, styles['Normal']),
+        Spacer(1, 0.3*inch),
+        summary_table,
+        Spacer(1, 0.3*inch),
+    ]
+
+def _orders_pdf_stream(title: str, period: str, summary: dict, start_day, end_day, daily_sales: list = None):
+    """Construye el PDF leyendo los pedidos de [start_day, end_day] por bloques
+
+    Retorna un SpooledTemporaryFile posicionado al inicio.
+    """
+    output = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MEMORY)
+    doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    styles = getSampleStyleSheet()
+    
+    def story():
+        yield from _summary_flowables(title, period, summary)
+        
+        if daily_sales:
+            yield Paragraph("Ventas por Día", styles['Heading3'])
+            daily_table = Table([['Fecha', 'Pedidos', 'Ventas']] + [
+                [day.get('fecha', ''), str(day.get('pedidos', 0)), f"Q {float(day.get('ventas', 0)):.2f}"]
+                for day in daily_sales
+            ], colWidths=[2*inch, 2*inch, 2*inch], repeatRows=1)
+            daily_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#047857')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+                ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ]))
+            yield daily_table
+            yield Spacer(1, 0.3*inch)
+        
+        yield Paragraph("Pedidos", styles['Heading3'])
+        with closing(iter_query_chunks(ORDERS_EXPORT_SQL, date_range_bounds(start_day, end_day))) as chunks:
+            for chunk in chunks:
+                yield _order_table([ORDER_TABLE_HEADER] + [_order_row(order) for order in chunk])
+    
+    try:
+        doc.build(LazyStory(story()))
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+def generate_pdf_sales_day_stream(query_date):
+    """PDF del día con todos los pedidos (sin el límite de 50)"""
+    stats, _, _, _ = fetch_sales_day(query_date, limit=0)
+    return _orders_pdf_stream("Reporte de Ventas del Día", f"Fecha: {query_date}", stats, query_date, query_date)
+
+def generate_pdf_sales_range_stream(start, end):
+    """PDF del rango con ventas por día y el detalle de todos los pedidos"""
+    summary, daily_sales = fetch_sales_range(start, end)
+    return _orders_pdf_stream("Reporte de Ventas por Rango de Fechas", f"Del {start} al {end}",
+                              summary, start, end, daily_sales)
+
+def pdf_stream_response(output, filename: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """Envía un PDF generado por bloques en trozos de 64 KB (y cierra `output` al terminar)"""
+    output.seek(0, os.SEEK_END)
+    size = output.tell()
+    return StreamingResponse(iter_file(output), media_type='application/pdf', headers={
+        **(headers or {}),
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Content-Length': str(size)
+    })
+
+async def cached_pdf_response(request: Request, report: str, params: dict, start_day, end_day,
+                              filename: str, build):
+    """Sirve un PDF desde la caché de artefactos o lo genera con `await build()`
+
+    Solo se guardan periodos cerrados; la clave (y el ETag) cambia cuando cambian
+    los pedidos del periodo, así que el navegador puede revalidar con If-None-Match.
+    """
+    version = await run_report(data_version, start_day, end_day)
+    if version is None:
+        return pdf_stream_response(await build(), filename)
+    
+    key = report_cache.key(report, params, version)
+    etag = f'"{key}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    cached = report_cache.open(key)
+    if cached is not None:
+        return pdf_stream_response(cached, filename, headers)
+    
+    # Se envía el PDF recién generado aunque la caché no lo guarde (o ya lo haya expulsado)
+    output = await build()
+    try:
+        await run_report(report_cache.put, key, output)
+    except Exception:
+        output.close()
+        raise
+    return pdf_stream_response(output, filename, headers)
+
 # ========================================
 # ENDPOINTS PARA EXPORTAR PDFs
 # ========================================
 
 @router.get("/api/reports/pdf/sales-day")
-async def export_sales_day_pdf(request: Request, date: str = Query(...)):
-    """Exporta reporte de ventas del día a PDF"""
-    user = require_admin(request)
+async def export_sales_day_pdf(request: Request, date: str = Query(...), stream: bool = Query(False)):
+    """Exporta reporte de ventas del día a PDF (stream=true: todos los pedidos, generado por bloques)"""
+    user = await require_admin(request)
     if not user:
         return Response(content="No autorizado", status_code=403)
     
@@ -579,53 +767,17 @@ async def export_sales_day_pdf(request: Request, date: str = Query(...)):
                 media_type='text/plain'
             )
         
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         query_date = datetime.strptime(date.strip(), '%Y-%m-%d').date()
         
-        # Ventas del día
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_pedidos,
-                COALESCE(SUM(total_final), 0) as ventas_totales,
-                COALESCE(SUM(descuento), 0) as total_descuentos,
-                COALESCE(SUM(total), 0) as subtotal,
-                COALESCE(AVG(total_final), 0) as ticket_promedio
-            FROM pedidos
-            WHERE DATE(fecha_hora) = %s
-        """, (query_date,))
-        stats = cursor.fetchone()
+        async def build():
+            if stream:
+                return await run_report(generate_pdf_sales_day_stream, query_date)
+            stats, _, orders, _ = await run_report(fetch_sales_day, query_date, 50)
+            return await run_report(generate_pdf_sales_day, str(query_date), stats, orders)
         
-        # Pedidos del día
-        cursor.execute("""
-            SELECT * FROM pedidos
-            WHERE DATE(fecha_hora) = %s
-            ORDER BY fecha_hora DESC
-        """, (query_date,))
-        orders = cursor.fetchall()
-        
-        # Convertir datetime a string para evitar errores de serialización
-        for order in orders:
-            if order.get('fecha_hora'):
-                if hasattr(order['fecha_hora'], 'strftime'):
-                    order['fecha_hora'] = order['fecha_hora'].strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    order['fecha_hora'] = str(order['fecha_hora'])
-        
-        cursor.close()
-        conn.close()
-        
-        stats = convert_decimals(stats)
-        orders = convert_decimals(orders)
-        pdf_buffer = generate_pdf_sales_day(str(query_date), stats, orders)
-        
-        return Response(
-            content=pdf_buffer.read(),
-            media_type='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename=ventas_dia_{date}.pdf'
-            }
+        return await cached_pdf_response(
+            request, 'sales-day', {'date': query_date, 'stream': stream},
+            query_date, query_date, f'ventas_dia_{date}.pdf', build
         )
     except ValueError as e:
         return Response(
@@ -633,6 +785,8 @@ async def export_sales_day_pdf(request: Request, date: str = Query(...)):
             status_code=400,
             media_type='text/plain'
         )
+    except ExecutorBusy as e:
+        return Response(content=str(e), status_code=503, media_type='text/plain')
     except Exception as e:
         return Response(
             content=f"Error al generar PDF: {str(e)}",
@@ -641,178 +795,166 @@ async def export_sales_day_pdf(request: Request, date: str = Query(...)):
         )
 
 @router.get("/api/reports/pdf/sales-range")
-async def export_sales_range_pdf(request: Request, start_date: str = Query(...), end_date: str = Query(...)):
-    """Exporta reporte de ventas por rango a PDF"""
-    user = require_admin(request)
+async def export_sales_range_pdf(request: Request, start_date: str = Query(...), end_date: str = Query(...),
+                                 stream: bool = Query(False)):
+    """Exporta reporte de ventas por rango a PDF (stream=true: incluye todos los pedidos, generado por bloques)"""
+    user = await require_admin(request)
     if not user:
         return Response(content="No autorizado", status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         start = datetime.strptime(start_date, '%Y-%m-%d').date()
         end = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        # Resumen
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_pedidos,
-                COALESCE(SUM(total_final), 0) as ventas_totales,
-                COALESCE(SUM(descuento), 0) as total_descuentos,
-                COALESCE(SUM(total), 0) as subtotal,
-                COALESCE(AVG(total_final), 0) as ticket_promedio
-            FROM pedidos
-            WHERE DATE(fecha_hora) BETWEEN %s AND %s
-        """, (start, end))
-        summary = cursor.fetchone()
-        
-        # Ventas por día
-        cursor.execute("""
-            SELECT 
-                DATE(fecha_hora) as fecha,
-                COUNT(*) as pedidos,
-                COALESCE(SUM(total_final), 0) as ventas
-            FROM pedidos
-            WHERE DATE(fecha_hora) BETWEEN %s AND %s
-            GROUP BY DATE(fecha_hora)
-            ORDER BY fecha ASC
-        """, (start, end))
-        daily_sales = cursor.fetchall()
+        async def build():
+            if stream:
+                return await run_report(generate_pdf_sales_range_stream, start, end)
+            summary, daily_sales = await run_report(fetch_sales_range, start, end)
+            return await run_report(generate_pdf_sales_range, str(start), str(end), summary, daily_sales)
         
-        # Convertir fechas
-        for day in daily_sales:
-            if day.get('fecha'):
-                day['fecha'] = day['fecha'].strftime('%Y-%m-%d') if hasattr(day['fecha'], 'strftime') else str(day['fecha'])
-        
-        cursor.close()
-        conn.close()
-        
-        summary = convert_decimals(summary)
-        daily_sales = convert_decimals(daily_sales)
-        pdf_buffer = generate_pdf_sales_range(str(start), str(end), summary, daily_sales)
-        
-        return Response(
-            content=pdf_buffer.read(),
-            media_type='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename=ventas_rango_{start_date}_{end_date}.pdf'
-            }
+        return await cached_pdf_response(
+            request, 'sales-range', {'start': start, 'end': end, 'stream': stream},
+            start, end, f'ventas_rango_{start_date}_{end_date}.pdf', build
         )
+    except ExecutorBusy as e:
+        return Response(content=str(e), status_code=503, media_type='text/plain')
     except Exception as e:
         return Response(content=f"Error: {str(e)}", status_code=500)
 
 @router.get("/api/reports/pdf/top-products")
 async def export_top_products_pdf(request: Request, start_date: str = Query(None), end_date: str = Query(None), limit: int = Query(10)):
     """Exporta reporte de productos más vendidos a PDF"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
         return Response(content="No autorizado", status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                pi.producto_nombre,
-                pi.producto_id,
-                SUM(pi.cantidad) as total_vendido,
-                SUM(pi.precio * pi.cantidad) as ingresos_totales,
-                COUNT(DISTINCT pi.pedido_id) as veces_pedido,
-                AVG(pi.precio) as precio_promedio
-            FROM pedido_items pi
-            JOIN pedidos p ON pi.pedido_id = p.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if start_date:
-            query += " AND DATE(p.fecha_hora) >= %s"
-            params.append(datetime.strptime(start_date, '%Y-%m-%d').date())
-        
-        if end_date:
-            query += " AND DATE(p.fecha_hora) <= %s"
-            params.append(datetime.strptime(end_date, '%Y-%m-%d').date())
-        
-        query += """
-            GROUP BY pi.producto_id, pi.producto_nombre
-            ORDER BY total_vendido DESC
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        products = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        products = convert_decimals(products)
-        pdf_buffer = generate_pdf_top_products(products, start_date, end_date)
+        async def build():
+            products = await run_report(fetch_top_products, start_date, end_date, limit)
+            return await run_report(generate_pdf_top_products, products, start_date, end_date)
         
         filename = f"productos_vendidos_{start_date or 'all'}_{end_date or 'all'}.pdf"
-        return Response(
-            content=pdf_buffer.read(),
-            media_type='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}'
-            }
+        return await cached_pdf_response(
+            request, 'top-products', {'start': start_date, 'end': end_date, 'limit': limit},
+            _optional_date(start_date), _optional_date(end_date), filename, build
         )
+    except ExecutorBusy as e:
+        return Response(content=str(e), status_code=503, media_type='text/plain')
     except Exception as e:
         return Response(content=f"Error: {str(e)}", status_code=500)
 
 @router.get("/api/reports/pdf/categories")
 async def export_categories_pdf(request: Request, start_date: str = Query(None), end_date: str = Query(None)):
     """Exporta reporte por categorías a PDF"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
         return Response(content="No autorizado", status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                p.categoria,
-                COUNT(DISTINCT pi.pedido_id) as veces_pedida,
-                SUM(pi.cantidad) as unidades_vendidas,
-                SUM(pi.precio * pi.cantidad) as ingresos_totales
-            FROM pedido_items pi
-            JOIN pedidos pd ON pi.pedido_id = pd.id
-            JOIN productos p ON pi.producto_id = p.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if start_date:
-            query += " AND DATE(pd.fecha_hora) >= %s"
-            params.append(datetime.strptime(start_date, '%Y-%m-%d').date())
-        
-        if end_date:
-            query += " AND DATE(pd.fecha_hora) <= %s"
-            params.append(datetime.strptime(end_date, '%Y-%m-%d').date())
-        
-        query += " GROUP BY p.categoria ORDER BY ingresos_totales DESC"
-        
-        cursor.execute(query, params)
-        categories = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        categories = convert_decimals(categories)
-        pdf_buffer = generate_pdf_categories(categories, start_date, end_date)
+        async def build():
+            categories = await run_report(fetch_categories, start_date, end_date)
+            return await run_report(generate_pdf_categories, categories, start_date, end_date)
         
         filename = f"categorias_{start_date or 'all'}_{end_date or 'all'}.pdf"
-        return Response(
-            content=pdf_buffer.read(),
-            media_type='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}'
-            }
+        return await cached_pdf_response(
+            request, 'categories', {'start': start_date, 'end': end_date},
+            _optional_date(start_date), _optional_date(end_date), filename, build
         )
+    except ExecutorBusy as e:
+        return Response(content=str(e), status_code=503, media_type='text/plain')
     except Exception as e:
         return Response(content=f"Error: {str(e)}", status_code=500)
 
+# ========================================
+# EXPORTACIÓN CSV / NDJSON
+# ========================================
+# Pedidos e items se leen por bloques con un cursor sin buffer y se codifican
+# bloque a bloque en el pool de reportes; nunca se arma el resultado completo.
+
+EXPORT_ORDERS_SQL = """
+    SELECT id, numero_pedido, fecha_hora, total, descuento, total_final, estado, tiempo_preparacion
+    FROM pedidos
+    WHERE fecha_hora >= %s AND fecha_hora < %s
+    ORDER BY fecha_hora, id
+"""
+
+EXPORT_ITEMS_SQL = """
+    SELECT pi.id, pi.pedido_id, pd.numero_pedido, pd.fecha_hora, pi.producto_id,
+           pi.producto_nombre, pi.precio, pi.cantidad, pi.precio * pi.cantidad as importe
+    FROM pedido_items pi
+    JOIN pedidos pd ON pi.pedido_id = pd.id
+    WHERE pd.fecha_hora >= %s AND pd.fecha_hora < %s
+    ORDER BY pd.fecha_hora, pi.pedido_id, pi.id
+"""
+
+EXPORT_COLUMNS = {
+    'orders': ['id', 'numero_pedido', 'fecha_hora', 'total', 'descuento', 'total_final',
+               'estado', 'tiempo_preparacion'],
+    'items': ['id', 'pedido_id', 'numero_pedido', 'fecha_hora', 'producto_id',
+              'producto_nombre', 'precio', 'cantidad', 'importe'],
+    'daily-sales': ['fecha', 'pedidos', 'subtotal', 'descuentos', 'ventas'],
+    'categories': ['categoria', 'veces_pedida', 'unidades_vendidas', 'ingresos_totales'],
+}
+
+EXPORT_FORMATS = {
+    'csv': (encode_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (encode_ndjson, 'application/x-ndjson'),
+}
+
+def _single_chunk(func, *args):
+    # Ventas diarias y categorías ya vienen agregadas (pocas filas)
+    yield func(*args)
+
+def export_chunks(dataset: str, start, end):
+    """Bloques de filas del dataset para el rango [start, end]"""
+    if dataset == 'orders':
+        return iter_query_chunks(EXPORT_ORDERS_SQL, date_range_bounds(start, end))
+    if dataset == 'items':
+        return iter_query_chunks(EXPORT_ITEMS_SQL, date_range_bounds(start, end))
+    if dataset == 'daily-sales':
+        return _single_chunk(get_daily_sales, start, end)
+    return _single_chunk(get_categories, start, end)
+
+@router.get("/api/reports/export/{dataset}")
+async def export_report_data(request: Request, dataset: str,
+                             start_date: str = Query(...),
+                             end_date: str = Query(...),
+                             fmt: str = Query('csv', alias='format'),
+                             compress: bool = Query(False, alias='gzip')):
+    """Exporta pedidos, items, ventas diarias o categorías en CSV o NDJSON (opcionalmente gzip)"""
+    user = await require_admin(request)
+    if not user:
+        return Response(content="No autorizado", status_code=403)
+    
+    if dataset not in EXPORT_COLUMNS:
+        return Response(content=f"Error: Dataset inválido. Opciones: {', '.join(EXPORT_COLUMNS)}",
+                        status_code=400, media_type='text/plain')
+    if fmt not in EXPORT_FORMATS:
+        return Response(content="Error: Formato inválido. Opciones: csv, ndjson",
+                        status_code=400, media_type='text/plain')
+    
+    try:
+        start = parse_report_date(start_date)
+        end = parse_report_date(end_date)
+    except ValueError:
+        return Response(content="Error: Las fechas deben estar en formato YYYY-MM-DD",
+                        status_code=400, media_type='text/plain')
+    
+    # Se reserva el lugar antes de empezar la respuesta: a mitad de la descarga ya no
+    # se puede responder 503
+    slot = export_limiter.try_acquire()
+    if slot is None:
+        return Response(content="Hay demasiadas exportaciones en curso, intenta de nuevo en unos segundos",
+                        status_code=503, media_type='text/plain', headers={'Retry-After': '10'})
+    
+    encoder, media_type = EXPORT_FORMATS[fmt]
+    body = encoder(export_chunks(dataset, start, end), EXPORT_COLUMNS[dataset])
+    filename = f"{dataset}_{start_date}_{end_date}.{fmt}"
+    if compress:
+        body = gzip_stream(body)
+        filename += '.gz'
+        media_type = 'application/gzip'
+    
+    return StreamingResponse(iterate_report(body, on_close=slot.release), media_type=media_type, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
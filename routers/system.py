@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Request
+from responses import FastJSONResponse
+from auth import user_cache
+from async_services import get_current_user
+from database import get_pool_stats
+from catalog import product_catalog
+from discount_rules import discount_rules
+from events import kitchen_hub
+from executors import executor_stats
+from streaming import export_limiter
+from report_cache import report_cache
+from cart_store import cart_store
+from ratelimit import login_limiter
+from search_index import search_stats
+from live_stats import live_admin_stats
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+router = APIRouter()
+
+async def require_admin(request: Request):
+    """Verifica que el usuario sea admin"""
+    user = await get_current_user(request)
+    if not user or user['rol'] != 'admin':
+        return None
+    return user
+
+@router.get("/api/system/stats")
+async def system_stats_api(request: Request):
+    """API con estadísticas internas (pools de conexiones e hilos, cachés)"""
+    user = await require_admin(request)
+    if not user:
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+    
+    return FastJSONResponse({
+        "success": True,
+        "db_pool": get_pool_stats(),
+        "product_catalog": product_catalog.stats(),
+        "discount_rules": discount_rules.stats(),
+        "user_cache": user_cache.stats(),
+        "kitchen_events": kitchen_hub.stats(),
+        "executors": executor_stats(),
+        "exports": export_limiter.stats(),
+        "report_cache": report_cache.stats(),
+        "carts": cart_store.stats(),
+        "login_rate_limit": login_limiter.stats(),
+        "search": search_stats(),
+        "admin_stats": live_admin_stats.stats()
+    })
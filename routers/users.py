@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Request, Form, Query
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse
+from responses import FastJSONResponse, cached_json_response
 from fastapi.templating import Jinja2Templates
-from auth import get_current_user, get_password_hash
+from auth import invalidate_user
+from async_services import get_current_user, run_db, hash_password
 from database import get_db_connection
-from decimal import Decimal
-from utils import format_datetime_to_string
+from pagination import fetch_page, page_list, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from search_index import user_search, USER_COLUMNS
 import sys
 import os
 
@@ -13,73 +15,63 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-def convert_decimals(obj):
-    """Convierte objetos Decimal a float para JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(item) for item in obj]
-    return obj
-
-def require_admin(request: Request):
+async def require_admin(request: Request):
     """Verifica que el usuario sea admin"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user or user['rol'] != 'admin':
         return None
     return user
 
-def get_all_users(search: str = None, role: str = None, active: str = None):
-    """Obtiene todos los usuarios con filtros opcionales"""
+USERS_ORDER = [('nombre', False), ('id', False)]
+
+def get_all_users(search: str = None, role: str = None, active: str = None, limit: int = None,
+                  after: str = None, with_total: bool = False):
+    """Obtiene una página de usuarios con filtros opcionales
+
+    Con `search` los resultados salen del índice en memoria, ordenados por relevancia.
+    """
+    if search:
+        def matches(user):
+            if role and user['rol'] != role:
+                return False
+            if active == 'true' and not user['activo']:
+                return False
+            if active == 'false' and user['activo']:
+                return False
+            return True
+        return page_list(user_search.search(search, matches), limit, after, with_total)
+    
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
-    query = "SELECT * FROM usuarios WHERE 1=1"
+    where = []
     params = []
     
-    if search:
-        query += " AND (nombre LIKE %s OR username LIKE %s)"
-        search_param = f"%{search}%"
-        params.extend([search_param, search_param])
-    
     if role:
-        query += " AND rol = %s"
+        where.append("rol = %s")
         params.append(role)
     
     if active is not None:
         if active == 'true':
-            query += " AND activo = 1"
+            where.append("activo = 1")
         elif active == 'false':
-            query += " AND activo = 0"
-    
-    query += " ORDER BY nombre"
-    
-    cursor.execute(query, params)
-    users = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    # Convertir datetime a string para JSON
-    for user in users:
-        if user.get('created_at'):
-            user['created_at'] = format_datetime_to_string(user['created_at'])
+            where.append("activo = 0")
     
-    users = convert_decimals(users)
-    return users
+    try:
+        return fetch_page(cursor, f"SELECT {USER_COLUMNS} FROM usuarios", where, params, USERS_ORDER,
+                          limit, after, with_total)
+    finally:
+        cursor.close()
+        conn.close()
 
 def get_user_by_id(user_id: int):
     """Obtiene un usuario por ID"""
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM usuarios WHERE id = %s", (user_id,))
+    cursor.execute(f"SELECT {USER_COLUMNS} FROM usuarios WHERE id = %s", (user_id,))
     user = cursor.fetchone()
     cursor.close()
     conn.close()
-    if user:
-        if user.get('created_at'):
-            user['created_at'] = format_datetime_to_string(user['created_at'])
-        user = convert_decimals(user)
     return user
 
 def username_exists(username: str, exclude_id: int = None):
@@ -97,36 +89,92 @@ def username_exists(username: str, exclude_id: int = None):
     conn.close()
     return count > 0
 
+def insert_user(username: str, hashed_password: str, nombre: str, rol: str) -> int:
+    """Inserta un usuario y retorna su ID"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO usuarios (username, password, nombre, rol) VALUES (%s, %s, %s, %s)",
+            (username, hashed_password, nombre, rol)
+        )
+        conn.commit()
+        user_search.invalidate()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+        conn.close()
+
+def update_user(user_id: int, username: str, nombre: str, rol: str, hashed_password: str = None):
+    """Actualiza un usuario (y su contraseña si se envía el hash)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if hashed_password:
+            cursor.execute(
+                "UPDATE usuarios SET username = %s, password = %s, nombre = %s, rol = %s WHERE id = %s",
+                (username, hashed_password, nombre, rol, user_id)
+            )
+        else:
+            cursor.execute(
+                "UPDATE usuarios SET username = %s, nombre = %s, rol = %s WHERE id = %s",
+                (username, nombre, rol, user_id)
+            )
+        conn.commit()
+        user_search.invalidate()
+        invalidate_user(user_id)
+    finally:
+        cursor.close()
+        conn.close()
+
+def set_user_active(user_id: int, active: bool):
+    """Activa o desactiva un usuario"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE usuarios SET activo = %s WHERE id = %s", (1 if active else 0, user_id))
+        conn.commit()
+        user_search.invalidate()
+        invalidate_user(user_id)
+    finally:
+        cursor.close()
+        conn.close()
+
 @router.get("/api/users")
 async def get_users_api(request: Request, 
                        search: str = Query(None),
                        role: str = Query(None),
-                       active: str = Query(None)):
-    """API para obtener usuarios"""
-    user = require_admin(request)
+                       active: str = Query(None),
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       after: str = Query(None),
+                       total: bool = Query(False)):
+    """API para obtener usuarios (paginada: `after` es el cursor `next` de la página anterior)"""
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        users = get_all_users(search, role, active)
-        return JSONResponse({"success": True, "users": users})
+        users, pagination = await run_db(get_all_users, search, role, active, limit, after, total)
+        return cached_json_response(request, {"success": True, "users": users, "pagination": pagination})
+    except ValueError as e:
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=400)
     except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 @router.get("/api/users/{user_id}")
 async def get_user_api(request: Request, user_id: int):
     """API para obtener un usuario específico"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        user_data = get_user_by_id(user_id)
+        user_data = await run_db(get_user_by_id, user_id)
         if not user_data:
-            return JSONResponse({"success": False, "error": "Usuario no encontrado"}, status_code=404)
-        return JSONResponse({"success": True, "user": user_data})
+            return FastJSONResponse({"success": False, "error": "Usuario no encontrado"}, status_code=404)
+        return FastJSONResponse({"success": True, "user": user_data})
     except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 @router.post("/api/users")
 async def create_user_api(request: Request, 
@@ -135,40 +183,29 @@ async def create_user_api(request: Request,
                          nombre: str = Form(...), 
                          rol: str = Form(...)):
     """API para crear un usuario"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     # Validaciones
     if not username or not password or not nombre or not rol:
-        return JSONResponse({"success": False, "error": "Faltan campos obligatorios"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "Faltan campos obligatorios"}, status_code=400)
     
     if len(password) < 6:
-        return JSONResponse({"success": False, "error": "La contraseña debe tener al menos 6 caracteres"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "La contraseña debe tener al menos 6 caracteres"}, status_code=400)
     
     if rol not in ['admin', 'mesero']:
-        return JSONResponse({"success": False, "error": "Rol inválido"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "Rol inválido"}, status_code=400)
     
-    if username_exists(username):
-        return JSONResponse({"success": False, "error": "El usuario ya existe"}, status_code=400)
+    if await run_db(username_exists, username):
+        return FastJSONResponse({"success": False, "error": "El usuario ya existe"}, status_code=400)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        hashed_password = get_password_hash(password)
-        cursor.execute(
-            "INSERT INTO usuarios (username, password, nombre, rol) VALUES (%s, %s, %s, %s)",
-            (username, hashed_password, nombre, rol)
-        )
-        conn.commit()
-        user_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
-        
-        new_user = get_user_by_id(user_id)
-        return JSONResponse({"success": True, "message": "Usuario creado exitosamente", "user": new_user})
+        user_id = await run_db(insert_user, username, await hash_password(password), nombre, rol)
+        new_user = await run_db(get_user_by_id, user_id)
+        return FastJSONResponse({"success": True, "message": "Usuario creado exitosamente", "user": new_user})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al crear usuario: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al crear usuario: {str(e)}"}, status_code=500)
 
 @router.put("/api/users/{user_id}")
 async def update_user_api(request: Request, user_id: int,
@@ -177,89 +214,62 @@ async def update_user_api(request: Request, user_id: int,
                          rol: str = Form(...), 
                          password: str = Form(None)):
     """API para actualizar un usuario"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     # Validaciones
     if not username or not nombre or not rol:
-        return JSONResponse({"success": False, "error": "Faltan campos obligatorios"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "Faltan campos obligatorios"}, status_code=400)
     
     if rol not in ['admin', 'mesero']:
-        return JSONResponse({"success": False, "error": "Rol inválido"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "Rol inválido"}, status_code=400)
     
     if password and len(password) < 6:
-        return JSONResponse({"success": False, "error": "La contraseña debe tener al menos 6 caracteres"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "La contraseña debe tener al menos 6 caracteres"}, status_code=400)
     
-    existing_user = get_user_by_id(user_id)
+    existing_user = await run_db(get_user_by_id, user_id)
     if not existing_user:
-        return JSONResponse({"success": False, "error": "Usuario no encontrado"}, status_code=404)
+        return FastJSONResponse({"success": False, "error": "Usuario no encontrado"}, status_code=404)
     
-    if username_exists(username, exclude_id=user_id):
-        return JSONResponse({"success": False, "error": "El usuario ya existe"}, status_code=400)
+    if await run_db(username_exists, username, exclude_id=user_id):
+        return FastJSONResponse({"success": False, "error": "El usuario ya existe"}, status_code=400)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if password:
-            hashed_password = get_password_hash(password)
-            cursor.execute(
-                "UPDATE usuarios SET username = %s, password = %s, nombre = %s, rol = %s WHERE id = %s",
-                (username, hashed_password, nombre, rol, user_id)
-            )
-        else:
-            cursor.execute(
-                "UPDATE usuarios SET username = %s, nombre = %s, rol = %s WHERE id = %s",
-                (username, nombre, rol, user_id)
-            )
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        updated_user = get_user_by_id(user_id)
-        return JSONResponse({"success": True, "message": "Usuario actualizado exitosamente", "user": updated_user})
+        hashed_password = await hash_password(password) if password else None
+        await run_db(update_user, user_id, username, nombre, rol, hashed_password)
+        updated_user = await run_db(get_user_by_id, user_id)
+        return FastJSONResponse({"success": True, "message": "Usuario actualizado exitosamente", "user": updated_user})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al actualizar usuario: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al actualizar usuario: {str(e)}"}, status_code=500)
 
 @router.delete("/api/users/{user_id}")
 async def delete_user_api(request: Request, user_id: int):
     """API para desactivar un usuario"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     if user['id'] == user_id:
-        return JSONResponse({"success": False, "error": "No puedes desactivar tu propio usuario"}, status_code=400)
+        return FastJSONResponse({"success": False, "error": "No puedes desactivar tu propio usuario"}, status_code=400)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE usuarios SET activo = 0 WHERE id = %s", (user_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await run_db(set_user_active, user_id, False)
         
-        return JSONResponse({"success": True, "message": "Usuario desactivado exitosamente"})
+        return FastJSONResponse({"success": True, "message": "Usuario desactivado exitosamente"})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al desactivar usuario: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al desactivar usuario: {str(e)}"}, status_code=500)
 
 @router.post("/api/users/{user_id}/activate")
 async def activate_user_api(request: Request, user_id: int):
     """API para activar un usuario"""
-    user = require_admin(request)
+    user = await require_admin(request)
     if not user:
-        return JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+        return FastJSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE usuarios SET activo = 1 WHERE id = %s", (user_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await run_db(set_user_active, user_id, True)
         
-        return JSONResponse({"success": True, "message": "Usuario activado exitosamente"})
+        return FastJSONResponse({"success": True, "message": "Usuario activado exitosamente"})
     except Exception as e:
-        return JSONResponse({"success": False, "error": f"Error al activar usuario: {str(e)}"}, status_code=500)
+        return FastJSONResponse({"success": False, "error": f"Error al activar usuario: {str(e)}"}, status_code=500)
@@ -0,0 +1,213 @@
+"""Índices de búsqueda en memoria para usuarios, productos y descuentos
+
+Sustituyen los `LIKE '%texto%'` (que recorren la tabla completa) por un índice
+de prefijos y trigramas sobre el texto normalizado: sin acentos ni mayúsculas,
+así "acompanamientos" encuentra "Acompañamientos". Los resultados se ordenan
+por relevancia: palabra exacta > prefijo de palabra > subcadena, ponderado por
+campo. Como el catálogo, el índice se reconstruye tras una escritura
+(`invalidate()`) o al vencer el TTL.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from config import CATALOG_CACHE_TTL
+from database import get_db_connection
+from catalog import product_catalog
+import re
+import threading
+import time
+import unicodedata
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+def normalize(text) -> str:
+    """Texto en minúsculas, sin acentos y con solo letras/dígitos separados por espacios"""
+    decomposed = unicodedata.normalize('NFKD', str(text or '').lower())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(' ', stripped).strip()
+
+def _trigrams(word: str):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+# Puntos por tipo de coincidencia (se multiplican por el peso del campo)
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+SUBSTRING_SCORE = 1
+
+class _Snapshot:
+    """Índice inmutable construido a partir de las filas en un momento dado"""
+    __slots__ = ('generation', 'version', 'loaded_at', 'rows', 'words', 'labels', 'prefixes', 'trigrams', 'vocabulary')
+
+    def __init__(self, generation: int, version, rows: List[Dict], fields: Sequence[Tuple[str, int]]):
+        self.generation = generation
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.rows = {row['id']: row for row in rows}
+        self.words = {}     # id -> [(palabras del campo, peso)]
+        self.labels = {}    # id -> texto para desempatar
+        self.prefixes = {}  # prefijo -> ids
+        self.trigrams = {}  # trigrama -> ids
+        self.vocabulary = {}  # palabra -> ids
+        for row in rows:
+            row_id = row['id']
+            field_words = []
+            for field, weight in fields:
+                words = normalize(row.get(field)).split()
+                field_words.append((words, weight))
+                for word in words:
+                    self.vocabulary.setdefault(word, set()).add(row_id)
+                    for end in range(1, len(word) + 1):
+                        self.prefixes.setdefault(word[:end], set()).add(row_id)
+                    for trigram in _trigrams(word):
+                        self.trigrams.setdefault(trigram, set()).add(row_id)
+            self.words[row_id] = field_words
+            self.labels[row_id] = normalize(row.get(fields[0][0]))
+
+    def candidates(self, token: str) -> set:
+        """IDs con alguna palabra que empieza con o contiene `token`"""
+        ids = set(self.prefixes.get(token, ()))
+        if len(token) >= 3:
+            postings = [self.trigrams.get(trigram) for trigram in _trigrams(token)]
+            if all(postings):
+                ids |= set.intersection(*postings)
+        else:
+            # Términos de 1-2 letras no tienen trigramas: se recorre el vocabulario
+            # (como el LIKE '%ez%' de antes, "ez" encuentra "Pérez")
+            for word, word_ids in self.vocabulary.items():
+                if token in word:
+                    ids |= word_ids
+        return ids
+
+    def score(self, row_id: int, tokens: List[str]) -> int:
+        """Puntaje de una fila; 0 si algún término no aparece"""
+        total = 0
+        for token in tokens:
+            best = 0
+            for words, weight in self.words[row_id]:
+                for word in words:
+                    if word == token:
+                        points = EXACT_SCORE
+                    elif word.startswith(token):
+                        points = PREFIX_SCORE
+                    elif token in word:
+                        points = SUBSTRING_SCORE
+                    else:
+                        continue
+                    best = max(best, points * weight)
+            if not best:
+                return 0
+            total += best
+        return total
+
+class SearchIndex:
+    """Índice de búsqueda sobre las filas que entrega `loader`
+
+    fields es [(columna, peso), ...]; la primera columna desempata resultados con
+    el mismo puntaje. Si se pasa `version`, el índice también se reconstruye
+    cuando cambia ese valor (p. ej. la versión del catálogo de productos).
+    """
+
+    def __init__(self, name: str, loader: Callable[[], List[Dict]], fields: Sequence[Tuple[str, int]],
+                 ttl: float = CATALOG_CACHE_TTL, version: Optional[Callable[[], int]] = None):
+        self.name = name
+        self.fields = list(fields)
+        self.ttl = ttl
+        self._loader = loader
+        self._version = version
+        self._snapshot = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {'searches': 0, 'rebuilds': 0, 'invalidations': 0, 'search_time_ms': 0.0}
+
+    def _is_fresh(self, snapshot, version) -> bool:
+        return (snapshot is not None
+                and snapshot.generation == self._generation
+                and snapshot.version == version
+                and (self.ttl <= 0 or time.monotonic() - snapshot.loaded_at < self.ttl))
+
+    def _current(self) -> _Snapshot:
+        version = self._version() if self._version else None
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, version):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot, version):
+                return snapshot
+            snapshot = _Snapshot(self._generation, version, self._loader(), self.fields)
+            self._snapshot = snapshot
+            self._stats['rebuilds'] += 1
+            return snapshot
+
+    def invalidate(self):
+        """Marca el índice como obsoleto; la siguiente búsqueda lo reconstruye"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def search(self, query: str, predicate: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """Filas que contienen todos los términos de `query`, de más a menos relevante
+
+        `predicate` filtra las filas (p. ej. por rol o estado). Retorna copias.
+        """
+        snapshot = self._current()
+        started = time.perf_counter()
+        tokens = normalize(query).split()
+        results = []
+        if tokens:
+            # Los candidatos salen del término más selectivo; el puntaje verifica el resto
+            candidates = min((snapshot.candidates(token) for token in tokens), key=len)
+            for row_id in candidates:
+                row = snapshot.rows[row_id]
+                if predicate is not None and not predicate(row):
+                    continue
+                score = snapshot.score(row_id, tokens)
+                if score:
+                    results.append((-score, snapshot.labels[row_id], row_id))
+            results.sort()
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats['searches'] += 1
+            self._stats['search_time_ms'] += elapsed
+        return [dict(snapshot.rows[row_id]) for _, _, row_id in results]
+
+    def stats(self) -> Dict:
+        """Contadores de uso del índice"""
+        snapshot = self._snapshot
+        with self._lock:
+            data = dict(self._stats)
+        data['avg_search_ms'] = round(data['search_time_ms'] / data['searches'], 3) if data['searches'] else 0.0
+        data['search_time_ms'] = round(data['search_time_ms'], 2)
+        data.update({
+            'documents': len(snapshot.rows) if snapshot else 0,
+            'terms': len(snapshot.prefixes) if snapshot else 0,
+            'ttl': self.ttl,
+        })
+        return data
+
+def _load_table(query: str) -> Callable[[], List[Dict]]:
+    def load() -> List[Dict]:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+    return load
+
+# Columnas de usuarios que se pueden mostrar (nunca el hash de la contraseña)
+USER_COLUMNS = "id, username, nombre, rol, activo, created_at"
+
+# Toda escritura sobre usuarios o descuentos debe llamar a invalidate() del índice;
+# el de productos sigue la versión del catálogo (product_catalog.invalidate()).
+user_search = SearchIndex('usuarios', _load_table(f"SELECT {USER_COLUMNS} FROM usuarios"), [('nombre', 2), ('username', 3)])
+product_search = SearchIndex(
+    'productos', lambda: product_catalog.get_products(active_only=False),
+    [('nombre', 3), ('categoria', 1)], version=lambda: product_catalog.version
+)
+discount_search = SearchIndex('descuentos', _load_table("SELECT * FROM descuentos"), [('codigo', 3)])
+
+def search_stats() -> Dict:
+    """Métricas de todos los índices"""
+    return {index.name: index.stats() for index in (user_search, product_search, discount_search)}
@@ -1,126 +1,178 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from database import get_db_connection
+from mysql.connector.errors import IntegrityError
+from catalog import product_catalog
+from discount_rules import discount_rules, price_discount
+from events import kitchen_hub
+from live_stats import live_admin_stats
+from rollups import record_order, touch_order_day
 from models import Producto, Pedido, PedidoItem, Descuento
 from datetime import datetime
-from utils import get_guatemala_time
-import random
+from utils import get_guatemala_time, elapsed_seconds
 
 def get_products(active_only: bool = True) -> List[Dict]:
-    """Obtiene todos los productos"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        if active_only:
-            cursor.execute("SELECT * FROM productos WHERE activo = 1 ORDER BY categoria, nombre")
-        else:
-            cursor.execute("SELECT * FROM productos ORDER BY categoria, nombre")
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    """Obtiene todos los productos (desde el catálogo en memoria)"""
+    return product_catalog.get_products(active_only)
+
+def get_products_by_category() -> Dict[str, List[Dict]]:
+    """Obtiene los productos activos agrupados por categoría"""
+    return product_catalog.get_by_category()
 
 def get_product_by_id(product_id: int) -> Optional[Dict]:
     """Obtiene un producto por ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("SELECT * FROM productos WHERE id = %s", (product_id,))
-        return cursor.fetchone()
-    finally:
-        cursor.close()
-        conn.close()
+    return product_catalog.get(product_id)
 
-def calculate_cart_total(cart: List[int]) -> float:
-    """Calcula el total del carrito"""
-    total = 0.0
-    for item_id in cart:
-        product = get_product_by_id(item_id)
-        if product:
-            total += float(product['precio'])
-    return total
+def get_products_by_ids(product_ids: List[int]) -> Dict[int, Dict]:
+    """Obtiene varios productos por ID"""
+    return product_catalog.get_many([int(product_id) for product_id in product_ids])
 
-def apply_discount(total: float, discount_code: Optional[str] = None) -> Dict:
-    """Aplica un descuento si existe el código"""
-    if not discount_code:
-        return {'total': total, 'discount': 0, 'discount_info': None}
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute(
-            "SELECT * FROM descuentos WHERE codigo = %s AND activo = 1",
-            (discount_code.upper(),)
-        )
-        discount = cursor.fetchone()
-        
-        if not discount:
-            return {'total': total, 'discount': 0, 'discount_info': None}
-        
-        discount_amount = 0.0
-        if discount['tipo'] == 'porcentaje':
-            discount_amount = total * (float(discount['valor']) / 100)
-        else:
-            discount_amount = float(discount['valor'])
-        
-        discount_amount = min(discount_amount, total)
-        
-        return {
-            'total': total - discount_amount,
-            'discount': discount_amount,
-            'discount_info': discount
-        }
-    finally:
-        cursor.close()
-        conn.close()
+def cart_quantities(cart: Union[List[int], Dict[int, int]]) -> Dict[int, int]:
+    """Normaliza el carrito a {producto_id: cantidad} (acepta la lista de IDs repetidos)"""
+    if isinstance(cart, dict):
+        return {int(product_id): int(qty) for product_id, qty in cart.items()}
+    quantities = {}
+    for product_id in cart:
+        quantities[int(product_id)] = quantities.get(int(product_id), 0) + 1
+    return quantities
 
-def get_grouped_cart(cart: List[int]) -> Dict:
-    """Agrupa los items del carrito por producto"""
+def price_cart(cart: Union[List[int], Dict[int, int]], discount_code: Optional[str] = None) -> Dict:
+    """Calcula líneas agrupadas, subtotal y descuento del carrito con una sola lectura de productos"""
+    quantities = cart_quantities(cart)
+    products = get_products_by_ids(list(quantities))
     grouped = {}
-    for item_id in cart:
-        product = get_product_by_id(item_id)
-        if product:
+    subtotal = 0.0
+    for item_id, quantity in quantities.items():
+        product = products.get(item_id)
+        if product and quantity > 0:
             name = product['nombre']
             if name not in grouped:
                 grouped[name] = {'product': product, 'quantity': 0}
-            grouped[name]['quantity'] += 1
-    return grouped
+            grouped[name]['quantity'] += quantity
+            subtotal += float(product['precio']) * quantity
+    
+    return {
+        'grouped': grouped,
+        'subtotal': subtotal,
+        'discount_info': apply_discount(subtotal, discount_code)
+    }
+
+def calculate_cart_total(cart: Union[List[int], Dict[int, int]]) -> float:
+    """Calcula el total del carrito"""
+    return price_cart(cart)['subtotal']
+
+def apply_discount(total: float, discount_code: Optional[str] = None) -> Dict:
+    """Aplica un descuento si existe el código (reglas en memoria, sin consultar MySQL)"""
+    return price_discount(total, discount_rules.get(discount_code))
+
+def get_grouped_cart(cart: Union[List[int], Dict[int, int]]) -> Dict:
+    """Agrupa los items del carrito por producto"""
+    return price_cart(cart)['grouped']
+
+def next_order_number(cursor) -> str:
+    """Siguiente número de pedido del día (P<fecha>-<secuencia>), sin colisiones
 
-def create_order(cart: List[int], subtotal: float, discount_code: Optional[str] = None) -> int:
-    """Crea un nuevo pedido"""
-    discount_info = apply_discount(subtotal, discount_code)
+    LAST_INSERT_ID(expr) deja el valor en la conexión y la fila de la secuencia
+    queda bloqueada hasta el commit, así dos pedidos nunca reciben el mismo número.
+    """
+    today = get_guatemala_time().date()
+    cursor.execute(
+        "INSERT INTO pedido_secuencias (fecha, ultimo) VALUES (%s, LAST_INSERT_ID(1)) "
+        "ON DUPLICATE KEY UPDATE ultimo = LAST_INSERT_ID(ultimo + 1)",
+        (today,)
+    )
+    cursor.execute("SELECT LAST_INSERT_ID()")
+    sequence = cursor.fetchone()[0]
+    return f"P{today.strftime('%Y%m%d')}-{str(sequence).zfill(4)}"
+
+def find_order_by_key(cursor, idempotency_key: str) -> Optional[int]:
+    """ID del pedido ya creado con esa llave de idempotencia"""
+    cursor.execute("SELECT id FROM pedidos WHERE idempotency_key = %s", (idempotency_key,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def create_order(cart: Union[List[int], Dict[int, int]], subtotal: float, discount_code: Optional[str] = None,
+                 pricing: Optional[Dict] = None, idempotency_key: Optional[str] = None) -> int:
+    """Crea un nuevo pedido en una sola transacción (reutiliza `pricing` de price_cart si ya se calculó)
+
+    Si se envía `idempotency_key` y ya existe un pedido con esa llave, retorna
+    su ID sin crear otro (p. ej. doble toque en "Confirmar").
+    """
+    if pricing is None:
+        pricing = price_cart(cart, discount_code)
+    discount_info = pricing['discount_info']
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Generar número de pedido usando hora de Guatemala
-        numero_pedido = f"P{get_guatemala_time().strftime('%Y%m%d')}-{str(random.randint(1, 9999)).zfill(4)}"
-        
-        # Crear pedido
-        cursor.execute(
-            "INSERT INTO pedidos (numero_pedido, total, descuento, total_final) VALUES (%s, %s, %s, %s)",
-            (numero_pedido, subtotal, discount_info['discount'], discount_info['total'])
-        )
-        pedido_id = cursor.lastrowid
+        if idempotency_key:
+            existing_id = find_order_by_key(cursor, idempotency_key)
+            if existing_id:
+                return existing_id
         
-        # Guardar items
-        grouped = get_grouped_cart(cart)
-        for name, data in grouped.items():
-            product = data['product']
+        conn.start_transaction()
+        try:
+            numero_pedido = next_order_number(cursor)
+            
             cursor.execute(
+                "INSERT INTO pedidos (numero_pedido, total, descuento, total_final, idempotency_key) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (numero_pedido, subtotal, discount_info['discount'], discount_info['total'], idempotency_key)
+            )
+            pedido_id = cursor.lastrowid
+            
+            cursor.executemany(
                 "INSERT INTO pedido_items (pedido_id, producto_id, producto_nombre, precio, cantidad) VALUES (%s, %s, %s, %s, %s)",
-                (pedido_id, product['id'], product['nombre'], product['precio'], data['quantity'])
+                [
+                    (pedido_id, data['product']['id'], data['product']['nombre'], data['product']['precio'], data['quantity'])
+                    for data in pricing['grouped'].values()
+                ]
             )
+            
+            # Sumar el pedido a las tablas de ventas diarias
+            record_order(cursor, pedido_id)
+            
+            conn.commit()
+        except IntegrityError:
+            conn.rollback()
+            # Otra petición con la misma llave ganó la carrera: retornar su pedido
+            existing_id = find_order_by_key(cursor, idempotency_key) if idempotency_key else None
+            if existing_id:
+                return existing_id
+            raise
+        except Exception:
+            conn.rollback()
+            raise
         
-        conn.commit()
+        cursor.execute("SELECT * FROM pedidos WHERE id = %s", (pedido_id,))
+        columns = [column[0] for column in cursor.description]
+        order = dict(zip(columns, cursor.fetchone()))
+        items = [
+            {'producto_nombre': data['product']['nombre'], 'cantidad': data['quantity']}
+            for data in pricing['grouped'].values()
+        ]
+        live_admin_stats.order_created(order)
+        kitchen_hub.publish('order_created', kitchen_order_payload(order, items))
         return pedido_id
     finally:
         cursor.close()
         conn.close()
 
+def kitchen_order_payload(order: Dict, items: List[Dict]) -> Dict:
+    """Representación JSON de un pedido para la pantalla de cocina"""
+    fecha_hora = order.get('fecha_hora')
+    return {
+        'id': order['id'],
+        'numero_pedido': order.get('numero_pedido', ''),
+        'estado': order.get('estado') or 'pending',
+        'hora': fecha_hora.strftime('%I:%M %p') if hasattr(fecha_hora, 'strftime') else '',
+        'total_final': float(order.get('total_final') or 0),
+        'items': [
+            {'producto_nombre': item.get('producto_nombre', ''), 'cantidad': item.get('cantidad', 0)}
+            for item in items
+        ]
+    }
+
 def get_order_by_id(order_id: int) -> Optional[Dict]:
     """Obtiene un pedido por ID"""
     conn = get_db_connection()
@@ -151,27 +203,27 @@ def update_order_status(order_id: int, new_status: str):
     cursor = conn.cursor()
     
     try:
-        if new_status == 'ready':
-            # Obtener fecha del pedido
-            cursor.execute("SELECT fecha_hora FROM pedidos WHERE id = %s", (order_id,))
-            order_row = cursor.fetchone()
-            if order_row and order_row[0]:
-                tiempo = int((get_guatemala_time() - order_row[0]).total_seconds())
-                cursor.execute(
-                    "UPDATE pedidos SET estado = %s, tiempo_preparacion = %s WHERE id = %s",
-                    (new_status, tiempo, order_id)
-                )
-            else:
-                cursor.execute(
-                    "UPDATE pedidos SET estado = %s WHERE id = %s",
-                    (new_status, order_id)
-                )
+        # Estado y tiempo anteriores para ajustar las estadísticas del panel
+        cursor.execute("SELECT fecha_hora, estado, tiempo_preparacion FROM pedidos WHERE id = %s", (order_id,))
+        order_row = cursor.fetchone()
+        tiempo = None
+        if new_status == 'ready' and order_row and order_row[0]:
+            # fecha_hora viene sin timezone: restar un datetime con timezone lanzaba TypeError
+            tiempo = elapsed_seconds(order_row[0])
+            cursor.execute(
+                "UPDATE pedidos SET estado = %s, tiempo_preparacion = %s WHERE id = %s",
+                (new_status, tiempo, order_id)
+            )
         else:
             cursor.execute(
                 "UPDATE pedidos SET estado = %s WHERE id = %s",
                 (new_status, order_id)
             )
+        touch_order_day(cursor, order_id)
         conn.commit()
+        if order_row:
+            live_admin_stats.order_status_changed(order_row[0], order_row[1], new_status, order_row[2], tiempo)
+        kitchen_hub.publish('order_status', {'id': order_id, 'estado': new_status})
     finally:
         cursor.close()
         conn.close()
@@ -188,26 +240,37 @@ def get_active_orders() -> List[Dict]:
         cursor.close()
         conn.close()
 
-def get_admin_stats() -> Dict:
-    """Obtiene estadísticas para el panel de administración"""
+def get_kitchen_board() -> List[Dict]:
+    """Obtiene los pedidos activos con sus items en dos consultas sobre una sola conexión"""
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_pedidos,
-                COALESCE(SUM(total_final), 0) as ventas_totales,
-                COALESCE(AVG(tiempo_preparacion), 0) as tiempo_promedio,
-                SUM(CASE WHEN estado = 'preparing' THEN 1 ELSE 0 END) as en_preparacion
-            FROM pedidos
-            WHERE DATE(fecha_hora) = CURDATE()
-        """)
-        return cursor.fetchone()
+        cursor.execute("SELECT * FROM pedidos WHERE estado != 'delivered' ORDER BY fecha_hora ASC")
+        orders = cursor.fetchall()
+        if not orders:
+            return orders
+        
+        items_by_order = {order['id']: [] for order in orders}
+        placeholders = ', '.join(['%s'] * len(items_by_order))
+        cursor.execute(
+            f"SELECT * FROM pedido_items WHERE pedido_id IN ({placeholders}) ORDER BY pedido_id, id",
+            list(items_by_order)
+        )
+        for item in cursor.fetchall():
+            items_by_order[item['pedido_id']].append(item)
+        
+        for order in orders:
+            order['items'] = items_by_order[order['id']]
+        return orders
     finally:
         cursor.close()
         conn.close()
 
+def get_admin_stats() -> Dict:
+    """Obtiene estadísticas para el panel de administración (contadores en memoria)"""
+    return live_admin_stats.get()
+
 def get_recent_orders(limit: int = 10) -> List[Dict]:
     """Obtiene pedidos recientes"""
     conn = get_db_connection()
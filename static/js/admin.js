@@ -0,0 +1,1076 @@
+// Panel de administración: secciones, modales y reportes (templates/admin.html)
+let currentUserId = null;
+
+function openUserModal(userId = null) {
+    currentUserId = userId;
+    const modalElement = document.getElementById('userModal');
+    const modal = new bootstrap.Modal(modalElement);
+    const form = document.getElementById('userForm');
+    const modalTitle = document.getElementById('userModalTitle');
+    const passwordField = document.getElementById('userPassword');
+    const passwordHint = document.getElementById('passwordHint');
+    const passwordRequired = document.getElementById('passwordRequired');
+    
+    if (userId) {
+        modalTitle.innerHTML = '<i class="bi bi-pencil"></i> Editar Usuario';
+        passwordRequired.style.display = 'none';
+        passwordHint.textContent = 'Deja vacío para mantener la contraseña actual';
+        passwordField.required = false;
+        
+        fetch(`/api/users/${userId}`)
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    document.getElementById('userId').value = data.user.id;
+                    document.getElementById('userNombre').value = data.user.nombre;
+                    document.getElementById('userUsername').value = data.user.username;
+                    document.getElementById('userRol').value = data.user.rol;
+                    modal.show();
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo cargar el usuario', 'error');
+                }
+            });
+    } else {
+        modalTitle.innerHTML = '<i class="bi bi-person-plus"></i> Agregar Usuario';
+        form.reset();
+        document.getElementById('userId').value = '';
+        passwordRequired.style.display = 'inline';
+        passwordHint.textContent = '';
+        passwordField.required = true;
+        modal.show();
+    }
+}
+
+function closeUserModal() {
+    const modalElement = document.getElementById('userModal');
+    const modal = bootstrap.Modal.getInstance(modalElement);
+    if (modal) {
+        modal.hide();
+    }
+    currentUserId = null;
+}
+
+function saveUser(event) {
+    event.preventDefault();
+    const form = event.target;
+    const formData = new FormData(form);
+    const userId = formData.get('id');
+    
+    const url = userId ? `/api/users/${userId}` : '/api/users';
+    const method = userId ? 'PUT' : 'POST';
+    
+    fetch(url, {
+        method: method,
+        body: formData
+    })
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            Swal.fire('¡Éxito!', data.message, 'success').then(() => {
+                closeUserModal();
+                reloadSection('users');
+            });
+        } else {
+            Swal.fire('Error', data.error || 'No se pudo guardar el usuario', 'error');
+        }
+    })
+    .catch(error => {
+        Swal.fire('Error', 'Error al procesar la solicitud', 'error');
+    });
+}
+
+function editUser(userId) {
+    openUserModal(userId);
+}
+
+function deleteUser(userId) {
+    Swal.fire({
+        title: '¿Desactivar usuario?',
+        text: 'El usuario será desactivado y no podrá iniciar sesión',
+        icon: 'warning',
+        showCancelButton: true,
+        confirmButtonColor: '#ef4444',
+        cancelButtonColor: '#6b7280',
+        confirmButtonText: 'Sí, desactivar',
+        cancelButtonText: 'Cancelar'
+    }).then((result) => {
+        if (result.isConfirmed) {
+            fetch(`/api/users/${userId}`, {
+                method: 'DELETE'
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    Swal.fire('¡Desactivado!', data.message, 'success').then(() => {
+                        reloadSection('users');
+                    });
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo desactivar el usuario', 'error');
+                }
+            });
+        }
+    });
+}
+
+function activateUser(userId) {
+    Swal.fire({
+        title: '¿Activar usuario?',
+        text: 'El usuario podrá iniciar sesión nuevamente',
+        icon: 'question',
+        showCancelButton: true,
+        confirmButtonColor: '#10b981',
+        cancelButtonColor: '#6b7280',
+        confirmButtonText: 'Sí, activar',
+        cancelButtonText: 'Cancelar'
+    }).then((result) => {
+        if (result.isConfirmed) {
+            fetch(`/api/users/${userId}/activate`, {
+                method: 'POST'
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    Swal.fire('¡Activado!', data.message, 'success').then(() => {
+                        reloadSection('users');
+                    });
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo activar el usuario', 'error');
+                }
+            });
+        }
+    });
+}
+
+// Cerrar modal al hacer clic fuera
+document.getElementById('userModal').addEventListener('click', function(e) {
+    if (e.target === this) {
+        closeUserModal();
+    }
+});
+
+// ========================================
+// FUNCIONES DE PRODUCTOS
+// ========================================
+let currentProductId = null;
+
+function openProductModal(productId = null) {
+    currentProductId = productId;
+    const modalElement = document.getElementById('productModal');
+    const modal = new bootstrap.Modal(modalElement);
+    const form = document.getElementById('productForm');
+    const modalTitle = document.getElementById('productModalTitle');
+    
+    if (productId) {
+        modalTitle.innerHTML = '<i class="bi bi-pencil"></i> Editar Producto';
+        
+        fetch(`/api/products/${productId}`)
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    document.getElementById('productId').value = data.product.id;
+                    document.getElementById('productNombre').value = data.product.nombre;
+                    document.getElementById('productPrecio').value = data.product.precio;
+                    document.getElementById('productCategoria').value = data.product.categoria;
+                    modal.show();
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo cargar el producto', 'error');
+                }
+            });
+    } else {
+        modalTitle.innerHTML = '<i class="bi bi-plus-circle"></i> Agregar Producto';
+        form.reset();
+        document.getElementById('productId').value = '';
+        modal.show();
+    }
+}
+
+function closeProductModal() {
+    const modalElement = document.getElementById('productModal');
+    const modal = bootstrap.Modal.getInstance(modalElement);
+    if (modal) {
+        modal.hide();
+    }
+    currentProductId = null;
+}
+
+function saveProduct(event) {
+    event.preventDefault();
+    const form = event.target;
+    const formData = new FormData(form);
+    const productId = formData.get('id');
+    
+    const url = productId ? `/api/products/${productId}` : '/api/products';
+    const method = productId ? 'PUT' : 'POST';
+    
+    fetch(url, {
+        method: method,
+        body: formData
+    })
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            Swal.fire('¡Éxito!', data.message, 'success').then(() => {
+                closeProductModal();
+                reloadSection('products');
+            });
+        } else {
+            Swal.fire('Error', data.error || 'No se pudo guardar el producto', 'error');
+        }
+    })
+    .catch(error => {
+        Swal.fire('Error', 'Error al procesar la solicitud', 'error');
+    });
+}
+
+function editProduct(productId) {
+    openProductModal(productId);
+}
+
+function deleteProduct(productId) {
+    Swal.fire({
+        title: '¿Desactivar producto?',
+        text: 'El producto será desactivado y no aparecerá en el menú',
+        icon: 'warning',
+        showCancelButton: true,
+        confirmButtonColor: '#ef4444',
+        cancelButtonColor: '#6b7280',
+        confirmButtonText: 'Sí, desactivar',
+        cancelButtonText: 'Cancelar'
+    }).then((result) => {
+        if (result.isConfirmed) {
+            fetch(`/api/products/${productId}`, {
+                method: 'DELETE'
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    Swal.fire('¡Desactivado!', data.message, 'success').then(() => {
+                        reloadSection('products');
+                    });
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo desactivar el producto', 'error');
+                }
+            });
+        }
+    });
+}
+
+function activateProduct(productId) {
+    Swal.fire({
+        title: '¿Activar producto?',
+        text: 'El producto aparecerá nuevamente en el menú',
+        icon: 'question',
+        showCancelButton: true,
+        confirmButtonColor: '#10b981',
+        cancelButtonColor: '#6b7280',
+        confirmButtonText: 'Sí, activar',
+        cancelButtonText: 'Cancelar'
+    }).then((result) => {
+        if (result.isConfirmed) {
+            fetch(`/api/products/${productId}/activate`, {
+                method: 'POST'
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    Swal.fire('¡Activado!', data.message, 'success').then(() => {
+                        reloadSection('products');
+                    });
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo activar el producto', 'error');
+                }
+            });
+        }
+    });
+}
+
+// ========================================
+// SECCIONES (se cargan desde /api/* al mostrarse)
+// ========================================
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[ch]);
+}
+
+function money(value) {
+    return `Q${parseFloat(value || 0).toFixed(2)}`;
+}
+
+function activeBadge(activo) {
+    return activo
+        ? '<span class="badge bg-success">✅ Activo</span>'
+        : '<span class="badge bg-danger">❌ Inactivo</span>';
+}
+
+function actionButtons(entity, id, activo) {
+    const toggle = activo
+        ? `<button onclick='delete${entity}(${id})' class="btn btn-danger"><i class="bi bi-trash"></i></button>`
+        : `<button onclick='activate${entity}(${id})' class="btn btn-success"><i class="bi bi-check-circle"></i></button>`;
+    return `<div class="btn-group btn-group-sm">
+        <button onclick='edit${entity}(${id})' class="btn btn-primary"><i class="bi bi-pencil"></i></button>
+        ${toggle}
+    </div>`;
+}
+
+// "2024-05-01 13:45:00" (hora de Guatemala, como la envía el servidor) -> "01/05/2024 13:45"
+function formatDateTime(value) {
+    const match = /^(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2})/.exec(value || '');
+    return match ? `${match[3]}/${match[2]}/${match[1]} ${match[4]}:${match[5]}` : '';
+}
+
+// Filas por página de cada tabla (la API pagina con cursores)
+const PAGE_SIZE = 50;
+
+// Una página de un listado paginado; `after` es el cursor `next` de la anterior
+async function fetchPage(url, key, search, after) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (search) {
+        params.set('search', search);
+    }
+    if (after) {
+        params.set('after', after);
+    }
+    const res = await fetch(`${url}?${params.toString()}`);
+    const data = await res.json();
+    if (!data.success) {
+        throw new Error(data.error || 'No se pudo cargar la sección');
+    }
+    return { rows: data[key], next: data.pagination.next };
+}
+
+const SECTIONS = {
+    'products': {
+        table: '#productsTable', noun: 'productos', url: '/api/products', key: 'products',
+        row: prod => `<tr class="product-row" data-category="${escapeHtml(prod.categoria)}" data-name="${escapeHtml(prod.nombre.toLowerCase())}">
+            <td class="fw-semibold">${escapeHtml(prod.nombre)}</td>
+            <td><span class="badge bg-light text-dark">${escapeHtml(prod.categoria)}</span></td>
+            <td class="text-end fw-bold text-success">${money(prod.precio)}</td>
+            <td class="text-center">${activeBadge(prod.activo)}</td>
+            <td class="text-end">${actionButtons('Product', prod.id, prod.activo)}</td>
+        </tr>`
+    },
+    'users': {
+        table: '#usersTable', noun: 'usuarios', url: '/api/users', key: 'users',
+        row: usuario => `<tr class="user-row" data-name="${escapeHtml(usuario.nombre.toLowerCase())}" data-username="${escapeHtml(usuario.username.toLowerCase())}">
+            <td class="fw-semibold">${escapeHtml(usuario.nombre)}</td>
+            <td><code class="text-muted">@${escapeHtml(usuario.username)}</code></td>
+            <td class="text-center">${usuario.rol === 'admin'
+                ? '<span class="badge bg-primary"><i class="bi bi-person-badge"></i> Admin</span>'
+                : '<span class="badge bg-warning text-dark"><i class="bi bi-person"></i> Mesero</span>'}</td>
+            <td class="text-center">${activeBadge(usuario.activo)}</td>
+            <td class="text-end">${actionButtons('User', usuario.id, usuario.activo)}</td>
+        </tr>`
+    },
+    'discounts': {
+        table: '#discountsTable', noun: 'descuentos', url: '/api/discounts', key: 'discounts',
+        row: desc => `<tr class="discount-row" data-code="${escapeHtml(desc.codigo.toLowerCase())}">
+            <td class="fw-bold"><code>${escapeHtml(desc.codigo)}</code></td>
+            <td>${desc.tipo === 'porcentaje'
+                ? '<span class="badge bg-info"><i class="bi bi-percent"></i> Porcentaje</span>'
+                : '<span class="badge bg-warning text-dark"><i class="bi bi-currency-dollar"></i> Fijo</span>'}</td>
+            <td class="text-end fw-bold text-success">${desc.tipo === 'porcentaje' ? `${parseFloat(desc.valor)}%` : money(desc.valor)}</td>
+            <td class="text-center">${activeBadge(desc.activo)}</td>
+            <td class="text-end">${actionButtons('Discount', desc.id, desc.activo)}</td>
+        </tr>`
+    },
+    'recent-orders': {
+        load: async () => {
+            const res = await fetch('/api/orders/recent?limit=10');
+            const data = await res.json();
+            if (!data.success) {
+                throw new Error(data.error || 'No se pudieron cargar los pedidos');
+            }
+            return data.orders;
+        },
+        render: orders => {
+            const badges = { pending: 'bg-warning text-dark', preparing: 'bg-info', ready: 'bg-success' };
+            document.getElementById('recentOrders').innerHTML = orders.map(order => `
+                <div class="list-group-item d-flex justify-content-between align-items-center">
+                    <div>
+                        <h6 class="mb-1 fw-bold">${escapeHtml(order.numero_pedido)}</h6>
+                        <small class="text-muted"><i class="bi bi-calendar"></i> ${formatDateTime(order.fecha_hora)}</small>
+                    </div>
+                    <div class="text-end">
+                        <div class="fw-bold text-success mb-1">${money(order.total_final)}</div>
+                        <span class="badge ${badges[order.estado] || 'bg-secondary'}">${escapeHtml((order.estado || '').toUpperCase())}</span>
+                    </div>
+                </div>`).join('') || '<div class="list-group-item text-center text-muted py-4">Sin pedidos</div>';
+        }
+    }
+};
+
+// Cursor de la siguiente página y búsqueda actual de cada tabla
+const sectionState = {};
+
+// Carga la siguiente página de una tabla; con reset=true empieza desde la primera
+async function loadPage(name, reset) {
+    const section = SECTIONS[name];
+    const state = sectionState[name] || (sectionState[name] = { next: null, search: '', request: 0 });
+    if (reset) {
+        state.next = null;
+        state.search = (document.querySelector(`[data-search="${name}"]`)?.value || '').trim();
+    }
+    // Una respuesta que llega después de otra búsqueda más reciente se descarta
+    const request = ++state.request;
+    const page = await fetchPage(section.url, section.key, state.search, reset ? null : state.next);
+    if (request !== state.request) {
+        return;
+    }
+    const tbody = document.querySelector(`${section.table} tbody`);
+    const html = page.rows.map(section.row).join('');
+    if (reset) {
+        tbody.innerHTML = html || `<tr><td colspan="5" class="text-center text-muted py-4">No se encontraron ${section.noun}</td></tr>`;
+    } else {
+        tbody.insertAdjacentHTML('beforeend', html);
+    }
+    state.next = page.next;
+    document.querySelector(`[data-more="${name}"]`).classList.toggle('d-none', !page.next);
+}
+
+function reloadSection(name) {
+    const section = SECTIONS[name];
+    const loading = section.render
+        ? section.load().then(rows => section.render(rows))
+        : loadPage(name, true);
+    return loading.catch(error => Swal.fire('Error', error.message, 'error'));
+}
+
+function loadMore(name) {
+    return loadPage(name, false).catch(error => Swal.fire('Error', error.message, 'error'));
+}
+
+// Cada sección se pide la primera vez que se acerca a la pantalla
+function observeSections() {
+    const elements = document.querySelectorAll('[data-section]');
+    if (!('IntersectionObserver' in window)) {
+        elements.forEach(element => reloadSection(element.dataset.section));
+        return;
+    }
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                reloadSection(entry.target.dataset.section);
+            }
+        });
+    }, { rootMargin: '200px' });
+    elements.forEach(element => observer.observe(element));
+}
+
+// Búsqueda en el servidor (índice en memoria) y botón "Cargar más" de cada tabla
+function bindSectionControls() {
+    document.querySelectorAll('[data-search]').forEach(input => {
+        let timer = null;
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => reloadSection(input.dataset.search), 300);
+        });
+    });
+    document.querySelectorAll('[data-more]').forEach(container => {
+        container.querySelector('button').addEventListener('click', () => loadMore(container.dataset.more));
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    observeSections();
+    bindSectionControls();
+    
+    // Formularios pedidos por URL (?action=edit_product_form&id=N)
+    const panel = document.getElementById('adminPanel');
+    const action = panel.dataset.action;
+    const actionId = parseInt(panel.dataset.actionId, 10);
+    if (action === 'add_product_form') {
+        openProductModal();
+    } else if (action === 'edit_product_form' && actionId) {
+        openProductModal(actionId);
+    } else if (action === 'add_user_form') {
+        openUserModal();
+    } else if (action === 'edit_user_form' && actionId) {
+        openUserModal(actionId);
+    }
+    
+    // Actualizar hint del valor según el tipo
+    $('#discountTipo').on('change', function() {
+        const tipo = $(this).val();
+        const hint = $('#valorHint');
+        if (tipo === 'porcentaje') {
+            hint.text('Ingresa un porcentaje (ej: 10 para 10%, máximo 100)');
+            $('#discountValor').attr('max', '100');
+        } else if (tipo === 'fijo') {
+            hint.text('Ingresa una cantidad fija en quetzales (ej: 15.50)');
+            $('#discountValor').removeAttr('max');
+        } else {
+            hint.text('');
+        }
+    });
+});
+
+// Limpiar modal cuando se oculta
+document.getElementById('productModal').addEventListener('hidden.bs.modal', function () {
+    document.getElementById('productForm').reset();
+    currentProductId = null;
+});
+
+// ========================================
+// FUNCIONES DE DESCUENTOS
+// ========================================
+let currentDiscountId = null;
+
+function openDiscountModal(discountId = null) {
+    currentDiscountId = discountId;
+    const modalElement = document.getElementById('discountModal');
+    const modal = new bootstrap.Modal(modalElement);
+    const form = document.getElementById('discountForm');
+    const modalTitle = document.getElementById('discountModalTitle');
+    const valorHint = document.getElementById('valorHint');
+    
+    if (discountId) {
+        modalTitle.innerHTML = '<i class="bi bi-pencil"></i> Editar Descuento';
+        
+        fetch(`/api/discounts/${discountId}`)
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    document.getElementById('discountId').value = data.discount.id;
+                    document.getElementById('discountCodigo').value = data.discount.codigo;
+                    document.getElementById('discountTipo').value = data.discount.tipo;
+                    document.getElementById('discountValor').value = data.discount.valor;
+                    
+                    // Actualizar hint
+                    if (data.discount.tipo === 'porcentaje') {
+                        valorHint.textContent = 'Ingresa un porcentaje (ej: 10 para 10%, máximo 100)';
+                        document.getElementById('discountValor').setAttribute('max', '100');
+                    } else {
+                        valorHint.textContent = 'Ingresa una cantidad fija en quetzales (ej: 15.50)';
+                        document.getElementById('discountValor').removeAttribute('max');
+                    }
+                    modal.show();
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo cargar el descuento', 'error');
+                }
+            });
+    } else {
+        modalTitle.innerHTML = '<i class="bi bi-tag"></i> Agregar Descuento';
+        form.reset();
+        document.getElementById('discountId').value = '';
+        valorHint.textContent = '';
+        document.getElementById('discountValor').removeAttribute('max');
+        modal.show();
+    }
+}
+
+function closeDiscountModal() {
+    const modalElement = document.getElementById('discountModal');
+    const modal = bootstrap.Modal.getInstance(modalElement);
+    if (modal) {
+        modal.hide();
+    }
+    currentDiscountId = null;
+}
+
+function saveDiscount(event) {
+    event.preventDefault();
+    const form = event.target;
+    const formData = new FormData(form);
+    const discountId = formData.get('id');
+    
+    const url = discountId ? `/api/discounts/${discountId}` : '/api/discounts';
+    const method = discountId ? 'PUT' : 'POST';
+    
+    fetch(url, {
+        method: method,
+        body: formData
+    })
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            Swal.fire('¡Éxito!', data.message, 'success').then(() => {
+                closeDiscountModal();
+                reloadSection('discounts');
+            });
+        } else {
+            Swal.fire('Error', data.error || 'No se pudo guardar el descuento', 'error');
+        }
+    })
+    .catch(error => {
+        Swal.fire('Error', 'Error al procesar la solicitud', 'error');
+    });
+}
+
+function editDiscount(discountId) {
+    openDiscountModal(discountId);
+}
+
+function deleteDiscount(discountId) {
+    Swal.fire({
+        title: '¿Desactivar descuento?',
+        text: 'El descuento será desactivado y no podrá ser usado',
+        icon: 'warning',
+        showCancelButton: true,
+        confirmButtonColor: '#ef4444',
+        cancelButtonColor: '#6b7280',
+        confirmButtonText: 'Sí, desactivar',
+        cancelButtonText: 'Cancelar'
+    }).then((result) => {
+        if (result.isConfirmed) {
+            fetch(`/api/discounts/${discountId}`, {
+                method: 'DELETE'
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    Swal.fire('¡Desactivado!', data.message, 'success').then(() => {
+                        reloadSection('discounts');
+                    });
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo desactivar el descuento', 'error');
+                }
+            });
+        }
+    });
+}
+
+function activateDiscount(discountId) {
+    Swal.fire({
+        title: '¿Activar descuento?',
+        text: 'El descuento podrá ser usado nuevamente',
+        icon: 'question',
+        showCancelButton: true,
+        confirmButtonColor: '#10b981',
+        cancelButtonColor: '#6b7280',
+        confirmButtonText: 'Sí, activar',
+        cancelButtonText: 'Cancelar'
+    }).then((result) => {
+        if (result.isConfirmed) {
+            fetch(`/api/discounts/${discountId}/activate`, {
+                method: 'POST'
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (data.success) {
+                    Swal.fire('¡Activado!', data.message, 'success').then(() => {
+                        reloadSection('discounts');
+                    });
+                } else {
+                    Swal.fire('Error', data.error || 'No se pudo activar el descuento', 'error');
+                }
+            });
+        }
+    });
+}
+
+// Limpiar modales cuando se ocultan
+document.getElementById('userModal').addEventListener('hidden.bs.modal', function () {
+    document.getElementById('userForm').reset();
+    currentUserId = null;
+});
+
+document.getElementById('discountModal').addEventListener('hidden.bs.modal', function () {
+    document.getElementById('discountForm').reset();
+    currentDiscountId = null;
+});
+
+// FUNCIONES DE REPORTES
+// ========================================
+function openReportModal(reportType) {
+    switch(reportType) {
+        case 'sales-day':
+            generateSalesDayReport();
+            break;
+        case 'top-products':
+            generateTopProductsReport();
+            break;
+        case 'sales-range':
+            showSalesRangeForm();
+            break;
+        case 'categories':
+            generateCategoriesReport();
+            break;
+    }
+}
+
+function generateSalesDayReport() {
+    const today = new Date().toISOString().split('T')[0];
+    
+    Swal.fire({
+        title: 'Ventas del Día',
+        html: `
+            <div style="text-align: left; margin-top: 1rem;">
+                <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha:</label>
+                <input type="date" id="salesDayDate" value="${today}" style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+            </div>
+        `,
+        showCancelButton: true,
+        confirmButtonText: 'Generar Reporte',
+        cancelButtonText: 'Cancelar',
+        confirmButtonColor: '#8b5cf6',
+        preConfirm: () => {
+            const date = document.getElementById('salesDayDate').value;
+            if (!date) {
+                Swal.showValidationMessage('Por favor selecciona una fecha');
+                return false;
+            }
+            return date;
+        }
+    }).then((result) => {
+        if (result.isConfirmed && result.value) {
+            const selectedDate = result.value;
+            fetch(`/api/reports/sales-day?date=${selectedDate}&limit=10`)
+                .then(res => res.json())
+                .then(data => {
+                    if (data.success) {
+                        const stats = data.stats;
+                        const ordersHtml = data.orders.slice(0, 10).map(order => `
+                            <tr>
+                                <td>${order.numero_pedido}</td>
+                                <td>Q${parseFloat(order.total_final).toFixed(2)}</td>
+                                <td>${order.estado}</td>
+                            </tr>
+                        `).join('');
+                        
+                        Swal.fire({
+                            title: `📊 Ventas del ${data.date}`,
+                            html: `
+                                <div style="text-align: left; margin-top: 1rem;">
+                                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; margin-bottom: 1rem;">
+                                        <div style="background: #f3f4f6; padding: 1rem; border-radius: 0.5rem;">
+                                            <div style="color: #6b7280; font-size: 0.875rem;">Total Pedidos</div>
+                                            <div style="font-size: 1.5rem; font-weight: bold; color: #1f2937;">${stats.total_pedidos}</div>
+                                        </div>
+                                        <div style="background: #f3f4f6; padding: 1rem; border-radius: 0.5rem;">
+                                            <div style="color: #6b7280; font-size: 0.875rem;">Ventas Totales</div>
+                                            <div style="font-size: 1.5rem; font-weight: bold; color: #10b981;">Q${parseFloat(stats.ventas_totales).toFixed(2)}</div>
+                                        </div>
+                                        <div style="background: #f3f4f6; padding: 1rem; border-radius: 0.5rem;">
+                                            <div style="color: #6b7280; font-size: 0.875rem;">Ticket Promedio</div>
+                                            <div style="font-size: 1.5rem; font-weight: bold; color: #3b82f6;">Q${parseFloat(stats.ticket_promedio).toFixed(2)}</div>
+                                        </div>
+                                        <div style="background: #f3f4f6; padding: 1rem; border-radius: 0.5rem;">
+                                            <div style="color: #6b7280; font-size: 0.875rem;">Descuentos</div>
+                                            <div style="font-size: 1.5rem; font-weight: bold; color: #f59e0b;">Q${parseFloat(stats.total_descuentos).toFixed(2)}</div>
+                                        </div>
+                                    </div>
+                                    <div style="max-height: 300px; overflow-y: auto;">
+                                        <table style="width: 100%; border-collapse: collapse; font-size: 0.875rem;">
+                                            <thead>
+                                                <tr style="background: #f9fafb; border-bottom: 2px solid #e5e7eb;">
+                                                    <th style="padding: 0.5rem; text-align: left;">Pedido</th>
+                                                    <th style="padding: 0.5rem; text-align: right;">Total</th>
+                                                    <th style="padding: 0.5rem; text-align: center;">Estado</th>
+                                                </tr>
+                                            </thead>
+                                            <tbody>
+                                                ${ordersHtml || '<tr><td colspan="3" style="text-align: center; padding: 1rem; color: #9ca3af;">No hay pedidos</td></tr>'}
+                                            </tbody>
+                                        </table>
+                                    </div>
+                                    <div style="margin-top: 1rem; text-align: center;">
+                                        <button onclick="window.open('/api/reports/pdf/sales-day?date=${selectedDate}', '_blank')" 
+                                           style="display: inline-block; background-color: #8b5cf6; color: white; padding: 0.75rem 1.5rem; border-radius: 0.5rem; border: none; cursor: pointer; font-weight: 600;">
+                                            📄 Exportar PDF
+                                        </button>
+                                    </div>
+                                </div>
+                            `,
+                            width: '700px',
+                            confirmButtonText: 'Cerrar'
+                        });
+                    } else {
+                        Swal.fire('Error', data.error || 'No se pudo generar el reporte', 'error');
+                    }
+                });
+        }
+    });
+}
+
+function generateTopProductsReport() {
+    Swal.fire({
+        title: 'Productos Más Vendidos',
+        html: `
+            <div style="text-align: left; margin-top: 1rem;">
+                <div style="margin-bottom: 1rem;">
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha Inicio:</label>
+                    <input type="date" id="startDate" style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+                <div style="margin-bottom: 1rem;">
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha Fin:</label>
+                    <input type="date" id="endDate" style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+                <div>
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Límite:</label>
+                    <input type="number" id="limit" value="10" min="1" max="50" style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+            </div>
+        `,
+        showCancelButton: true,
+        confirmButtonText: 'Generar Reporte',
+        cancelButtonText: 'Cancelar',
+        confirmButtonColor: '#6366f1',
+        preConfirm: () => {
+            const startDate = document.getElementById('startDate').value;
+            const endDate = document.getElementById('endDate').value;
+            const limit = document.getElementById('limit').value || 10;
+            return { startDate, endDate, limit };
+        }
+    }).then((result) => {
+        if (result.isConfirmed && result.value) {
+            const params = new URLSearchParams();
+            const startDate = result.value.startDate || '';
+            const endDate = result.value.endDate || '';
+            const limit = result.value.limit || 10;
+            
+            if (startDate) params.append('start_date', startDate);
+            if (endDate) params.append('end_date', endDate);
+            params.append('limit', limit);
+            
+            fetch(`/api/reports/top-products?${params.toString()}`)
+                .then(res => res.json())
+                .then(data => {
+                    if (data.success) {
+                        const productsHtml = data.products.map((prod, idx) => `
+                            <tr>
+                                <td style="font-weight: 600;">#${idx + 1}</td>
+                                <td>${prod.producto_nombre}</td>
+                                <td style="text-align: right;">${prod.total_vendido}</td>
+                                <td style="text-align: right; color: #10b981; font-weight: bold;">Q${parseFloat(prod.ingresos_totales).toFixed(2)}</td>
+                            </tr>
+                        `).join('');
+                        
+                        // Construir URL para PDF
+                        const pdfParams = new URLSearchParams();
+                        if (startDate) pdfParams.append('start_date', startDate);
+                        if (endDate) pdfParams.append('end_date', endDate);
+                        pdfParams.append('limit', limit);
+                        const pdfUrl = `/api/reports/pdf/top-products?${pdfParams.toString()}`;
+                        
+                        Swal.fire({
+                            title: '🏆 Productos Más Vendidos',
+                            html: `
+                                <div style="text-align: left; margin-top: 1rem;">
+                                    <table style="width: 100%; border-collapse: collapse; font-size: 0.875rem;">
+                                        <thead>
+                                            <tr style="background: #f9fafb; border-bottom: 2px solid #e5e7eb;">
+                                                <th style="padding: 0.5rem; text-align: center;">#</th>
+                                                <th style="padding: 0.5rem; text-align: left;">Producto</th>
+                                                <th style="padding: 0.5rem; text-align: right;">Cantidad</th>
+                                                <th style="padding: 0.5rem; text-align: right;">Ingresos</th>
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                                            ${productsHtml || '<tr><td colspan="4" style="text-align: center; padding: 1rem; color: #9ca3af;">No hay datos</td></tr>'}
+                                        </tbody>
+                                    </table>
+                                    <div style="margin-top: 1rem; text-align: center;">
+                                        <button onclick="window.open('${pdfUrl}', '_blank')" 
+                                           style="display: inline-block; background-color: #8b5cf6; color: white; padding: 0.75rem 1.5rem; border-radius: 0.5rem; border: none; cursor: pointer; font-weight: 600; margin-top: 1rem;">
+                                            📄 Exportar PDF
+                                        </button>
+                                    </div>
+                                </div>
+                            `,
+                            width: '700px',
+                            showCancelButton: false,
+                            confirmButtonText: 'Cerrar',
+                            confirmButtonColor: '#8b5cf6'
+                        });
+                    } else {
+                        Swal.fire('Error', data.error || 'No se pudo generar el reporte', 'error');
+                    }
+                });
+        }
+    });
+}
+
+function showSalesRangeForm() {
+    Swal.fire({
+        title: 'Reporte por Rango de Fechas',
+        html: `
+            <div style="text-align: left; margin-top: 1rem;">
+                <div style="margin-bottom: 1rem;">
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha Inicio:</label>
+                    <input type="date" id="rangeStartDate" required style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+                <div>
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha Fin:</label>
+                    <input type="date" id="rangeEndDate" required style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+            </div>
+        `,
+        showCancelButton: true,
+        confirmButtonText: 'Generar Reporte',
+        cancelButtonText: 'Cancelar',
+        confirmButtonColor: '#10b981',
+        preConfirm: () => {
+            const start = document.getElementById('rangeStartDate').value;
+            const end = document.getElementById('rangeEndDate').value;
+            if (!start || !end) {
+                Swal.showValidationMessage('Por favor completa ambas fechas');
+                return false;
+            }
+            if (start > end) {
+                Swal.showValidationMessage('La fecha inicio debe ser anterior a la fecha fin');
+                return false;
+            }
+            return { start, end };
+        }
+    }).then((result) => {
+        if (result.isConfirmed && result.value) {
+            const startDate = result.value.start;
+            const endDate = result.value.end;
+            
+            fetch(`/api/reports/sales-range?start_date=${startDate}&end_date=${endDate}`)
+                .then(res => res.json())
+                .then(data => {
+                    if (data.success) {
+                        const summary = data.summary;
+                        const dailyHtml = data.daily_sales.map(day => `
+                            <tr>
+                                <td>${day.fecha}</td>
+                                <td style="text-align: right;">${day.pedidos}</td>
+                                <td style="text-align: right; color: #10b981; font-weight: bold;">Q${parseFloat(day.ventas).toFixed(2)}</td>
+                            </tr>
+                        `).join('');
+                        
+                        // Construir URL para PDF
+                        const pdfUrl = `/api/reports/pdf/sales-range?start_date=${encodeURIComponent(startDate)}&end_date=${encodeURIComponent(endDate)}`;
+                        
+                        Swal.fire({
+                            title: `📅 Reporte ${data.start_date} al ${data.end_date}`,
+                            html: `
+                                <div style="text-align: left; margin-top: 1rem;">
+                                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; margin-bottom: 1rem;">
+                                        <div style="background: #f3f4f6; padding: 1rem; border-radius: 0.5rem;">
+                                            <div style="color: #6b7280; font-size: 0.875rem;">Total Pedidos</div>
+                                            <div style="font-size: 1.5rem; font-weight: bold; color: #1f2937;">${summary.total_pedidos}</div>
+                                        </div>
+                                        <div style="background: #f3f4f6; padding: 1rem; border-radius: 0.5rem;">
+                                            <div style="color: #6b7280; font-size: 0.875rem;">Ventas Totales</div>
+                                            <div style="font-size: 1.5rem; font-weight: bold; color: #10b981;">Q${parseFloat(summary.ventas_totales).toFixed(2)}</div>
+                                        </div>
+                                    </div>
+                                    <div style="max-height: 300px; overflow-y: auto;">
+                                        <table style="width: 100%; border-collapse: collapse; font-size: 0.875rem;">
+                                            <thead>
+                                                <tr style="background: #f9fafb; border-bottom: 2px solid #e5e7eb;">
+                                                    <th style="padding: 0.5rem; text-align: left;">Fecha</th>
+                                                    <th style="padding: 0.5rem; text-align: right;">Pedidos</th>
+                                                    <th style="padding: 0.5rem; text-align: right;">Ventas</th>
+                                                </tr>
+                                            </thead>
+                                            <tbody>
+                                                ${dailyHtml || '<tr><td colspan="3" style="text-align: center; padding: 1rem; color: #9ca3af;">No hay datos</td></tr>'}
+                                            </tbody>
+                                        </table>
+                                    </div>
+                                    <div style="margin-top: 1rem; text-align: center;">
+                                        <button onclick="window.open('${pdfUrl}', '_blank')" 
+                                           style="display: inline-block; background-color: #8b5cf6; color: white; padding: 0.75rem 1.5rem; border-radius: 0.5rem; border: none; cursor: pointer; font-weight: 600;">
+                                            📄 Exportar PDF
+                                        </button>
+                                    </div>
+                                </div>
+                            `,
+                            width: '700px',
+                            showCancelButton: false,
+                            confirmButtonText: 'Cerrar',
+                            confirmButtonColor: '#8b5cf6'
+                        });
+                    } else {
+                        Swal.fire('Error', data.error || 'No se pudo generar el reporte', 'error');
+                    }
+                });
+        }
+    });
+}
+
+function generateCategoriesReport() {
+    Swal.fire({
+        title: 'Reporte por Categorías',
+        html: `
+            <div style="text-align: left; margin-top: 1rem;">
+                <div style="margin-bottom: 1rem;">
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha Inicio (opcional):</label>
+                    <input type="date" id="catStartDate" style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+                <div>
+                    <label style="display: block; margin-bottom: 0.5rem; font-weight: 600;">Fecha Fin (opcional):</label>
+                    <input type="date" id="catEndDate" style="width: 100%; padding: 0.5rem; border: 1px solid #d1d5db; border-radius: 0.375rem;">
+                </div>
+            </div>
+        `,
+        showCancelButton: true,
+        confirmButtonText: 'Generar Reporte',
+        cancelButtonText: 'Cancelar',
+        confirmButtonColor: '#f59e0b',
+        preConfirm: () => {
+            return {
+                startDate: document.getElementById('catStartDate').value || null,
+                endDate: document.getElementById('catEndDate').value || null
+            };
+        }
+    }).then((result) => {
+        if (result.isConfirmed && result.value) {
+            const params = new URLSearchParams();
+            const startDate = result.value.startDate || '';
+            const endDate = result.value.endDate || '';
+            
+            if (startDate) params.append('start_date', startDate);
+            if (endDate) params.append('end_date', endDate);
+            
+            fetch(`/api/reports/categories?${params.toString()}`)
+                .then(res => res.json())
+                .then(data => {
+                    if (data.success) {
+                        const categoriesHtml = data.categories.map(cat => `
+                            <tr>
+                                <td>${cat.categoria}</td>
+                                <td style="text-align: right;">${cat.unidades_vendidas}</td>
+                                <td style="text-align: right;">${cat.veces_pedida}</td>
+                                <td style="text-align: right; color: #10b981; font-weight: bold;">Q${parseFloat(cat.ingresos_totales).toFixed(2)}</td>
+                            </tr>
+                        `).join('');
+                        
+                        // Construir URL para PDF
+                        const pdfParams = new URLSearchParams();
+                        if (startDate) pdfParams.append('start_date', startDate);
+                        if (endDate) pdfParams.append('end_date', endDate);
+                        const pdfUrl = `/api/reports/pdf/categories?${pdfParams.toString()}`;
+                        
+                        Swal.fire({
+                            title: '📦 Reporte por Categorías',
+                            html: `
+                                <div style="text-align: left; margin-top: 1rem;">
+                                    <table style="width: 100%; border-collapse: collapse; font-size: 0.875rem;">
+                                        <thead>
+                                            <tr style="background: #f9fafb; border-bottom: 2px solid #e5e7eb;">
+                                                <th style="padding: 0.5rem; text-align: left;">Categoría</th>
+                                                <th style="padding: 0.5rem; text-align: right;">Unidades</th>
+                                                <th style="padding: 0.5rem; text-align: right;">Veces Pedida</th>
+                                                <th style="padding: 0.5rem; text-align: right;">Ingresos</th>
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                                            ${categoriesHtml || '<tr><td colspan="4" style="text-align: center; padding: 1rem; color: #9ca3af;">No hay datos</td></tr>'}
+                                        </tbody>
+                                    </table>
+                                    <div style="margin-top: 1rem; text-align: center;">
+                                        <button onclick="window.open('${pdfUrl}', '_blank')" 
+                                           style="display: inline-block; background-color: #8b5cf6; color: white; padding: 0.75rem 1.5rem; border-radius: 0.5rem; border: none; cursor: pointer; font-weight: 600; margin-top: 1rem;">
+                                            📄 Exportar PDF
+                                        </button>
+                                    </div>
+                                </div>
+                            `,
+                            width: '700px',
+                            showCancelButton: false,
+                            confirmButtonText: 'Cerrar',
+                            confirmButtonColor: '#8b5cf6'
+                        });
+                    } else {
+                        Swal.fire('Error', data.error || 'No se pudo generar el reporte', 'error');
+                    }
+                });
+        }
+    });
+}
@@ -0,0 +1,180 @@
+"""Utilidades para exportar resultados grandes sin cargarlos completos en memoria"""
+from typing import Iterator, List, Dict, Optional
+from datetime import date, datetime
+from decimal import Decimal
+from database import get_db_connection
+from config import EXPORT_CHUNK_ROWS, EXPORT_MAX_CONCURRENT
+import csv
+import io
+import json
+import threading
+import zlib
+
+def iter_query_chunks(query: str, params=(), chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[List[Dict]]:
+    """Ejecuta una consulta y entrega sus filas en bloques de `chunk_size`
+
+    Usa un cursor sin buffer: el servidor envía las filas a medida que se leen
+    (equivalente a un cursor del lado del servidor), así que la memoria usada
+    depende del tamaño del bloque y no del total de filas. La conexión queda
+    ocupada hasta agotar o cerrar el generador.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    exhausted = False
+    try:
+        cursor.execute(query, tuple(params))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                exhausted = True
+                break
+            yield rows
+    finally:
+        if exhausted:
+            cursor.close()
+            conn.close()
+        else:
+            # Quedan filas sin leer (descarga cancelada o error): cerrar el cursor
+            # fallaría con "Unread result found" y devolver la conexión obligaría a
+            # leer el resto del resultado; se cierra la conexión física.
+            conn.discard()
+
+class ExportSlot:
+    """Lugar ocupado por una exportación; release() puede llamarse más de una vez"""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+
+    def release(self):
+        limiter, self._limiter = self._limiter, None
+        if limiter is not None:
+            limiter._release()
+
+    def __del__(self):
+        # Una respuesta que nunca empezó a enviarse también devuelve su lugar
+        self.release()
+
+class ExportLimiter:
+    """Limita las exportaciones simultáneas (cada una retiene una conexión del pool)"""
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._stats = {'started': 0, 'rejected': 0}
+
+    def try_acquire(self) -> Optional[ExportSlot]:
+        """Un lugar para una exportación, o None si ya están todos ocupados"""
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                self._stats['rejected'] += 1
+                return None
+            self._active += 1
+            self._stats['started'] += 1
+        return ExportSlot(self)
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, active=self._active, max_concurrent=self.max_concurrent)
+
+export_limiter = ExportLimiter(EXPORT_MAX_CONCURRENT)
+
+def close_source(source):
+    """Cierra un iterador de origen si lo permite (generadores)"""
+    close = getattr(source, 'close', None)
+    if close is not None:
+        close()
+
+def iter_file(fileobj, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Lee un archivo desde el inicio en bloques y lo cierra al terminar"""
+    try:
+        fileobj.seek(0)
+        while True:
+            block = fileobj.read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        fileobj.close()
+
+class LazyStory(list):
+    """Lista de flowables de reportlab que se llena desde un generador
+
+    doc.build() consume la lista por el frente y pregunta len() en cada vuelta;
+    aquí se agrega el siguiente flowable solo cuando la lista queda vacía, de modo
+    que las tablas de cada bloque se crean y se descartan a medida que se dibujan.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        if not super().__len__():
+            for flowable in self._source:
+                self.append(flowable)
+                break
+        return super().__len__()
+
+# ========================================
+# CODIFICACIÓN DE EXPORTACIONES
+# ========================================
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return _export_value(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def encode_csv(chunks: Iterator[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    """Convierte bloques de filas en CSV (UTF-8, con encabezado), un bloque a la vez"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    try:
+        yield buffer.getvalue().encode('utf-8')
+        for rows in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            for row in rows:
+                writer.writerow(['' if row.get(column) is None else _export_value(row.get(column))
+                                 for column in columns])
+            yield buffer.getvalue().encode('utf-8')
+    finally:
+        close_source(chunks)
+
+def encode_ndjson(chunks: Iterator[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    """Convierte bloques de filas en NDJSON (un objeto JSON por línea)"""
+    try:
+        for rows in chunks:
+            yield ''.join(
+                json.dumps({column: row.get(column) for column in columns},
+                           default=_json_default, ensure_ascii=False) + '\n'
+                for row in rows
+            ).encode('utf-8')
+    finally:
+        close_source(chunks)
+
+def gzip_stream(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime un flujo de bytes en formato gzip sin juntarlo en memoria"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close_source(chunks)
@@ -0,0 +1,65 @@
+"""Cambio de estado de pedidos: tiempo de preparación al marcar 'ready'"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+import services
+
+
+class FakeCursor:
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((' '.join(sql.split()), params))
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        pass
+
+
+class RecordingStats:
+    def __init__(self):
+        self.calls = []
+
+    def order_status_changed(self, *args):
+        self.calls.append(args)
+
+
+def test_ready_records_preparation_time(monkeypatch):
+    # fecha_hora llega de MySQL sin timezone (UTC)
+    fecha_hora = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=5)
+    cursor = FakeCursor((fecha_hora, 'preparing', None))
+    conn = FakeConnection(cursor)
+    stats = RecordingStats()
+    monkeypatch.setattr(services, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(services, 'live_admin_stats', stats)
+    monkeypatch.setattr(services.kitchen_hub, 'publish', lambda *args: None)
+
+    services.update_order_status(7, 'ready')
+
+    update = next(params for sql, params in cursor.executed if sql.startswith('UPDATE pedidos SET'))
+    assert update[0] == 'ready' and update[2] == 7
+    assert 290 <= update[1] <= 310
+    assert conn.committed
+    assert stats.calls == [(fecha_hora, 'preparing', 'ready', None, update[1])]
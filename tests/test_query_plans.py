@@ -0,0 +1,19 @@
+"""Planes de ejecución de las consultas de reportes (requiere MySQL)
+
+Corre EXPLAIN sobre cada consulta de routers.reports.report_queries() contra la
+base de datos configurada, que debe estar inicializada con `python init_db.py`.
+"""
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('reportlab')
+
+from routers.reports import explain_report_queries
+
+# EXPLAIN muestra el alias de la tabla cuando la consulta usa uno (pd, pi)
+LARGE_TABLES = {'pedidos', 'pd', 'pedido_items', 'pi'}
+
+
+def test_report_queries_do_not_scan_large_tables(mysql_database):
+    full_scans = [scan for scan in explain_report_queries() if scan['table'] in LARGE_TABLES]
+    assert full_scans == []
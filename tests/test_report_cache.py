@@ -0,0 +1,29 @@
+"""Caché en disco de PDFs: límites de tamaño y expulsión LRU"""
+from io import BytesIO
+
+from report_cache import ReportArtifactCache
+
+
+def test_oversized_artifact_is_not_cached(tmp_path):
+    cache = ReportArtifactCache(str(tmp_path), max_bytes=10)
+    assert cache.put('big', BytesIO(b'x' * 11)) is None
+    assert cache.open('big') is None
+    assert cache.stats()['skipped'] == 1
+
+
+def test_put_never_evicts_the_new_artifact(tmp_path):
+    cache = ReportArtifactCache(str(tmp_path), max_bytes=10)
+    cache.put('old', BytesIO(b'a' * 6))
+    cache.put('new', BytesIO(b'b' * 6))
+    assert cache.open('old') is None
+    with cache.open('new') as cached:
+        assert cached.read() == b'b' * 6
+
+
+def test_open_file_survives_eviction(tmp_path):
+    cache = ReportArtifactCache(str(tmp_path), max_bytes=10)
+    cache.put('first', BytesIO(b'a' * 6))
+    cached = cache.open('first')
+    cache.put('second', BytesIO(b'b' * 6))
+    with cached:
+        assert cached.read() == b'a' * 6
@@ -1,5 +1,5 @@
 """Utilidades comunes para el sistema"""
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
 
 # Importar timezone de Guatemala
 try:
@@ -18,25 +18,35 @@ def get_guatemala_time():
     """Obtiene la hora actual en el timezone de Guatemala"""
     return datetime.now(GUATEMALA_TZ)
 
+def day_bounds(day: date) -> tuple:
+    """Rango semiabierto [inicio, fin) de un día, para filtrar por fecha_hora usando índices"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+def date_range_bounds(start_day: date, end_day: date) -> tuple:
+    """Rango semiabierto [inicio de start_day, inicio del día siguiente a end_day)"""
+    return datetime.combine(start_day, time.min), datetime.combine(end_day + timedelta(days=1), time.min)
+
+def to_guatemala_time(dt: datetime) -> datetime:
+    """datetime con timezone de Guatemala; los valores sin timezone (de la BD) se asumen UTC"""
+    if dt.tzinfo is None:
+        if HAS_ZONEINFO:
+            return dt.replace(tzinfo=UTC_TZ).astimezone(GUATEMALA_TZ)
+        return UTC_TZ.localize(dt).astimezone(GUATEMALA_TZ)
+    return dt.astimezone(GUATEMALA_TZ)
+
+def elapsed_seconds(since: datetime) -> int:
+    """Segundos transcurridos desde `since` (p. ej. fecha_hora de un pedido) hasta ahora"""
+    return int((get_guatemala_time() - to_guatemala_time(since)).total_seconds())
+
 def format_datetime_to_string(dt):
     """Convierte datetime a string con formato ISO usando timezone de Guatemala"""
     if dt is None:
         return None
     if isinstance(dt, datetime):
         try:
-            # Si el datetime no tiene timezone, asumimos que es UTC y lo convertimos
-            if dt.tzinfo is None:
-                # Convertir a timezone de Guatemala (asumimos UTC)
-                if HAS_ZONEINFO:
-                    dt = dt.replace(tzinfo=UTC_TZ).astimezone(GUATEMALA_TZ)
-                else:
-                    dt = UTC_TZ.localize(dt).astimezone(GUATEMALA_TZ)
-            else:
-                # Si tiene timezone, convertir a timezone de Guatemala
-                dt = dt.astimezone(GUATEMALA_TZ)
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
+            return to_guatemala_time(dt).strftime('%Y-%m-%d %H:%M:%S')
         except (AttributeError, ValueError, TypeError) as e:
             # Si falla la conversión, devolver el string sin conversión
             return dt.strftime('%Y-%m-%d %H:%M:%S') if hasattr(dt, 'strftime') else str(dt)
     return str(dt)
-